@@ -4,9 +4,10 @@ Authentication API endpoints
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.core.logging import bind_log_context
+from app.database import get_async_db
 from app.models import (
     AuthResponse,
     ErrorResponse,
@@ -23,7 +24,8 @@ security = HTTPBearer()
 
 
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db),
 ) -> User:
     """Get current authenticated user"""
     try:
@@ -45,7 +47,7 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        user = auth_service.get_user_by_id(db, int(user_id))
+        user = await auth_service.get_user_by_id(db, int(user_id))
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,6 +55,8 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        bind_log_context(user_id=user.id)
+
         return user
 
     except ValueError:
@@ -64,11 +68,11 @@ async def get_current_user(
 
 
 @router.post("/login", response_model=MessageResponseGeneric)
-async def login(login_request: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     """Start login process by sending verification code"""
     try:
         # Check if user exists, if not create one
-        existing_user = auth_service.get_user_by_phone(db, login_request.phone_number)
+        existing_user = await auth_service.get_user_by_phone(db, login_request.phone_number)
         if not existing_user:
             # Register new user
             await auth_service.register_user(
@@ -85,7 +89,7 @@ async def login(login_request: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/verify-code")
-async def verify_code(verify_request: VerifyCodeRequest, db: Session = Depends(get_db)):
+async def verify_code(verify_request: VerifyCodeRequest, db: AsyncSession = Depends(get_async_db)):
     """Verify authentication code"""
     try:
         result = await auth_service.verify_code(db, verify_request)
@@ -101,7 +105,7 @@ async def verify_code(verify_request: VerifyCodeRequest, db: Session = Depends(g
 
 
 @router.post("/verify-2fa")
-async def verify_2fa(verify_request: Verify2FARequest, db: Session = Depends(get_db)):
+async def verify_2fa(verify_request: Verify2FARequest, db: AsyncSession = Depends(get_async_db)):
     """Verify 2FA password"""
     try:
         result = await auth_service.verify_2fa(db, verify_request)
@@ -113,7 +117,7 @@ async def verify_2fa(verify_request: Verify2FARequest, db: Session = Depends(get
 
 @router.get("/status")
 async def get_auth_status(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Get current authentication status"""
     try:
@@ -125,7 +129,9 @@ async def get_auth_status(
 
 
 @router.post("/logout", response_model=MessageResponseGeneric)
-async def logout(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def logout(
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
+):
     """Logout user"""
     try:
         await auth_service.logout(db, current_user.id)
@@ -138,7 +144,7 @@ async def logout(current_user: User = Depends(get_current_user), db: Session = D
 
 @router.get("/me")
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user information"""
     try:
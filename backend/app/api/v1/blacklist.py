@@ -1,32 +1,60 @@
+from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.auth import get_current_user
-from app.database import get_db
-from app.models import BlacklistResponse, MessageResponseGeneric, User
+from app.core.etag import etag_matches, not_modified, resource_etag
+from app.core.serialization import ListSerializer
+from app.database import get_async_db, get_read_db
+from app.models import (
+    BatchRequest,
+    BatchResponse,
+    Blacklist,
+    BlacklistResponse,
+    MessageResponseGeneric,
+    User,
+)
 from app.services.blacklist_service import blacklist_service
 
 router = APIRouter(prefix="/blacklist", tags=["blacklist"])
 
+blacklist_list = ListSerializer(BlacklistResponse)
+
 
 @router.get("/", response_model=List[BlacklistResponse])
 async def get_blacklist(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     active_only: bool = Query(True, description="Show only active (non-expired) blacklist entries"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get blacklisted groups for current user"""
     try:
+        # Entries expire without a write, so expired entries count towards the ETag
+        etag = await resource_etag(
+            db,
+            Blacklist,
+            current_user.id,
+            func.max(Blacklist.created_at),
+            func.count(Blacklist.id).filter(Blacklist.expires_at <= datetime.utcnow()),
+            key=request.url.query,
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         if active_only:
-            blacklist_entries = blacklist_service.get_active_blacklist(db, current_user.id)
+            blacklist_entries = await blacklist_service.get_active_blacklist(db, current_user.id)
         else:
-            blacklist_entries = blacklist_service.get_blacklist(db, current_user.id, skip, limit)
+            blacklist_entries = await blacklist_service.get_blacklist(
+                db, current_user.id, skip, limit
+            )
 
-        return blacklist_entries
+        return blacklist_list.response(blacklist_entries, etag)
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -34,24 +62,40 @@ async def get_blacklist(
 
 @router.get("/stats")
 async def get_blacklist_stats(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)
 ):
     """Get blacklist statistics"""
     try:
-        stats = blacklist_service.get_blacklist_stats(db, current_user.id)
+        stats = await blacklist_service.get_blacklist_stats(db, current_user.id)
         return stats
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.post("/batch", response_model=BatchResponse)
+async def apply_blacklist_batch(
+    batch: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Remove many blacklist entries in one request (action "delete")"""
+    try:
+        return await blacklist_service.apply_batch(db, current_user.id, batch.items)
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.delete("/{blacklist_id}", response_model=MessageResponseGeneric)
 async def remove_from_blacklist(
-    blacklist_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    blacklist_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Remove a group from blacklist manually"""
     try:
-        success = blacklist_service.remove_from_blacklist(db, blacklist_id, current_user.id)
+        success = await blacklist_service.remove_from_blacklist(db, blacklist_id, current_user.id)
 
         if not success:
             raise HTTPException(
@@ -70,11 +114,11 @@ async def remove_from_blacklist(
 
 @router.post("/cleanup", response_model=MessageResponseGeneric)
 async def cleanup_expired_blacklist(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Clean up expired blacklist entries"""
     try:
-        count = blacklist_service.cleanup_expired_blacklist(db, current_user.id)
+        count = await blacklist_service.cleanup_expired_blacklist(db, current_user.id)
 
         return MessageResponseGeneric(
             message=f"Cleaned up {count} expired blacklist entries", success=True
@@ -88,11 +132,11 @@ async def cleanup_expired_blacklist(
 async def get_recently_unblacklisted(
     hours: int = Query(24, ge=1, le=168, description="Hours to look back"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get groups that were recently removed from blacklist"""
     try:
-        group_ids = blacklist_service.get_recently_unblacklisted(db, current_user.id, hours)
+        group_ids = await blacklist_service.get_recently_unblacklisted(db, current_user.id, hours)
 
         return {"group_ids": group_ids, "count": len(group_ids), "hours_back": hours}
 
@@ -102,11 +146,13 @@ async def get_recently_unblacklisted(
 
 @router.post("/group/{group_id}/remove", response_model=MessageResponseGeneric)
 async def remove_group_from_blacklist(
-    group_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    group_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Remove a specific group from blacklist by group ID"""
     try:
-        success = blacklist_service.remove_group_from_blacklist(db, current_user.id, group_id)
+        success = await blacklist_service.remove_group_from_blacklist(db, current_user.id, group_id)
 
         if not success:
             return MessageResponseGeneric(message="Group was not in blacklist", success=True)
@@ -121,29 +167,15 @@ async def remove_group_from_blacklist(
 
 @router.get("/group/{group_id}/check")
 async def check_group_blacklist_status(
-    group_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    group_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Check if a specific group is blacklisted"""
     try:
-        is_blacklisted = blacklist_service.is_group_blacklisted(db, current_user.id, group_id)
-
         # Get blacklist entry details if blacklisted
-        blacklist_entry = None
-        if is_blacklisted:
-            from datetime import datetime
-
-            now = datetime.utcnow()
-
-            blacklist_entry = (
-                db.query(app.models.Blacklist)
-                .filter(
-                    app.models.Blacklist.user_id == current_user.id,
-                    app.models.Blacklist.group_id == group_id,
-                    (app.models.Blacklist.blacklist_type == "permanent")
-                    | (app.models.Blacklist.expires_at > now),
-                )
-                .first()
-            )
+        blacklist_entry = await blacklist_service.get_active_entry(db, current_user.id, group_id)
+        is_blacklisted = blacklist_entry is not None
 
         result = {"group_id": group_id, "is_blacklisted": is_blacklisted}
 
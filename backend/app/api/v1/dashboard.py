@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.auth import get_current_user
+from app.api.v1.scheduler import build_scheduler_status
+from app.database import get_read_db
+from app.models import DashboardSummary, User
+from app.services.dashboard_service import dashboard_service
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+
+@router.get("/summary", response_model=DashboardSummary)
+async def get_dashboard_summary(
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)
+):
+    """Get scheduler status and message, group, blacklist and send log statistics"""
+    try:
+        summary = await dashboard_service.get_summary(db, current_user.id)
+
+        return DashboardSummary(
+            scheduler=build_scheduler_status(current_user.id, summary), **summary
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,35 +1,61 @@
+import json
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.auth import get_current_user
-from app.database import get_db
-from app.models import ErrorResponse, GroupCreate, GroupResponse, MessageResponseGeneric, User
+from app.core.config import get_settings
+from app.core.etag import etag_matches, not_modified, resource_etag
+from app.core.serialization import ListSerializer
+from app.database import get_async_db, get_read_db
+from app.models import (
+    BatchRequest,
+    BatchResponse,
+    ErrorResponse,
+    Group,
+    GroupCreate,
+    GroupImportRequest,
+    GroupResponse,
+    MessageResponseGeneric,
+    User,
+)
 from app.services.group_service import group_service
+from app.services.telegram_service import telegram_service
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
+group_list = ListSerializer(GroupResponse)
+
 
 @router.get("/", response_model=List[GroupResponse])
 async def get_groups(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     active_only: bool = Query(False),
     search: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get all groups for current user"""
     try:
+        etag = await resource_etag(
+            db, Group, current_user.id, func.max(Group.updated_at), key=request.url.query
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         if search:
-            groups = group_service.search_groups(db, current_user.id, search)
+            groups = await group_service.search_groups(db, current_user.id, search)
         elif active_only:
-            groups = group_service.get_active_groups(db, current_user.id)
+            groups = await group_service.get_active_groups(db, current_user.id)
         else:
-            groups = group_service.get_groups(db, current_user.id, skip, limit)
+            groups = await group_service.get_groups(db, current_user.id, skip, limit)
 
-        return groups
+        return group_list.response(groups, etag)
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -37,24 +63,46 @@ async def get_groups(
 
 @router.get("/stats")
 async def get_group_stats(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)
 ):
     """Get group statistics"""
     try:
-        stats = group_service.get_group_count(db, current_user.id)
+        stats = await group_service.get_group_count(db, current_user.id)
         return stats
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/search", response_model=List[GroupResponse])
+async def search_groups(
+    q: str = Query(..., min_length=1, max_length=100, description="Name or username"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    active_only: bool = Query(True),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Search groups by name or username, best matches first"""
+    try:
+        groups = await group_service.search_groups(
+            db, current_user.id, q, skip, limit, active_only=active_only
+        )
+        return group_list.response(groups)
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.get("/{group_id}", response_model=GroupResponse)
 async def get_group(
-    group_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    group_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a specific group"""
     try:
-        group = group_service.get_group_by_id(db, group_id, current_user.id)
+        group = await group_service.get_group_by_id(db, group_id, current_user.id)
 
         if not group:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
@@ -71,7 +119,7 @@ async def get_group(
 async def add_group(
     group_data: GroupCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Add a new group with validation"""
     try:
@@ -82,20 +130,102 @@ async def add_group(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.post("/batch", response_model=BatchResponse)
+async def apply_group_batch(
+    batch: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Activate, deactivate, toggle or permanently delete many groups in one request"""
+    try:
+        return await group_service.apply_batch(db, current_user.id, batch.items)
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/import")
+async def import_groups(
+    group_import: GroupImportRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Add many groups from links, usernames and IDs, streaming progress as
+    newline-delimited JSON records
+    """
+    client = await telegram_service.get_client(current_user.id)
+    if not client:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Telegram client not available. Please login first.",
+        )
+
+    settings = get_settings()
+    user_id = current_user.id
+    # Lookups can sit out flood waits for minutes; reconnect only for the writes
+    await db.close()
+
+    async def stream():
+        async for progress in group_service.import_groups(
+            db,
+            client,
+            user_id,
+            group_import.group_inputs,
+            concurrency=settings.group_import_concurrency,
+            max_flood_wait=settings.group_import_max_flood_wait_seconds,
+        ):
+            yield json.dumps(progress) + "\n"
+
+    return StreamingResponse(
+        stream(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/import-dialogs")
+async def import_dialogs(
+    active: bool = Query(True, description="Add the new groups as active"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Add every group and megagroup the account has joined, streaming progress
+    as newline-delimited JSON records
+    """
+    client = await telegram_service.get_client(current_user.id)
+    if not client:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Telegram client not available. Please login first.",
+        )
+
+    user_id = current_user.id
+    # Reading a long dialog list takes a while; reconnect only for the writes
+    await db.close()
+
+    async def stream():
+        async for progress in group_service.import_dialogs(db, client, user_id, active=active):
+            yield json.dumps(progress) + "\n"
+
+    return StreamingResponse(
+        stream(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"}
+    )
+
+
 @router.delete("/{group_id}", response_model=MessageResponseGeneric)
 async def remove_group(
     group_id: int,
     permanent: bool = Query(False, description="Permanently delete the group"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Remove a group (soft delete by default, permanent if specified)"""
     try:
         if permanent:
-            success = group_service.delete_group(db, group_id, current_user.id)
+            success = await group_service.delete_group(db, group_id, current_user.id)
             message = "Group permanently deleted"
         else:
-            success = group_service.remove_group(db, group_id, current_user.id)
+            success = await group_service.remove_group(db, group_id, current_user.id)
             message = "Group removed (deactivated)"
 
         if not success:
@@ -111,11 +241,13 @@ async def remove_group(
 
 @router.post("/{group_id}/toggle", response_model=GroupResponse)
 async def toggle_group_status(
-    group_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    group_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Toggle group active status"""
     try:
-        group = group_service.toggle_group_status(db, group_id, current_user.id)
+        group = await group_service.toggle_group_status(db, group_id, current_user.id)
 
         if not group:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
@@ -130,7 +262,9 @@ async def toggle_group_status(
 
 @router.post("/{group_id}/validate")
 async def validate_group(
-    group_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    group_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Validate group access and update information"""
     try:
@@ -143,7 +277,7 @@ async def validate_group(
 
 @router.post("/validate-all")
 async def validate_all_groups(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Validate all active groups"""
     try:
@@ -1,12 +1,18 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.auth import get_current_user
-from app.database import get_db
+from app.core.etag import etag_matches, not_modified, resource_etag
+from app.core.serialization import ListSerializer
+from app.database import get_async_db, get_read_db
 from app.models import (
+    BatchRequest,
+    BatchResponse,
     ErrorResponse,
+    Message,
     MessageCreate,
     MessageResponse,
     MessageResponseGeneric,
@@ -17,23 +23,32 @@ from app.services.message_service import message_service
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
+message_list = ListSerializer(MessageResponse)
+
 
 @router.get("/", response_model=List[MessageResponse])
 async def get_messages(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     active_only: bool = Query(False),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get all messages for current user"""
     try:
+        etag = await resource_etag(
+            db, Message, current_user.id, func.max(Message.updated_at), key=request.url.query
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
         if active_only:
-            messages = message_service.get_active_messages(db, current_user.id)
+            messages = await message_service.get_active_messages(db, current_user.id)
         else:
-            messages = message_service.get_messages(db, current_user.id, skip, limit)
+            messages = await message_service.get_messages(db, current_user.id, skip, limit)
 
-        return messages
+        return message_list.response(messages, etag)
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -41,24 +56,46 @@ async def get_messages(
 
 @router.get("/stats")
 async def get_message_stats(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)
 ):
     """Get message statistics"""
     try:
-        stats = message_service.get_message_count(db, current_user.id)
+        stats = await message_service.get_message_count(db, current_user.id)
         return stats
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/search", response_model=List[MessageResponse])
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=100, description="Title or content"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    active_only: bool = Query(False),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Search message templates by title or content, best matches first"""
+    try:
+        messages = await message_service.search_messages(
+            db, current_user.id, q, skip, limit, active_only=active_only
+        )
+        return message_list.response(messages)
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.get("/{message_id}", response_model=MessageResponse)
 async def get_message(
-    message_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    message_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get a specific message"""
     try:
-        message = message_service.get_message_by_id(db, message_id, current_user.id)
+        message = await message_service.get_message_by_id(db, message_id, current_user.id)
 
         if not message:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
@@ -75,27 +112,43 @@ async def get_message(
 async def create_message(
     message_data: MessageCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Create a new message template"""
     try:
-        message = message_service.create_message(db, message_data, current_user.id)
+        message = await message_service.create_message(db, message_data, current_user.id)
         return message
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.post("/batch", response_model=BatchResponse)
+async def apply_message_batch(
+    batch: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Activate, deactivate, toggle or delete many messages in one request"""
+    try:
+        return await message_service.apply_batch(db, current_user.id, batch.items)
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.put("/{message_id}", response_model=MessageResponse)
 async def update_message(
     message_id: int,
     message_data: MessageUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update an existing message"""
     try:
-        message = message_service.update_message(db, message_id, message_data, current_user.id)
+        message = await message_service.update_message(
+            db, message_id, message_data, current_user.id
+        )
 
         if not message:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
@@ -110,11 +163,13 @@ async def update_message(
 
 @router.delete("/{message_id}", response_model=MessageResponseGeneric)
 async def delete_message(
-    message_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    message_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete a message"""
     try:
-        success = message_service.delete_message(db, message_id, current_user.id)
+        success = await message_service.delete_message(db, message_id, current_user.id)
 
         if not success:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
@@ -129,11 +184,13 @@ async def delete_message(
 
 @router.post("/{message_id}/toggle", response_model=MessageResponse)
 async def toggle_message_status(
-    message_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    message_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Toggle message active status"""
     try:
-        message = message_service.toggle_message_status(db, message_id, current_user.id)
+        message = await message_service.toggle_message_status(db, message_id, current_user.id)
 
         if not message:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
@@ -148,11 +205,13 @@ async def toggle_message_status(
 
 @router.post("/{message_id}/duplicate", response_model=MessageResponse)
 async def duplicate_message(
-    message_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    message_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Duplicate an existing message"""
     try:
-        message = message_service.duplicate_message(db, message_id, current_user.id)
+        message = await message_service.duplicate_message(db, message_id, current_user.id)
 
         if not message:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
@@ -1,28 +1,39 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.auth import get_current_user
-from app.database import get_db
+from app.core.events import event_bus
+from app.core.serialization import ListSerializer
+from app.database import get_async_db, get_read_db
 from app.models import Log, LogResponse, MessageResponseGeneric, SchedulerStatus, User
 from app.services.blacklist_service import blacklist_service
+from app.services.dashboard_service import dashboard_service
 from app.services.group_service import group_service
 from app.services.message_service import message_service
 from app.services.scheduler_service import scheduler_service
 
 router = APIRouter(prefix="/scheduler", tags=["scheduler"])
 
+# Live event stream: idle keepalive interval and client reconnect delay
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 5000
+
+log_list = ListSerializer(LogResponse)
+
 
 @router.post("/start", response_model=MessageResponseGeneric)
 async def start_scheduler(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Start automatic message sending for current user"""
     try:
         # Check if user has active messages and groups
-        active_messages = message_service.get_active_messages(db, current_user.id)
-        active_groups = group_service.get_active_groups(db, current_user.id)
+        active_messages = await message_service.get_active_messages(db, current_user.id)
+        active_groups = await group_service.get_active_groups(db, current_user.id)
 
         if not active_messages:
             raise HTTPException(
@@ -37,10 +48,8 @@ async def start_scheduler(
             )
 
         # Check if any groups are available (not blacklisted)
-        available_groups = []
-        for group in active_groups:
-            if not blacklist_service.is_group_blacklisted(db, current_user.id, group.group_id):
-                available_groups.append(group)
+        blacklisted = await blacklist_service.get_blacklisted_group_ids(db, current_user.id)
+        available_groups = [group for group in active_groups if group.group_id not in blacklisted]
 
         if not available_groups:
             return MessageResponseGeneric(
@@ -70,7 +79,7 @@ async def start_scheduler(
 
 @router.post("/stop", response_model=MessageResponseGeneric)
 async def stop_scheduler(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Stop automatic message sending for current user"""
     try:
@@ -85,51 +94,72 @@ async def stop_scheduler(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+def build_scheduler_status(user_id: int, summary: dict) -> SchedulerStatus:
+    """Combine the in-memory job state with the user's dashboard summary"""
+    job_status = scheduler_service.get_user_job_status(user_id)
+
+    return SchedulerStatus(
+        is_running=scheduler_service.is_user_job_running(user_id),
+        next_run=job_status.get("next_run") if job_status else None,
+        last_run=job_status.get("last_run") if job_status else None,
+        total_messages_sent=(
+            job_status.get("total_messages_sent", 0) if job_status else summary["logs"]["success"]
+        ),
+        total_groups=summary["groups"]["total"],
+        active_groups=summary["groups"]["active"] - summary["blacklist"]["active"],
+        blacklisted_groups=summary["blacklist"]["active"],
+    )
+
+
 @router.get("/status", response_model=SchedulerStatus)
 async def get_scheduler_status(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)
 ):
     """Get scheduler status for current user"""
     try:
-        is_running = scheduler_service.is_user_job_running(current_user.id)
-        job_status = scheduler_service.get_user_job_status(current_user.id)
-
-        # Get statistics
-        total_messages = message_service.get_message_count(db, current_user.id)
-        total_groups = group_service.get_group_count(db, current_user.id)
-        blacklist_stats = blacklist_service.get_blacklist_stats(db, current_user.id)
-
-        # Count recent successful sends
-        from datetime import datetime, timedelta
-
-        recent_logs = (
-            db.query(Log)
-            .filter(
-                Log.user_id == current_user.id,
-                Log.status == "success",
-                Log.created_at >= datetime.utcnow() - timedelta(days=1),
-            )
-            .count()
-        )
-
-        status = SchedulerStatus(
-            is_running=is_running,
-            next_run=job_status.get("next_run") if job_status else None,
-            last_run=job_status.get("last_run") if job_status else None,
-            total_messages_sent=(
-                job_status.get("total_messages_sent", 0) if job_status else recent_logs
-            ),
-            total_groups=total_groups["total"],
-            active_groups=total_groups["active"] - blacklist_stats["active"],
-            blacklisted_groups=blacklist_stats["active"],
-        )
-
-        return status
+        summary = await dashboard_service.get_summary(db, current_user.id)
+        return build_scheduler_status(current_user.id, summary)
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/events")
+async def stream_scheduler_events(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Stream live scheduler, send and blacklist events as Server-Sent Events"""
+    user_id = current_user.id
+    # The stream outlives the request; return the session's connection to the pool now
+    await db.close()
+
+    subscription = event_bus.subscribe(user_id, last_event_id)
+
+    async def stream():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+            while True:
+                event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is not None:
+                    yield event.encode()
+                elif await request.is_disconnected():
+                    break
+                else:
+                    # Comment line, keeps proxies from closing an idle stream
+                    yield b": keepalive\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/logs", response_model=List[LogResponse])
 async def get_scheduler_logs(
     skip: int = Query(0, ge=0),
@@ -139,7 +169,7 @@ async def get_scheduler_logs(
     ),
     hours: int = Query(24, ge=1, le=168, description="Hours to look back"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get recent scheduler logs"""
     try:
@@ -147,14 +177,15 @@ async def get_scheduler_logs(
 
         since = datetime.utcnow() - timedelta(hours=hours)
 
-        query = db.query(Log).filter(Log.user_id == current_user.id, Log.created_at >= since)
+        query = select(Log).where(Log.user_id == current_user.id, Log.created_at >= since)
 
         if status_filter:
-            query = query.filter(Log.status == status_filter)
+            query = query.where(Log.status == status_filter)
 
-        logs = query.order_by(Log.created_at.desc()).offset(skip).limit(limit).all()
+        result = await db.execute(query.order_by(Log.created_at.desc()).offset(skip).limit(limit))
+        logs = result.scalars().all()
 
-        return logs
+        return log_list.response(logs)
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -164,7 +195,7 @@ async def get_scheduler_logs(
 async def get_log_stats(
     hours: int = Query(24, ge=1, le=168, description="Hours to look back"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get log statistics"""
     try:
@@ -172,31 +203,17 @@ async def get_log_stats(
 
         since = datetime.utcnow() - timedelta(hours=hours)
 
-        total = (
-            db.query(Log).filter(Log.user_id == current_user.id, Log.created_at >= since).count()
-        )
-
-        success = (
-            db.query(Log)
-            .filter(
-                Log.user_id == current_user.id, Log.created_at >= since, Log.status == "success"
-            )
-            .count()
-        )
-
-        failed = (
-            db.query(Log)
-            .filter(Log.user_id == current_user.id, Log.created_at >= since, Log.status == "failed")
-            .count()
+        result = await db.execute(
+            select(Log.status, func.count(Log.id))
+            .where(Log.user_id == current_user.id, Log.created_at >= since)
+            .group_by(Log.status)
         )
+        counts = dict(result.all())
 
-        blacklisted = (
-            db.query(Log)
-            .filter(
-                Log.user_id == current_user.id, Log.created_at >= since, Log.status == "blacklisted"
-            )
-            .count()
-        )
+        total = sum(counts.values())
+        success = counts.get("success", 0)
+        failed = counts.get("failed", 0)
+        blacklisted = counts.get("blacklisted", 0)
 
         return {
             "total": total,
@@ -213,7 +230,7 @@ async def get_log_stats(
 
 @router.post("/restart", response_model=MessageResponseGeneric)
 async def restart_scheduler(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Restart scheduler for current user"""
     try:
@@ -1,29 +1,33 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.auth import get_current_user
-from app.database import get_db
+from app.core.etag import etag_matches, not_modified, resource_etag, set_etag
+from app.database import get_async_db
 from app.models import MessageResponseGeneric, Settings, SettingsResponse, SettingsUpdate, User
+from app.services.settings_service import settings_service
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
 
 @router.get("/", response_model=SettingsResponse)
 async def get_settings(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get current user settings"""
     try:
-        settings = db.query(Settings).filter(Settings.user_id == current_user.id).first()
+        etag = await resource_etag(db, Settings, current_user.id, func.max(Settings.updated_at))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        set_etag(response, etag)
 
-        if not settings:
-            # Create default settings
-            settings = Settings(user_id=current_user.id)
-            db.add(settings)
-            db.commit()
-            db.refresh(settings)
+        settings = await settings_service.get_or_create_user_settings(db, current_user.id)
 
         return settings
 
@@ -35,11 +39,11 @@ async def get_settings(
 async def update_settings(
     settings_data: SettingsUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Update user settings"""
     try:
-        settings = db.query(Settings).filter(Settings.user_id == current_user.id).first()
+        settings = await settings_service.get_user_settings(db, current_user.id)
 
         if not settings:
             # Create new settings if doesn't exist
@@ -75,25 +79,25 @@ async def update_settings(
 
         settings.updated_at = datetime.utcnow()
 
-        db.commit()
-        db.refresh(settings)
+        await db.commit()
+        await db.refresh(settings)
 
         return settings
 
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @router.post("/reset", response_model=SettingsResponse)
 async def reset_settings(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Reset settings to default values"""
     try:
-        settings = db.query(Settings).filter(Settings.user_id == current_user.id).first()
+        settings = await settings_service.get_user_settings(db, current_user.id)
 
         if not settings:
             settings = Settings(user_id=current_user.id)
@@ -106,13 +110,13 @@ async def reset_settings(
             settings.max_delay = 10  # 10 seconds
             settings.updated_at = datetime.utcnow()
 
-        db.commit()
-        db.refresh(settings)
+        await db.commit()
+        await db.refresh(settings)
 
         return settings
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
@@ -163,7 +167,9 @@ async def get_interval_presets():
 
 @router.post("/intervals/apply-preset", response_model=SettingsResponse)
 async def apply_interval_preset(
-    preset_name: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    preset_name: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Apply a predefined interval preset"""
     try:
@@ -197,11 +203,11 @@ async def apply_interval_preset(
 
 @router.get("/validation")
 async def validate_settings(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
     """Validate current settings and provide recommendations"""
     try:
-        settings = db.query(Settings).filter(Settings.user_id == current_user.id).first()
+        settings = await settings_service.get_user_settings(db, current_user.id)
 
         if not settings:
             return {
@@ -0,0 +1,106 @@
+"""
+Short-lived async result cache
+
+Values are cached per key for a few seconds and dropped as soon as the data
+behind them changes (mark_changed). Concurrent misses for the same key share
+one load instead of each running the same queries. A load that is overtaken
+by a write still answers its callers but is not stored, so the cache never
+serves a value older than the last write.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+from app.core import metrics
+
+T = TypeVar("T")
+
+cache_requests = metrics.counter(
+    "cache_requests", "Cache lookups by cache and result", ["cache", "result"]
+)
+
+
+class TTLCache(Generic[T]):
+    """
+    Per-key cache with expiry, write invalidation and single-flight loading
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_entries: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        # key -> (expires at, value), oldest first
+        self._entries: Dict[Hashable, Tuple[float, T]] = {}
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        """Get the cached value of key, or load it once for all concurrent callers"""
+        while True:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    cache_requests.inc(self.name, "hit")
+                    return entry[1]
+                del self._entries[key]
+
+            future = self._loading.get(key)
+            if future is None:
+                break
+
+            cache_requests.inc(self.name, "shared")
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The caller running the load was cancelled; load again
+
+        cache_requests.inc(self.name, "miss")
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Waiters re-raise it; avoid "exception never retrieved" without any
+                future.exception()
+            raise
+
+        # mark_changed during the load removes the future: answer, don't store
+        if self._loading.get(key) is future:
+            del self._loading[key]
+            self._store(key, value)
+        future.set_result(value)
+        return value
+
+    def _store(self, key: Hashable, value: T) -> None:
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (self.clock() + self.ttl, value)
+
+    def mark_changed(self, key: Hashable) -> None:
+        """Drop the cached value of key, including one being loaded"""
+        self._entries.pop(key, None)
+        self._loading.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every cached value"""
+        self._entries.clear()
+        self._loading.clear()
@@ -0,0 +1,62 @@
+"""
+Committed write tracking
+
+Keeps an in-memory version per table and user that goes up whenever a write
+to that user's rows commits in this process, so caches and HTTP validators
+can tell cheaply whether anything changed. ORM flushes are picked up by
+session events; Core INSERT/UPDATE/DELETE statements report themselves with
+mark_changed after committing.
+"""
+
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Versions restart at zero with the process; the epoch tells runs apart
+PROCESS_EPOCH = uuid.uuid4().hex[:12]
+
+# (table, user id) -> version; user id None counts writes to every user's rows
+_versions: Dict[Tuple[str, Optional[int]], int] = {}
+
+Listener = Callable[[str, Optional[int]], None]
+_listeners: List[Listener] = []
+
+
+def get_version(table: str, user_id: int) -> Tuple[int, int]:
+    """Get the write version of a user's rows in table"""
+    return _versions.get((table, None), 0), _versions.get((table, user_id), 0)
+
+
+def mark_changed(table: str, user_id: Optional[int] = None) -> None:
+    """Record a committed write to a user's rows in table, or to every user's"""
+    key = (table, user_id)
+    _versions[key] = _versions.get(key, 0) + 1
+    for listener in _listeners:
+        listener(table, user_id)
+
+
+def add_listener(listener: Listener) -> None:
+    """Call listener(table, user_id) after every recorded write"""
+    _listeners.append(listener)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changed = session.info.setdefault("changed_rows", set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        user_id = getattr(instance, "user_id", None)
+        if user_id is not None:
+            changed.add((instance.__table__.name, user_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _record_changes(session):
+    for table, user_id in session.info.pop("changed_rows", ()):
+        mark_changed(table, user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("changed_rows", None)
@@ -28,6 +28,64 @@ class Settings(BaseSettings):
 
     # Database settings
     database_url: str = "sqlite:///./telegram_automation.db"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+
+    # Read-only pool for analytics and list endpoints, so long scans never hold
+    # the connections the scheduler commits on. Set a replica URL on
+    # PostgreSQL; unset reads from DATABASE_URL (WAL readers on SQLite)
+    database_read_url: Optional[str] = None
+    db_read_pool_size: int = 5
+    db_read_max_overflow: int = 5
+
+    # PostgreSQL settings. asyncpg prepares statements server-side and caches
+    # them per connection; set the cache size to 0 behind pgbouncer in
+    # transaction pooling mode
+    db_statement_cache_size: int = 100
+    db_application_name: str = "telegram-automation"
+
+    # Send log writer: rows are buffered and written in batches (COPY on PostgreSQL)
+    log_batch_size: int = 200
+    log_flush_interval_ms: int = 1000
+
+    # Dashboard summary cache; writes invalidate it, the TTL bounds how stale
+    # time-based counts (expiring blacklist entries, the 24h log window) get
+    dashboard_cache_ttl_seconds: float = 5.0
+
+    # Bulk group import: concurrent Telegram lookups, and the longest FloodWait
+    # the import sits out before failing the remaining inputs
+    group_import_concurrency: int = 4
+    group_import_max_flood_wait_seconds: int = 60
+
+    # Background refresh of group names and usernames for connected accounts;
+    # 0 disables it
+    group_metadata_refresh_interval_seconds: int = 3600
+
+    # How long a group's send permission and slow mode are trusted before the
+    # scheduler checks them again
+    group_profile_ttl_seconds: int = 1800
+
+    # Response compression; brotli is used when installed and preferred by the
+    # client. Complete bodies under the minimum size are sent uncompressed
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 1
+    compression_brotli_quality: int = 4
+
+    # SQLite tuning, applied to every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 20000
+    sqlite_mmap_size_mb: int = 256
+
+    # Query instrumentation settings
+    db_slow_query_ms: float = 100
+    db_repeated_statement_threshold: int = 10
+    # Run EXPLAIN on slow statements; unset means only in development
+    db_explain_slow_queries: Optional[bool] = None
 
     # Security settings
     secret_key: str
@@ -48,6 +106,20 @@ class Settings(BaseSettings):
     # Logging settings
     log_level: str = "INFO"
     log_file: Optional[str] = None
+    # Per-logger rate limits, "logger=burst/window_seconds[:sample_every],..."
+    log_rate_limits: str = (
+        "app.services.scheduler_service=20/60,app.services.blacklist_service=20/60"
+    )
+
+    # Metrics endpoint settings. With a token, /metrics requires
+    # "Authorization: Bearer <token>"; without one it is only served in development
+    metrics_enabled: bool = True
+    metrics_token: Optional[str] = None
+
+    # Event loop watchdog settings
+    loop_watchdog_enabled: bool = True
+    loop_watchdog_interval_ms: int = 100
+    loop_stall_threshold_ms: int = 250
 
     # Scheduler settings
     scheduler_timezone: str = "UTC"
@@ -65,6 +137,20 @@ class Settings(BaseSettings):
             raise ValueError(f"Environment must be one of {allowed_envs}")
         return v
 
+    @validator("sqlite_journal_mode")
+    def validate_sqlite_journal_mode(cls, v):
+        allowed_modes = ["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"]
+        if v.upper() not in allowed_modes:
+            raise ValueError(f"SQLite journal mode must be one of {allowed_modes}")
+        return v.upper()
+
+    @validator("sqlite_synchronous")
+    def validate_sqlite_synchronous(cls, v):
+        allowed_levels = ["OFF", "NORMAL", "FULL", "EXTRA"]
+        if v.upper() not in allowed_levels:
+            raise ValueError(f"SQLite synchronous must be one of {allowed_levels}")
+        return v.upper()
+
     @validator("log_level")
     def validate_log_level(cls, v):
         allowed_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
@@ -113,20 +199,39 @@ def get_settings() -> Settings:
 
 
 # Database configuration
+def _normalize_database_url(url: str) -> str:
+    # Hosted PostgreSQL providers still hand out the "postgres://" scheme
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://") :]
+    return url
+
+
 def get_database_url() -> str:
     """
     Get database URL with proper configuration
     """
     settings = get_settings()
+    url = _normalize_database_url(settings.database_url)
 
-    # For SQLite, ensure the directory exists
-    if settings.database_url.startswith("sqlite"):
-        db_path = settings.database_url.replace("sqlite:///", "")
+    # For SQLite files, ensure the directory exists
+    if url.startswith("sqlite:///") and ":memory:" not in url:
+        db_path = url.replace("sqlite:///", "").split("?", 1)[0]
         db_dir = os.path.dirname(db_path)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
 
-    return settings.database_url
+    return url
+
+
+def get_read_database_url() -> str:
+    """
+    Get the database URL for read-only queries, the primary database if no
+    replica is configured
+    """
+    settings = get_settings()
+    if not settings.database_read_url:
+        return get_database_url()
+    return _normalize_database_url(settings.database_read_url)
 
 
 # Logging configuration
@@ -0,0 +1,222 @@
+"""
+Database query instrumentation
+
+Engine event hooks time every statement and feed the /metrics histograms.
+Statements are also attributed to the current scope (an HTTP request or a
+scheduler cycle), which is tracked with a context variable so concurrent
+requests are kept apart. When a scope finishes, statement shapes repeated at
+least a threshold number of times are reported as likely N+1 patterns, and slow
+statements are logged together with their query plan.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+db_query_duration = metrics.histogram(
+    "db_query_duration_seconds", "Duration of individual database statements", ["operation"]
+)
+db_queries_per_request = metrics.histogram(
+    "db_queries_per_request",
+    "Database statements executed per HTTP request",
+    buckets=metrics.DEFAULT_COUNT_BUCKETS,
+)
+db_time_per_request = metrics.histogram(
+    "db_time_per_request_seconds", "Total database time per HTTP request"
+)
+db_queries_per_cycle = metrics.histogram(
+    "db_queries_per_scheduler_cycle",
+    "Database statements executed per scheduler send cycle",
+    buckets=metrics.DEFAULT_COUNT_BUCKETS,
+)
+db_time_per_cycle = metrics.histogram(
+    "db_time_per_scheduler_cycle_seconds", "Total database time per scheduler send cycle"
+)
+db_repeated_statements = metrics.counter(
+    "db_repeated_statement_scopes",
+    "Scopes that repeated one statement shape beyond the N+1 threshold",
+    ["kind"],
+)
+
+# Tunables, see configure()
+SLOW_QUERY_SECONDS = 0.1
+REPEATED_STATEMENT_THRESHOLD = 10
+EXPLAIN_SLOW_QUERIES = False
+MAX_SLOW_STATEMENTS = 3
+
+# Collapse expanded IN lists so "IN (?, ?)" and "IN (?, ?, ?)" share a shape
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s|\$\d+|%\(\w+\)s)(?:\s*,\s*(?:\?|%s|\$\d+|%\(\w+\)s))+\s*\)")
+_shape_cache: Dict[str, str] = {}
+
+
+def configure(
+    slow_query_ms: float = 100,
+    repeated_statement_threshold: int = 10,
+    explain_slow_queries: bool = False,
+) -> None:
+    """
+    Configure detection thresholds
+    """
+    global SLOW_QUERY_SECONDS, REPEATED_STATEMENT_THRESHOLD, EXPLAIN_SLOW_QUERIES
+    SLOW_QUERY_SECONDS = slow_query_ms / 1000
+    REPEATED_STATEMENT_THRESHOLD = repeated_statement_threshold
+    EXPLAIN_SLOW_QUERIES = explain_slow_queries
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Get the normalized shape of a statement
+    """
+    shape = _shape_cache.get(statement)
+    if shape is None:
+        shape = _IN_LIST.sub("(?)", " ".join(statement.split()))
+        if len(_shape_cache) > 2000:
+            _shape_cache.clear()
+        _shape_cache[statement] = shape
+    return shape
+
+
+class QueryStats:
+    """
+    Query count, total database time and statement shapes for one scope
+    """
+
+    __slots__ = ("label", "kind", "count", "total_time", "shapes", "slowest")
+
+    def __init__(self, label: str = "", kind: str = "request"):
+        self.label = label
+        self.kind = kind
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Dict[str, int] = {}
+        # (elapsed, statement, plan), slowest first
+        self.slowest: List[Tuple[float, str, Optional[str]]] = []
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """Get statement shapes executed at least ``threshold`` times"""
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count >= threshold),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(label: str = "", kind: str = "request") -> Iterator[QueryStats]:
+    """
+    Attribute database statements executed inside the block to a new scope
+    """
+    stats = QueryStats(label, kind)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        finish_scope(stats)
+
+
+def finish_scope(stats: QueryStats) -> None:
+    """
+    Record a finished scope and report repeated and slow statements
+    """
+    if stats.kind == "request":
+        db_queries_per_request.observe(stats.count)
+        db_time_per_request.observe(stats.total_time)
+    else:
+        db_queries_per_cycle.observe(stats.count)
+        db_time_per_cycle.observe(stats.total_time)
+
+    repeated = stats.repeated_shapes(REPEATED_STATEMENT_THRESHOLD)
+    if repeated:
+        db_repeated_statements.inc(stats.kind)
+        for shape, count in repeated:
+            logger.warning(
+                "Possible N+1 in %s: statement executed %d times: %s",
+                stats.label or stats.kind,
+                count,
+                shape[:500],
+            )
+
+    for elapsed, statement, plan in stats.slowest:
+        logger.warning(
+            "Slow statement in %s (%.1f ms): %s%s",
+            stats.label or stats.kind,
+            elapsed * 1000,
+            " ".join(statement.split())[:500],
+            f"\nQuery plan:\n{plan}" if plan else "",
+        )
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    """
+    Get the query plan of a statement on the raw DBAPI connection, bypassing
+    engine events
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return None
+
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"unavailable: {e}"
+
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+
+    operation = statement.split(None, 1)[0].upper() if statement else "UNKNOWN"
+    db_query_duration.observe(elapsed, operation)
+
+    stats = _current_stats.get()
+    if stats is None:
+        return
+
+    stats.count += 1
+    stats.total_time += elapsed
+
+    shape = statement_shape(statement)
+    stats.shapes[shape] = stats.shapes.get(shape, 0) + 1
+
+    if elapsed >= SLOW_QUERY_SECONDS and (
+        len(stats.slowest) < MAX_SLOW_STATEMENTS or elapsed > stats.slowest[-1][0]
+    ):
+        plan = None
+        if EXPLAIN_SLOW_QUERIES and operation in ("SELECT", "WITH") and not executemany:
+            plan = _explain(conn, statement, parameters)
+        stats.slowest.append((elapsed, statement, plan))
+        stats.slowest.sort(key=lambda item: item[0], reverse=True)
+        del stats.slowest[MAX_SLOW_STATEMENTS:]
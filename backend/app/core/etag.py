@@ -0,0 +1,68 @@
+"""
+Conditional GET support
+
+List endpoints send a weak ETag derived from a validator of the user's rows:
+the in-memory write version (app.core.changes) plus the row count, highest
+id and latest modification time, read through the same session as the rows.
+The aggregate catches writes made by other processes and data still missing
+from a lagging read replica. A request whose If-None-Match matches is
+answered with 304 before any row is loaded or serialized.
+"""
+
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import changes
+
+
+async def resource_etag(
+    db: AsyncSession, model: Any, user_id: int, *aggregates: Any, key: str = ""
+) -> str:
+    """
+    Build the ETag of a user's rows of model
+
+    aggregates add to the row count and highest id, e.g. the latest
+    updated_at; key tells different views of the same rows apart.
+    """
+    result = await db.execute(
+        select(func.count(model.id), func.max(model.id), *aggregates).where(
+            model.user_id == user_id
+        )
+    )
+    validator = (
+        changes.PROCESS_EPOCH,
+        model.__tablename__,
+        user_id,
+        changes.get_version(model.__tablename__, user_id),
+        tuple(result.one()),
+        key,
+    )
+    digest = hashlib.blake2b(repr(validator).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match against etag, using weak comparison"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """Build the 304 answer for a matching conditional request"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Send etag and ask clients to revalidate before reusing the response"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
@@ -0,0 +1,176 @@
+"""
+In-process event bus for live updates
+
+Services publish small per-user events (sends, blacklist changes, scheduler
+start and stop) and every Server-Sent Events client holds a subscription with
+a bounded queue. A client that falls behind loses its oldest events instead
+of growing memory or slowing the publisher, and receives a resync event
+telling it to reload. Recent events are kept in a ring buffer, so a client
+reconnecting with Last-Event-ID gets what it missed.
+
+Publishing and consuming happen on the event loop thread; nothing is shared
+between processes.
+"""
+
+import asyncio
+import json
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core import metrics
+from app.core.changes import PROCESS_EPOCH
+
+# Sent when events were lost; the client should reload its state
+RESYNC = "resync"
+
+events_published = metrics.counter("events_published", "Live events published by type", ["type"])
+events_dropped = metrics.counter(
+    "events_dropped", "Live events dropped because a subscriber queue was full"
+)
+
+
+@dataclass(frozen=True)
+class Event:
+    """A published event, with its data already encoded as JSON"""
+
+    sequence: int
+    user_id: int
+    type: str
+    data: str
+
+    @property
+    def id(self) -> str:
+        return f"{PROCESS_EPOCH}-{self.sequence}" if self.sequence else ""
+
+    def encode(self) -> bytes:
+        """Format the event as a Server-Sent Events message"""
+        id_line = f"id: {self.id}\n" if self.id else ""
+        return f"{id_line}event: {self.type}\ndata: {self.data}\n\n".encode()
+
+
+def _resync_event(user_id: int) -> Event:
+    return Event(0, user_id, RESYNC, "{}")
+
+
+class Subscription:
+    """
+    Bounded queue of one client's events; when full, the oldest are dropped
+    """
+
+    def __init__(self, user_id: int, max_events: int):
+        self.user_id = user_id
+        self.max_events = max_events
+        self.dropped = 0
+        self._events: Deque[Event] = deque()
+        self._ready = asyncio.Event()
+        self._overflowed = False
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def push(self, event: Event) -> None:
+        if len(self._events) >= self.max_events:
+            self._events.popleft()
+            self.dropped += 1
+            self._overflowed = True
+            events_dropped.inc()
+        self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """Wait for the next event, or return None after timeout seconds"""
+        if not self._events:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        if self._overflowed:
+            # Tell the client before the first event after the gap
+            self._overflowed = False
+            return _resync_event(self.user_id)
+        return self._events.popleft()
+
+
+class EventBus:
+    """
+    Per-user publish/subscribe with a replay buffer for resuming clients
+    """
+
+    def __init__(self, queue_size: int = 100, history_size: int = 1000):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._history: Deque[Event] = deque(maxlen=history_size)
+        self._sequence = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def publish(self, user_id: int, type: str, data: Optional[Dict[str, Any]] = None) -> Event:
+        """Send an event to the user's subscribers and keep it for replay"""
+        self._sequence += 1
+        event = Event(self._sequence, user_id, type, json.dumps(jsonable_encoder(data or {})))
+        self._history.append(event)
+        events_published.inc(type)
+
+        for subscription in self._subscribers.get(user_id, ()):
+            subscription.push(event)
+        return event
+
+    def subscribe(self, user_id: int, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Subscribe to a user's events, first replaying those published after
+        last_event_id
+        """
+        subscription = Subscription(user_id, self.queue_size)
+
+        if last_event_id:
+            missed = self._events_since(user_id, last_event_id)
+            if missed is None:
+                subscription.push(_resync_event(user_id))
+            else:
+                for event in missed:
+                    subscription.push(event)
+
+        self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def _events_since(self, user_id: int, last_event_id: str) -> Optional[List[Event]]:
+        """Get the user's events after last_event_id, or None if some are gone"""
+        epoch, _, sequence = last_event_id.rpartition("-")
+        # Events of another process (e.g. before a restart) cannot be replayed
+        if epoch != PROCESS_EPOCH or not sequence.isdigit():
+            return None
+
+        sequence = int(sequence)
+        oldest = self._history[0].sequence if self._history else self._sequence + 1
+        if sequence + 1 < oldest:
+            return None
+
+        return [
+            event
+            for event in self._history
+            if event.sequence > sequence and event.user_id == user_id
+        ]
+
+
+# Global instance
+event_bus = EventBus()
+
+metrics.gauge(
+    "event_subscribers",
+    "Connected live event clients",
+    lambda: event_bus.subscriber_count,
+)
@@ -2,13 +2,33 @@
 Logging configuration and utilities
 """
 
+import functools
+import inspect
 import json
 import logging
 import logging.handlers
 import os
 import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Iterator, Optional
+
+from app.core.metrics import get_histogram
+
+# Per-task logging context. Each asyncio task (HTTP request, scheduler run) gets
+# its own copy, so concurrent requests never see each other's values.
+request_id_var: ContextVar[str] = ContextVar("request_id", default="N/A")
+user_id_var: ContextVar[str] = ContextVar("user_id", default="N/A")
+job_id_var: ContextVar[str] = ContextVar("job_id", default="N/A")
+
+_CONTEXT_VARS = {
+    "request_id": request_id_var,
+    "user_id": user_id_var,
+    "job_id": job_id_var,
+}
 
 
 class JSONFormatter(logging.Formatter):
@@ -55,6 +75,7 @@ class JSONFormatter(logging.Formatter):
                 "exc_info",
                 "exc_text",
                 "stack_info",
+                "_rate_limited",
             ]:
                 log_entry[key] = value
 
@@ -64,26 +85,209 @@ class JSONFormatter(logging.Formatter):
 class ContextFilter(logging.Filter):
     """
     Filter to add context information to log records
+
+    Values come from the context variables set by the request context middleware
+    and the scheduler, so they are correct under concurrency. Explicit ``extra``
+    values passed to a logging call take precedence.
     """
 
     def filter(self, record):
-        # Add request ID if available (can be set by middleware)
-        if not hasattr(record, "request_id"):
-            record.request_id = getattr(self, "request_id", "N/A")
+        record_dict = record.__dict__
+
+        if "request_id" not in record_dict:
+            record.request_id = request_id_var.get()
+
+        if "user_id" not in record_dict:
+            record.user_id = user_id_var.get()
+
+        if "job_id" not in record_dict:
+            record.job_id = job_id_var.get()
+
+        return True
+
+
+@contextmanager
+def log_context(**values) -> Iterator[None]:
+    """
+    Set logging context variables (request_id, user_id, job_id) for the
+    duration of the block and restore the previous values afterwards
+    """
+    tokens = []
+    for key, value in values.items():
+        var = _CONTEXT_VARS.get(key)
+        if var is None:
+            raise ValueError(f"Unknown logging context key: {key}")
+        tokens.append((var, var.set(str(value))))
+
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def bind_log_context(**values) -> None:
+    """
+    Set logging context variables for the rest of the current task
+
+    Intended for request dependencies (e.g. the authenticated user), whose
+    context is discarded together with the request task.
+    """
+    for key, value in values.items():
+        var = _CONTEXT_VARS.get(key)
+        if var is None:
+            raise ValueError(f"Unknown logging context key: {key}")
+        var.set(str(value))
+
+
+@dataclass(frozen=True)
+class LogRateRule:
+    """
+    Rate limit rule for a logger: let through ``burst`` identical records per
+    ``window`` seconds, then keep one in every ``sample_every`` of the rest
+    (0 drops them all)
+    """
+
+    burst: int
+    window: float
+    sample_every: int = 0
+
+
+def parse_log_rate_rules(spec: Optional[str]) -> Dict[str, LogRateRule]:
+    """
+    Parse rate limit rules from a string such as
+    ``"app.services.scheduler_service=5/60,app.services.blacklist_service=5/60:100"``
+
+    Each entry is ``logger=burst/window_seconds[:sample_every]``.
+    """
+    rules: Dict[str, LogRateRule] = {}
+    if not spec:
+        return rules
+
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+
+        try:
+            name, limit = entry.split("=", 1)
+            sample_every = 0
+            if ":" in limit:
+                limit, sample = limit.split(":", 1)
+                sample_every = int(sample)
+            burst, window = limit.split("/", 1)
+            rules[name.strip()] = LogRateRule(int(burst), float(window), sample_every)
+        except ValueError:
+            raise ValueError(f"Invalid log rate limit rule: {entry!r}")
+
+    return rules
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Filter that deduplicates repeated log records over a time window
+
+    Records are grouped by logger, level and the unformatted message template,
+    so hot-path calls should use lazy ``%s`` arguments rather than f-strings.
+    Records at ``passthrough_level`` or above are never suppressed. The first
+    record let through after a suppressed run notes how many were dropped.
+    """
+
+    max_keys = 10000
+
+    def __init__(self, rules: Dict[str, LogRateRule], passthrough_level: int = logging.WARNING):
+        super().__init__()
+        self.rules = rules
+        self.passthrough_level = passthrough_level
+        self.suppressed: Dict[str, int] = {}
+        self._rule_cache: Dict[str, Optional[LogRateRule]] = {}
+        # key -> [window_start, seen_in_window, suppressed_since_last_emit]
+        self._windows: Dict[tuple, list] = {}
+
+    def _rule_for(self, name: str) -> Optional[LogRateRule]:
+        try:
+            return self._rule_cache[name]
+        except KeyError:
+            pass
+
+        # Longest matching logger prefix wins
+        rule = None
+        candidate = name
+        while candidate:
+            if candidate in self.rules:
+                rule = self.rules[candidate]
+                break
+            candidate = candidate.rpartition(".")[0]
+
+        self._rule_cache[name] = rule
+        return rule
 
-        # Add user ID if available
-        if not hasattr(record, "user_id"):
-            record.user_id = getattr(self, "user_id", "N/A")
+    def filter(self, record):
+        if record.levelno >= self.passthrough_level:
+            return True
+
+        # The same record passes through every handler; decide only once
+        decision = record.__dict__.get("_rate_limited")
+        if decision is not None:
+            return not decision
+
+        allowed = self._allow(record)
+        record._rate_limited = not allowed
+        return allowed
+
+    def _allow(self, record) -> bool:
+        rule = self._rule_for(record.name)
+        if rule is None:
+            return True
+
+        now = time.monotonic()
+        key = (record.name, record.levelno, record.msg)
+        state = self._windows.get(key)
+
+        if state is None or now - state[0] >= rule.window:
+            if state is None and len(self._windows) >= self.max_keys:
+                self._windows.clear()
+            pending = state[2] if state else 0
+            state = [now, 0, pending]
+            self._windows[key] = state
+
+        state[1] += 1
+        seen = state[1]
+
+        if seen > rule.burst:
+            over = seen - rule.burst
+            if not rule.sample_every or over % rule.sample_every:
+                state[2] += 1
+                self.suppressed[record.name] = self.suppressed.get(record.name, 0) + 1
+                return False
+
+        if state[2]:
+            record.msg = f"{record.msg} ({state[2]} similar messages suppressed)"
+            state[2] = 0
 
         return True
 
 
+# Active rate limit filter, installed by setup_logging
+_rate_limit_filter: Optional[RateLimitFilter] = None
+
+
+def get_suppressed_log_counts() -> Dict[str, int]:
+    """
+    Get the number of suppressed log records per logger
+    """
+    if _rate_limit_filter is None:
+        return {}
+    return dict(_rate_limit_filter.suppressed)
+
+
 def setup_logging(
     log_level: str = "INFO",
     log_file: Optional[str] = None,
     json_format: bool = False,
     max_bytes: int = 10 * 1024 * 1024,  # 10MB
     backup_count: int = 5,
+    rate_limit_rules: Optional[str] = None,
 ) -> None:
     """
     Setup application logging configuration
@@ -104,11 +308,12 @@ def setup_logging(
         formatter = JSONFormatter()
     else:
         formatter = logging.Formatter(
-            fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+            fmt="%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s %(job_id)s] - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
         )
 
     detailed_formatter = logging.Formatter(
-        fmt="%(asctime)s - %(name)s - %(levelname)s - %(module)s:%(funcName)s:%(lineno)d - %(message)s",
+        fmt="%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s %(job_id)s user=%(user_id)s] - %(module)s:%(funcName)s:%(lineno)d - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
@@ -121,6 +326,13 @@ def setup_logging(
     context_filter = ContextFilter()
     console_handler.addFilter(context_filter)
 
+    # Add rate limit filter for noisy hot-path loggers
+    global _rate_limit_filter
+    rules = parse_log_rate_rules(rate_limit_rules)
+    _rate_limit_filter = RateLimitFilter(rules) if rules else None
+    if _rate_limit_filter:
+        console_handler.addFilter(_rate_limit_filter)
+
     root_logger.addHandler(console_handler)
 
     # File handler (if specified)
@@ -137,6 +349,8 @@ def setup_logging(
         file_handler.setLevel(numeric_level)
         file_handler.setFormatter(detailed_formatter if not json_format else formatter)
         file_handler.addFilter(context_filter)
+        if _rate_limit_filter:
+            file_handler.addFilter(_rate_limit_filter)
 
         root_logger.addHandler(file_handler)
 
@@ -193,16 +407,33 @@ class LoggerMixin:
 
 def log_function_call(func):
     """
-    Decorator to log function calls
+    Decorator to log function calls (sync or async)
     """
+    logger = logging.getLogger(func.__module__)
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            logger.debug("Calling %s with args=%s, kwargs=%s", func.__name__, args, kwargs)
+
+            try:
+                result = await func(*args, **kwargs)
+                logger.debug("%s completed successfully", func.__name__)
+                return result
+            except Exception as e:
+                logger.error(f"{func.__name__} failed with error: {str(e)}")
+                raise
 
+        return async_wrapper
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        logger = logging.getLogger(func.__module__)
-        logger.debug(f"Calling {func.__name__} with args={args}, kwargs={kwargs}")
+        logger.debug("Calling %s with args=%s, kwargs=%s", func.__name__, args, kwargs)
 
         try:
             result = func(*args, **kwargs)
-            logger.debug(f"{func.__name__} completed successfully")
+            logger.debug("%s completed successfully", func.__name__)
             return result
         except Exception as e:
             logger.error(f"{func.__name__} failed with error: {str(e)}")
@@ -213,21 +444,49 @@ def log_function_call(func):
 
 def log_execution_time(func):
     """
-    Decorator to log function execution time
-    """
-    import time
+    Decorator to log function execution time (sync or async)
 
+    The duration is also recorded in the function's latency histogram, see
+    ``app.core.metrics.timed``.
+    """
+    logger = logging.getLogger(func.__module__)
+    histogram = get_histogram(f"{func.__module__}.{func.__qualname__}")
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+
+            try:
+                result = await func(*args, **kwargs)
+                execution_time = time.perf_counter() - start_time
+                histogram.observe(execution_time)
+                logger.info("%s executed in %.4f seconds", func.__name__, execution_time)
+                return result
+            except Exception as e:
+                execution_time = time.perf_counter() - start_time
+                histogram.observe(execution_time)
+                histogram.errors += 1
+                logger.error(f"{func.__name__} failed after {execution_time:.4f} seconds: {str(e)}")
+                raise
+
+        return async_wrapper
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        logger = logging.getLogger(func.__module__)
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
             result = func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            logger.info(f"{func.__name__} executed in {execution_time:.4f} seconds")
+            execution_time = time.perf_counter() - start_time
+            histogram.observe(execution_time)
+            logger.info("%s executed in %.4f seconds", func.__name__, execution_time)
             return result
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
+            histogram.observe(execution_time)
+            histogram.errors += 1
             logger.error(f"{func.__name__} failed after {execution_time:.4f} seconds: {str(e)}")
             raise
 
@@ -0,0 +1,119 @@
+"""
+Event loop stall watchdog
+
+API handlers, the scheduler and every Telethon client share one event loop,
+so any blocking call (sync DB access, Fernet, bcrypt) delays all of them. The
+watchdog measures loop lag on a fixed tick and exports it as a histogram. A
+side thread notices when the tick stops advancing and captures the stack of
+the loop thread while it is still blocked, so the offending call can be found.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+loop_lag = metrics.histogram(
+    "event_loop_lag_seconds", "Delay of the event loop watchdog tick beyond its interval"
+)
+loop_stalls = metrics.counter("event_loop_stalls", "Event loop stalls above the threshold")
+
+
+class LoopWatchdog:
+    """
+    Measures event loop lag and captures the stack of blocking code
+    """
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.25):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        # Stack captured by the side thread during the current stall
+        self._stall_stack: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the watchdog on the running event loop"""
+        if self.running:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Event loop watchdog started (interval %.0f ms, threshold %.0f ms)",
+            self.interval * 1000,
+            self.stall_threshold * 1000,
+        )
+
+    async def stop(self) -> None:
+        """Stop the watchdog"""
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _tick(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+            lag = max(loop.time() - expected, 0.0)
+            loop_lag.observe(lag)
+
+            if lag >= self.stall_threshold:
+                loop_stalls.inc()
+                stack, self._stall_stack = self._stall_stack, None
+                logger.warning(
+                    "Event loop blocked for %.0f ms%s",
+                    lag * 1000,
+                    f", blocking code:\n{stack}" if stack else "",
+                )
+            else:
+                self._stall_stack = None
+
+    def _monitor(self) -> None:
+        """Side thread: capture the loop thread's stack while it is blocked"""
+        poll = min(self.interval, self.stall_threshold) / 2
+        captured_for = None
+
+        while not self._stop.wait(poll):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.stall_threshold or captured_for == heartbeat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self._stall_stack = "".join(traceback.format_stack(frame))
+                captured_for = heartbeat
+
+
+# Global instance
+loop_watchdog = LoopWatchdog()
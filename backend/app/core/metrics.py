@@ -0,0 +1,380 @@
+"""
+In-process metrics: latency histograms, counters, gauges and timing decorators
+
+Histograms use fixed buckets and plain integer counters, so recording a value
+is a bisect and two additions with no locking. Counters are plain dict
+increments. Updates come almost entirely from the event loop thread; an
+occasional lost increment from a worker thread is an accepted trade-off for
+keeping the hot path cheap.
+"""
+
+import functools
+import inspect
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# Upper bounds in seconds, from sub-millisecond DB calls to slow Telegram RPCs
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Upper bounds for per-request query counts
+DEFAULT_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with percentile estimation
+    """
+
+    __slots__ = ("name", "buckets", "counts", "sum", "count", "max", "errors")
+
+    def __init__(self, name: str, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.buckets = tuple(buckets)
+        # One extra slot for values above the last bucket
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self.errors = 0
+
+    def observe(self, value: float) -> None:
+        """Record a single value"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate the q-th quantile (0 < q <= 1) by linear interpolation
+        inside the bucket that contains it
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max)
+            cumulative += bucket_count
+
+        return self.max
+
+    def summary(self) -> dict:
+        """Get count, mean and p50/p95/p99 in milliseconds"""
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+    def reset(self) -> None:
+        """Clear all recorded values"""
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+        self.errors = 0
+
+
+# Function latency histograms, keyed by function name
+latency_histograms: Dict[str, Histogram] = {}
+
+
+def get_histogram(name: str) -> Histogram:
+    """
+    Get or create the latency histogram for a name
+    """
+    histogram = latency_histograms.get(name)
+    if histogram is None:
+        histogram = latency_histograms.setdefault(name, Histogram(name))
+    return histogram
+
+
+def get_latency_summary() -> Dict[str, dict]:
+    """
+    Get latency percentiles for every timed function
+    """
+    return {name: histogram.summary() for name, histogram in sorted(latency_histograms.items())}
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """
+    Decorator recording execution time of a sync or async function into a
+    latency histogram
+
+    For coroutine functions the time covers the awaited execution, not just
+    the creation of the coroutine object. Failed calls are recorded too and
+    counted as errors.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        histogram = get_histogram(name or f"{func.__module__}.{func.__qualname__}")
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception:
+                    histogram.errors += 1
+                    raise
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                histogram.errors += 1
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        """Increment the counter for the given label values"""
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        return [
+            (self.name + "_total", tuple(zip(self.label_names, labels)), value)
+            for labels, value in sorted(self.values.items())
+        ]
+
+
+class Gauge:
+    """
+    Gauge computed on scrape by a callback
+
+    The callback returns a number, or a mapping of label value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Union[float, Dict[Tuple[str, ...], float]]],
+        label_names: Sequence[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.label_names = tuple(label_names)
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        value = self.callback()
+        if isinstance(value, dict):
+            return [
+                (self.name, tuple(zip(self.label_names, labels)), number)
+                for labels, number in sorted(value.items())
+            ]
+        return [(self.name, (), value)]
+
+
+class HistogramVec:
+    """
+    Family of histograms partitioned by label values
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def labels(self, *label_values: str) -> Histogram:
+        """Get the histogram for the given label values"""
+        histogram = self.children.get(label_values)
+        if histogram is None:
+            histogram = self.children.setdefault(
+                label_values, Histogram(self.name, buckets=self.buckets)
+            )
+        return histogram
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Record a value for the given label values"""
+        self.labels(*label_values).observe(value)
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        samples = []
+        for label_values, histogram in sorted(self.children.items()):
+            samples.extend(
+                _histogram_samples(self.name, tuple(zip(self.label_names, label_values)), histogram)
+            )
+        return samples
+
+
+def _histogram_samples(name: str, labels: Tuple[Tuple[str, str], ...], histogram: Histogram):
+    samples = []
+    cumulative = 0
+    for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+        cumulative += bucket_count
+        samples.append((name + "_bucket", labels + (("le", _format_value(bound)),), cumulative))
+    samples.append((name + "_bucket", labels + (("le", "+Inf"),), histogram.count))
+    samples.append((name + "_sum", labels, histogram.sum))
+    samples.append((name + "_count", labels, histogram.count))
+    return samples
+
+
+class _FunctionLatency:
+    """
+    Exposes the timed() function histograms as one labelled family
+    """
+
+    kind = "histogram"
+    name = "function_duration_seconds"
+    documentation = "Execution time of instrumented functions"
+
+    def samples(self):
+        samples = []
+        for function, histogram in sorted(latency_histograms.items()):
+            samples.extend(_histogram_samples(self.name, (("function", function),), histogram))
+        return samples
+
+
+# Metrics exposed on /metrics, in registration order
+_registry: Dict[str, object] = {"function_duration_seconds": _FunctionLatency()}
+
+
+def _register(metric):
+    existing = _registry.get(metric.name)
+    if existing is not None:
+        return existing
+    _registry[metric.name] = metric
+    return metric
+
+
+def counter(name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+    """
+    Get or register a counter
+    """
+    return _register(Counter(name, documentation, label_names))
+
+
+def gauge(
+    name: str,
+    documentation: str,
+    callback: Callable[[], Union[float, Dict[Tuple[str, ...], float]]],
+    label_names: Sequence[str] = (),
+) -> Gauge:
+    """
+    Register a callback gauge (replacing any previous callback)
+    """
+    metric = Gauge(name, documentation, callback, label_names)
+    _registry[name] = metric
+    return metric
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    label_names: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+) -> HistogramVec:
+    """
+    Get or register a labelled histogram family
+    """
+    return _register(HistogramVec(name, documentation, label_names, buckets))
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus() -> str:
+    """
+    Render all registered metrics in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in list(_registry.values()):
+        try:
+            samples = metric.samples()
+        except Exception as e:  # A broken gauge callback must not break the scrape
+            lines.append(f"# {metric.name} unavailable: {type(e).__name__}")
+            continue
+
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for sample_name, labels, value in samples:
+            if labels:
+                label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels)
+                lines.append(f"{sample_name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{sample_name} {_format_value(value)}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,209 @@
+"""
+Full-text search
+
+Group names/usernames and message titles/content are indexed for substring
+search. On SQLite each table gets an external-content FTS5 table with the
+trigram tokenizer, kept in sync by triggers, and matches are ranked by bm25.
+Ranking a very common term would score every match, so only the first
+SEARCH_RANK_WINDOW matches (oldest rows first) are ranked.
+Other databases (and terms with tokens shorter than three characters, which a
+trigram index cannot answer) fall back to LIKE on the indexed columns, backed
+by pg_trgm GIN indexes on PostgreSQL.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import case, column, or_, select, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+# Trigram tokens are three characters, shorter search tokens never match
+MIN_TOKEN_LENGTH = 3
+
+# Matches scored per search; bm25 costs roughly 0.05 ms per match
+SEARCH_RANK_WINDOW = 250
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """A table and the text columns searched on it"""
+
+    table: str
+    columns: Tuple[str, ...]
+
+    @property
+    def fts_table(self) -> str:
+        return f"{self.table}_fts"
+
+
+GROUP_SEARCH = SearchIndex("groups", ("group_name", "username"))
+MESSAGE_SEARCH = SearchIndex("messages", ("title", "content"))
+SEARCH_INDEXES = (GROUP_SEARCH, MESSAGE_SEARCH)
+
+# FTS tables found missing at query time (e.g. SQLite built without FTS5)
+_unavailable_fts_tables: Set[str] = set()
+
+
+def _sqlite_search_ddl(index: SearchIndex) -> List[str]:
+    columns = ", ".join(index.columns)
+    new_values = ", ".join(f"new.{name}" for name in index.columns)
+    old_values = ", ".join(f"old.{name}" for name in index.columns)
+    fts = index.fts_table
+    insert_new = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    delete_old = (
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{columns}, content='{index.table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {index.table} "
+        f"BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {index.table} "
+        f"BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {index.table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def create_search_indexes(connection: Connection) -> None:
+    """
+    Create the search indexes for the connection's database
+
+    New SQLite FTS tables are filled from the existing rows.
+    """
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        for index in SEARCH_INDEXES:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": index.fts_table},
+            ).first()
+            try:
+                for statement in _sqlite_search_ddl(index):
+                    connection.execute(text(statement))
+                if not exists:
+                    connection.execute(
+                        text(f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('rebuild')")
+                    )
+            except OperationalError as e:
+                # SQLite before 3.34 has no trigram tokenizer; search uses LIKE
+                logger.warning("Full-text search unavailable for %s: %s", index.table, e)
+
+    elif dialect == "postgresql":
+        try:
+            with connection.begin_nested():
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                for index in SEARCH_INDEXES:
+                    for name in index.columns:
+                        connection.execute(
+                            text(
+                                f"CREATE INDEX IF NOT EXISTS ix_{index.table}_{name}_trgm "
+                                f"ON {index.table} USING gin ({name} gin_trgm_ops)"
+                            )
+                        )
+        except Exception as e:
+            # Creating the extension needs privileges; search still works unindexed
+            logger.warning("Trigram search indexes unavailable: %s", e)
+
+
+def drop_search_indexes(connection: Connection) -> None:
+    """
+    Drop the SQLite FTS tables and their triggers
+    """
+    if connection.dialect.name == "sqlite":
+        for index in SEARCH_INDEXES:
+            for suffix in ("ai", "ad", "au"):
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {index.fts_table}_{suffix}"))
+            connection.execute(text(f"DROP TABLE IF EXISTS {index.fts_table}"))
+
+
+def fts_match_query(term: str) -> Optional[str]:
+    """
+    Build an FTS5 MATCH expression requiring every token of term, or None if
+    the trigram index cannot answer it
+    """
+    tokens = term.split()
+    if not tokens or any(len(token) < MIN_TOKEN_LENGTH for token in tokens):
+        return None
+    # Quoted strings are matched literally, operators in the term have no effect
+    return " ".join('"' + token.replace('"', '""') + '"' for token in tokens)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fts_statement(
+    model: Any, index: SearchIndex, match: str, filters: Sequence[Any], window: int
+) -> Select:
+    fts = table(index.fts_table, column("rowid"), column("rank"), column(index.fts_table))
+    # rank is only computed for the rows the inner LIMIT lets through
+    candidates = (
+        select(model.id.label("id"), fts.c.rank.label("rank"))
+        .join(fts, fts.c.rowid == model.id)
+        .where(fts.c[index.fts_table].match(match), *filters)
+        .limit(window)
+        .subquery()
+    )
+    return (
+        select(model)
+        .join(candidates, candidates.c.id == model.id)
+        .order_by(candidates.c.rank, model.id)
+    )
+
+
+def _like_statement(model: Any, index: SearchIndex, term: str) -> Select:
+    columns = [getattr(model, name) for name in index.columns]
+    tokens = term.split()
+    conditions = [
+        or_(*(col.ilike(f"%{_escape_like(token)}%", escape="\\") for col in columns))
+        for token in tokens
+    ]
+    # Without a relevance score, names starting with the term come first
+    prefix_first = case((columns[0].ilike(f"{_escape_like(tokens[0])}%", escape="\\"), 0), else_=1)
+    return select(model).where(*conditions).order_by(prefix_first, columns[0], model.id)
+
+
+async def search(
+    db: AsyncSession,
+    model: Any,
+    index: SearchIndex,
+    term: str,
+    *filters: Any,
+    skip: int = 0,
+    limit: int = 100,
+) -> list:
+    """
+    Get model rows matching every token of term, best matches first
+    """
+    term = term.strip()
+    if not term:
+        return []
+
+    match = None
+    if db.bind.dialect.name == "sqlite" and index.fts_table not in _unavailable_fts_tables:
+        match = fts_match_query(term)
+
+    if match:
+        window = max(SEARCH_RANK_WINDOW, skip + limit)
+        statement = _fts_statement(model, index, match, filters, window)
+        try:
+            result = await db.execute(statement.offset(skip).limit(limit))
+            return result.scalars().all()
+        except OperationalError as e:
+            if index.fts_table not in str(e):
+                raise
+            logger.warning("Full-text search unavailable for %s, using LIKE", index.table)
+            _unavailable_fts_tables.add(index.fts_table)
+
+    statement = _like_statement(model, index, term).where(*filters)
+    result = await db.execute(statement.offset(skip).limit(limit))
+    return result.scalars().all()
@@ -2,19 +2,50 @@
 Base CRUD operations with optimized queries
 """
 
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy import and_, asc, desc, or_
+from sqlalchemy import and_, asc, desc, func, insert, inspect, or_, text, tuple_
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
-from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm import Session, joinedload, load_only, selectinload
 
 ModelType = TypeVar("ModelType", bound=Any)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def _cursor_value(column, value: Any) -> Any:
+    # Cursors are JSON, so dates and times come back as ISO strings
+    if isinstance(value, str):
+        python_type = column.type.python_type
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is date:
+            return date.fromisoformat(value)
+    return value
+
+
+# Filter value operators; dict values combine the range operators
+_FILTER_OPERATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "eq": lambda column, value: column == value,
+    "in": lambda column, value: column.in_(value),
+    "gte": lambda column, value: column >= value,
+    "lte": lambda column, value: column <= value,
+    "like": lambda column, value: column.like(f"%{value}%"),
+}
+_RANGE_OPERATORS = ("gte", "lte", "like")
+
+# Filter shapes are bounded by call sites; stop caching if callers generate them
+MAX_FILTER_SPECS = 256
+
+# (field, key into a dict value or None, column, operator) per applied filter
+FilterSpec = Tuple[Tuple[str, Optional[str], Any, Callable[[Any, Any], Any]], ...]
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
     Base CRUD class with optimized database operations
@@ -29,6 +60,11 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         * `schema`: A Pydantic model (schema) class
         """
         self.model = model
+        mapper = inspect(model)
+        self._column_names = {attr.key for attr in mapper.column_attrs}
+        self._primary_key = getattr(model, mapper.primary_key[0].key)
+        self._class_manager = mapper.class_manager
+        self._filter_specs: Dict[tuple, FilterSpec] = {}
 
     def get(
         self, db: Session, id: Any, eager_load: Optional[List[str]] = None
@@ -56,9 +92,15 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         order_by: Optional[str] = None,
         order_desc: bool = False,
         eager_load: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        columns: Optional[List[str]] = None,
     ) -> List[ModelType]:
         """
         Get multiple records with filtering, pagination, and eager loading
+
+        Pass the cursor from next_cursor() instead of skip to page by keyset,
+        which costs the same at any depth when order_by is indexed. columns
+        limits the loaded columns; the others load on first access.
         """
         query = db.query(self.model)
 
@@ -68,59 +110,148 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 if hasattr(self.model, relationship):
                     query = query.options(selectinload(getattr(self.model, relationship)))
 
-        # Apply filters
-        if filters:
-            for field, value in filters.items():
-                if hasattr(self.model, field):
-                    if isinstance(value, list):
-                        query = query.filter(getattr(self.model, field).in_(value))
-                    elif isinstance(value, dict):
-                        # Support for range queries
-                        if "gte" in value:
-                            query = query.filter(getattr(self.model, field) >= value["gte"])
-                        if "lte" in value:
-                            query = query.filter(getattr(self.model, field) <= value["lte"])
-                        if "like" in value:
-                            query = query.filter(
-                                getattr(self.model, field).like(f"%{value['like']}%")
-                            )
-                    else:
-                        query = query.filter(getattr(self.model, field) == value)
-
-        # Apply ordering
-        if order_by and hasattr(self.model, order_by):
-            if order_desc:
-                query = query.order_by(desc(getattr(self.model, order_by)))
-            else:
-                query = query.order_by(asc(getattr(self.model, order_by)))
+        # Only load the requested columns, plus the ordering column for cursors
+        if columns:
+            loaded = [name for name in columns if name in self._column_names]
+            if order_by in self._column_names and order_by not in loaded:
+                loaded.append(order_by)
+            if loaded:
+                query = query.options(load_only(*(getattr(self.model, name) for name in loaded)))
+
+        query = query.filter(*self._filter_clauses(filters))
+
+        order_column = self._order_column(order_by)
+        if cursor is not None:
+            if skip:
+                raise ValueError("skip cannot be combined with a cursor")
+            query = query.filter(self._keyset_clause(cursor, order_by, order_desc))
+
+        # Apply ordering, with the primary key as tie-breaker so pages are stable
+        if order_column is not None or cursor is not None:
+            direction = desc if order_desc else asc
+            if order_column is not None and order_column is not self._primary_key:
+                query = query.order_by(direction(order_column))
+            query = query.order_by(direction(self._primary_key))
 
         return query.offset(skip).limit(limit).all()
 
+    def next_cursor(
+        self,
+        items: List[ModelType],
+        *,
+        limit: int,
+        order_by: Optional[str] = None,
+        order_desc: bool = False,
+    ) -> Optional[str]:
+        """
+        Get the cursor for the page after items, or None on the last page
+        """
+        if len(items) < limit:
+            return None
+
+        last = items[-1]
+        order_column = self._order_column(order_by)
+        key = [getattr(last, self._primary_key.key)]
+        if order_column is not None and order_column is not self._primary_key:
+            key.insert(0, getattr(last, order_column.key))
+
+        payload = {"order": self._cursor_order(order_by, order_desc), "key": key}
+        data = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
     def count(self, db: Session, filters: Optional[Dict[str, Any]] = None) -> int:
         """
         Count records with optional filtering
         """
-        query = db.query(self.model)
-
-        # Apply filters
-        if filters:
-            for field, value in filters.items():
-                if hasattr(self.model, field):
-                    if isinstance(value, list):
-                        query = query.filter(getattr(self.model, field).in_(value))
-                    elif isinstance(value, dict):
-                        if "gte" in value:
-                            query = query.filter(getattr(self.model, field) >= value["gte"])
-                        if "lte" in value:
-                            query = query.filter(getattr(self.model, field) <= value["lte"])
-                        if "like" in value:
-                            query = query.filter(
-                                getattr(self.model, field).like(f"%{value['like']}%")
-                            )
-                    else:
-                        query = query.filter(getattr(self.model, field) == value)
-
-        return query.count()
+        query = db.query(func.count()).select_from(self.model)
+        return query.filter(*self._filter_clauses(filters)).scalar()
+
+    def _filter_spec(self, filters: Dict[str, Any]) -> FilterSpec:
+        # Shape: which fields are filtered and how, independent of the values
+        shape = tuple(
+            (
+                field,
+                (
+                    "in"
+                    if isinstance(value, list)
+                    else (
+                        tuple(key for key in _RANGE_OPERATORS if key in value)
+                        if isinstance(value, dict)
+                        else "eq"
+                    )
+                ),
+            )
+            for field, value in filters.items()
+        )
+
+        spec = self._filter_specs.get(shape)
+        if spec is None:
+            compiled = []
+            for field, kind in shape:
+                # Unknown fields are ignored
+                if field not in self._column_names:
+                    continue
+                column = getattr(self.model, field)
+                if isinstance(kind, tuple):
+                    compiled.extend((field, key, column, _FILTER_OPERATORS[key]) for key in kind)
+                else:
+                    compiled.append((field, None, column, _FILTER_OPERATORS[kind]))
+            spec = tuple(compiled)
+            if len(self._filter_specs) < MAX_FILTER_SPECS:
+                self._filter_specs[shape] = spec
+        return spec
+
+    def _filter_clauses(self, filters: Optional[Dict[str, Any]]) -> list:
+        if not filters:
+            return []
+        return [
+            operator(column, filters[field] if key is None else filters[field][key])
+            for field, key, column, operator in self._filter_spec(filters)
+        ]
+
+    def _order_column(self, order_by: Optional[str]):
+        if order_by and order_by in self._column_names:
+            return getattr(self.model, order_by)
+        return None
+
+    def _cursor_order(self, order_by: Optional[str], order_desc: bool) -> str:
+        order_column = self._order_column(order_by)
+        name = order_column.key if order_column is not None else self._primary_key.key
+        return f"{name}:{'desc' if order_desc else 'asc'}"
+
+    def _is_indexed(self, column) -> bool:
+        if column.primary_key or column.index or column.unique:
+            return True
+        return any(column.key in index.columns for index in self.model.__table__.indexes)
+
+    def _keyset_clause(self, cursor: str, order_by: Optional[str], order_desc: bool):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            key = list(payload["key"])
+            order = payload["order"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+
+        if order != self._cursor_order(order_by, order_desc):
+            raise ValueError("Cursor does not match the requested ordering")
+
+        order_column = self._order_column(order_by)
+        columns = [self._primary_key]
+        if order_column is not None and order_column is not self._primary_key:
+            if not self._is_indexed(order_column.property.columns[0]):
+                raise ValueError(f"Cursor pagination needs an index on {order_column.key}")
+            columns.insert(0, order_column)
+
+        if len(key) != len(columns):
+            raise ValueError("Invalid cursor")
+        values = [_cursor_value(column, value) for column, value in zip(columns, key)]
+
+        # Row value comparison, e.g. (created_at, id) > (:created_at, :id)
+        if len(columns) == 1:
+            left, right = columns[0], values[0]
+        else:
+            left, right = tuple_(*columns), tuple_(*values)
+        return left < right if order_desc else left > right
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         """
@@ -134,24 +265,33 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return db_obj
 
     def update(
-        self, db: Session, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        self,
+        db: Session,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        refresh: bool = False,
     ) -> ModelType:
         """
         Update an existing record
+
+        Server-side values such as updated_at load on first access after the
+        commit; pass refresh=True to load them right away.
         """
-        obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
 
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field, value in update_data.items():
+            if field in self._column_names:
+                setattr(db_obj, field, value)
 
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
+        # Without expire_on_commit nothing would reload the server-side values
+        if refresh or not db.expire_on_commit:
+            db.refresh(db_obj)
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> ModelType:
@@ -163,20 +303,70 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.commit()
         return obj
 
-    def bulk_create(self, db: Session, *, objs_in: List[CreateSchemaType]) -> List[ModelType]:
+    def bulk_create(
+        self,
+        db: Session,
+        *,
+        objs_in: List[Union[CreateSchemaType, Dict[str, Any]]],
+        chunk_size: int = 1000,
+    ) -> List[ModelType]:
         """
         Bulk create multiple records efficiently
+
+        Rows are inserted with one executemany per chunk and every row must set
+        the same columns. Generated values come back through RETURNING where
+        the driver supports it (PostgreSQL); on SQLite only primary keys are
+        filled in. The returned objects are not attached to the session.
         """
-        db_objs = []
+        rows = []
         for obj_in in objs_in:
-            obj_in_data = jsonable_encoder(obj_in)
-            db_obj = self.model(**obj_in_data)
-            db_objs.append(db_obj)
+            data = obj_in if isinstance(obj_in, dict) else obj_in.dict()
+            rows.append({key: value for key, value in data.items() if key in self._column_names})
+
+        db_objs = []
+        for start in range(0, len(rows), chunk_size):
+            db_objs.extend(self._insert_chunk(db, rows[start : start + chunk_size]))
 
-        db.bulk_save_objects(db_objs, return_defaults=True)
         db.commit()
         return db_objs
 
+    def _build_objects(self, rows) -> List[ModelType]:
+        # The declarative constructor fires an attribute event per column and
+        # dominated import time; stored rows need no change tracking
+        db_objs = []
+        for row in rows:
+            db_obj = self._class_manager.new_instance()
+            db_obj.__dict__.update(row)
+            db_objs.append(db_obj)
+        return db_objs
+
+    def _insert_chunk(self, db: Session, rows: List[Dict[str, Any]]) -> List[ModelType]:
+        table = self.model.__table__
+        dialect = db.get_bind().dialect
+        pk = self._primary_key.key
+
+        if dialect.insert_executemany_returning:
+            result = db.execute(insert(table).returning(*table.c), rows)
+            return self._build_objects(result.mappings())
+
+        if dialect.name == "sqlite":
+            db.execute(insert(table), rows)
+            if pk not in rows[0]:
+                # The write lock is held from the first row, so no other
+                # connection can take rowids in between: they are consecutive
+                last_id = db.execute(text("SELECT last_insert_rowid()")).scalar()
+                first_id = last_id - len(rows) + 1
+                rows = [{**row, pk: first_id + offset} for offset, row in enumerate(rows)]
+            return self._build_objects(rows)
+
+        # Other databases: let the ORM fetch generated keys row by row
+        db_objs = [self.model(**row) for row in rows]
+        db.add_all(db_objs)
+        db.flush()
+        for db_obj in db_objs:
+            db.expunge(db_obj)
+        return db_objs
+
     def bulk_update(self, db: Session, *, updates: List[Dict[str, Any]]) -> None:
         """
         Bulk update multiple records efficiently
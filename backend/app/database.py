@@ -0,0 +1,383 @@
+"""
+Database engine and session management
+
+SQLite connections are tuned on connect (WAL journal, relaxed fsync, busy
+timeout, larger page cache, memory-mapped I/O) so the scheduler's short write
+transactions, API reads and backups do not serialize on the database file
+lock. Pool sizes come from Settings for every backend.
+
+API handlers and the scheduler run on the event loop and use the async engine
+(aiosqlite or asyncpg). The sync engine remains for table creation, scripts
+and code running outside the loop. On PostgreSQL, both engines pre-ping pooled
+connections and the async engine keeps a per-connection prepared statement
+cache.
+
+Analytics and list endpoints read through a separate read-only async engine
+(get_read_db): a replica when DATABASE_READ_URL is set, otherwise its own pool
+of WAL reader connections on the primary. Long scans then never occupy the
+connections the scheduler commits on, and WAL readers do not block its writes.
+"""
+
+import logging
+from typing import AsyncGenerator, Dict, Generator, Optional
+
+from sqlalchemy import create_engine, delete, event, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+from app.core.config import Settings, get_database_url, get_read_database_url, get_settings
+from app.core.search import create_search_indexes
+
+logger = logging.getLogger(__name__)
+
+Base = declarative_base()
+
+
+def sqlite_pragmas_from_settings(settings: Settings) -> Dict[str, object]:
+    """
+    Get the SQLite pragmas applied to every new connection
+    """
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        # Negative cache_size is in KiB rather than pages
+        "cache_size": -settings.sqlite_cache_size_kib,
+        "mmap_size": settings.sqlite_mmap_size_mb * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+
+def _is_memory_database(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def _install_sqlite_pragmas(engine: Engine, pragmas: Dict[str, object]) -> None:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def create_db_engine(
+    url: str,
+    *,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: int = 30,
+    pool_recycle: int = 1800,
+    sqlite_pragmas: Optional[Dict[str, object]] = None,
+    application_name: Optional[str] = None,
+    echo: bool = False,
+) -> Engine:
+    """
+    Create a database engine with pooling and, for SQLite, connection pragmas
+
+    pool_recycle applies to SQLite files too; in-memory databases use a single
+    static connection, which is never recycled.
+    """
+    if url.startswith("sqlite"):
+        if _is_memory_database(url):
+            # A single shared connection, otherwise every connection gets its own database
+            engine = create_engine(
+                url,
+                connect_args={"check_same_thread": False},
+                poolclass=StaticPool,
+                echo=echo,
+            )
+        else:
+            busy_timeout = (sqlite_pragmas or {}).get("busy_timeout", 5000)
+            engine = create_engine(
+                url,
+                connect_args={"check_same_thread": False, "timeout": int(busy_timeout) / 1000},
+                # Keep connections open so page cache and mmap survive between requests
+                poolclass=QueuePool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
+                echo=echo,
+            )
+
+        if sqlite_pragmas:
+            pragmas = dict(sqlite_pragmas)
+            if _is_memory_database(url):
+                pragmas.pop("journal_mode", None)
+                pragmas.pop("mmap_size", None)
+            _install_sqlite_pragmas(engine, pragmas)
+
+        return engine
+
+    connect_args = {}
+    if url.startswith("postgresql") and application_name:
+        connect_args["application_name"] = application_name
+
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=True,
+        echo=echo,
+    )
+
+
+def get_async_database_url(url: str) -> str:
+    """
+    Get the async driver URL for a sync database URL
+    """
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:") :]
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    if url.startswith("postgresql+psycopg2:"):
+        return "postgresql+asyncpg:" + url[len("postgresql+psycopg2:") :]
+    return url
+
+
+def create_async_db_engine(
+    url: str,
+    *,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: int = 30,
+    pool_recycle: int = 1800,
+    sqlite_pragmas: Optional[Dict[str, object]] = None,
+    statement_cache_size: int = 100,
+    application_name: Optional[str] = None,
+    read_only: bool = False,
+    echo: bool = False,
+) -> AsyncEngine:
+    """
+    Create an async database engine with the same pooling and pragmas as
+    create_db_engine()
+
+    On PostgreSQL (asyncpg) statements are prepared server-side and cached per
+    connection, up to statement_cache_size; 0 disables the cache. read_only
+    connections reject writes (query_only on SQLite, read-only transactions on
+    PostgreSQL).
+    """
+    url = get_async_database_url(url)
+    if read_only and url.startswith("sqlite"):
+        # After journal_mode, which may still need to switch a new database to WAL
+        sqlite_pragmas = {**(sqlite_pragmas or {}), "query_only": "ON"}
+
+    if url.startswith("sqlite"):
+        if _is_memory_database(url):
+            engine = create_async_engine(url, poolclass=StaticPool, echo=echo)
+        else:
+            engine = create_async_engine(
+                url,
+                poolclass=AsyncAdaptedQueuePool,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle,
+                echo=echo,
+            )
+
+        if sqlite_pragmas:
+            pragmas = dict(sqlite_pragmas)
+            if _is_memory_database(url):
+                pragmas.pop("journal_mode", None)
+                pragmas.pop("mmap_size", None)
+            # The connect event fires on the adapted DBAPI connection of the sync engine
+            _install_sqlite_pragmas(engine.sync_engine, pragmas)
+
+        return engine
+
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        connect_args["prepared_statement_cache_size"] = statement_cache_size
+        server_settings = {}
+        if application_name:
+            server_settings["application_name"] = application_name
+        if read_only:
+            server_settings["default_transaction_read_only"] = "on"
+        if server_settings:
+            connect_args["server_settings"] = server_settings
+
+    return create_async_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=True,
+        echo=echo,
+    )
+
+
+def _create_default_engine() -> Engine:
+    settings = get_settings()
+    return create_db_engine(
+        get_database_url(),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        sqlite_pragmas=sqlite_pragmas_from_settings(settings),
+        application_name=settings.db_application_name,
+    )
+
+
+def _create_default_async_engine() -> AsyncEngine:
+    settings = get_settings()
+    return create_async_db_engine(
+        get_database_url(),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        sqlite_pragmas=sqlite_pragmas_from_settings(settings),
+        statement_cache_size=settings.db_statement_cache_size,
+        application_name=settings.db_application_name,
+    )
+
+
+def _create_default_read_async_engine() -> AsyncEngine:
+    url = get_read_database_url()
+    if _is_memory_database(url):
+        # Another engine would open a different in-memory database
+        return async_engine
+
+    settings = get_settings()
+    return create_async_db_engine(
+        url,
+        pool_size=settings.db_read_pool_size,
+        max_overflow=settings.db_read_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        sqlite_pragmas=sqlite_pragmas_from_settings(settings),
+        statement_cache_size=settings.db_statement_cache_size,
+        application_name=f"{settings.db_application_name}-read",
+        read_only=True,
+    )
+
+
+engine = _create_default_engine()
+async_engine = _create_default_async_engine()
+read_async_engine = _create_default_read_async_engine()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Objects stay usable after commit; lazy attribute loads are not possible outside a greenlet
+AsyncSessionLocal = sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+ReadAsyncSessionLocal = sessionmaker(
+    read_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+def create_tables(bind: Optional[Engine] = None) -> None:
+    """
+    Create missing tables, indexes and full-text search indexes
+
+    create_all() skips tables that already exist, including indexes added to
+    their models later, so those are created separately.
+    """
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+
+    with bind.begin() as connection:
+        _remove_duplicate_blacklist_entries(connection)
+
+    # A failure here stops startup: the blacklist upsert needs its unique index
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+    with bind.begin() as connection:
+        create_search_indexes(connection)
+
+
+def _remove_duplicate_blacklist_entries(connection: Connection) -> None:
+    """
+    Keep only the newest blacklist entry per user and group
+
+    Databases created before uq_blacklist_user_group existed may hold
+    duplicates, which would stop the unique index from being created.
+    """
+    blacklist = Base.metadata.tables["blacklist"]
+    index_names = {index["name"] for index in inspect(connection).get_indexes("blacklist")}
+    if "uq_blacklist_user_group" in index_names:
+        return
+
+    newest = select(func.max(blacklist.c.id)).group_by(blacklist.c.user_id, blacklist.c.group_id)
+    result = connection.execute(delete(blacklist).where(blacklist.c.id.not_in(newest)))
+    if result.rowcount:
+        logger.warning("Removed %d duplicate blacklist entries", result.rowcount)
+
+
+def get_db() -> Generator[Session, None, None]:
+    """
+    Database session dependency
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async database session dependency
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Read-only database session dependency for analytics and list endpoints
+
+    With a replica, results may lag the primary by the replication delay.
+    """
+    async with ReadAsyncSessionLocal() as db:
+        yield db
+
+
+async def ping_db() -> bool:
+    """
+    Check that the database accepts connections
+    """
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+    return True
+
+
+async def connect_db() -> None:
+    """
+    Open the first pooled connection and report the effective SQLite settings
+    """
+    async with async_engine.connect() as connection:
+        if async_engine.dialect.name == "sqlite":
+            journal_mode = (await connection.execute(text("PRAGMA journal_mode"))).scalar()
+            synchronous = (await connection.execute(text("PRAGMA synchronous"))).scalar()
+            logger.info(
+                "SQLite connected (journal_mode=%s, synchronous=%s)", journal_mode, synchronous
+            )
+        else:
+            await connection.execute(text("SELECT 1"))
+
+
+async def disconnect_db() -> None:
+    """
+    Close all pooled connections
+    """
+    await async_engine.dispose()
+    if read_async_engine is not async_engine:
+        await read_async_engine.dispose()
+    engine.dispose()
@@ -2,32 +2,41 @@
 Main FastAPI application with production-ready configuration
 """
 
+import hmac
 import logging.config
 import os
 from contextlib import asynccontextmanager
+from datetime import datetime
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Load environment variables
 load_dotenv()
 
 # Import API routers
-from app.api.v1 import auth, blacklist, groups, messages, scheduler, settings
+from app.api.v1 import auth, blacklist, dashboard, groups, messages, scheduler
+from app.api.v1 import settings as settings_api
 
 # Import core modules
+from app.core import db_instrumentation, metrics
 from app.core.config import get_logging_config, get_settings
-from app.core.exceptions import setup_exception_handlers
-from app.core.logging import setup_logging
+from app.core.logging import get_suppressed_log_counts, setup_logging
+from app.core.loop_watchdog import loop_watchdog
+from app.core.metrics import get_latency_summary
+from app.core.serialization import DefaultResponse
 
 # Import database
-from app.database import Base, connect_db, disconnect_db, engine
+from app.database import connect_db, create_tables, disconnect_db, ping_db
+from app.middleware.compression import CompressionMiddleware
 from app.middleware.cors import configure_cors_middleware
 from app.middleware.error_handler import setup_exception_handlers
 from app.middleware.rate_limiting import rate_limit_middleware
+from app.middleware.request_context import request_context_middleware
 
 # Import services
+from app.services.log_service import log_writer
 from app.services.scheduler_service import scheduler_service
 
 # Get settings
@@ -35,11 +44,32 @@ settings = get_settings()
 
 # Setup logging
 setup_logging(
-    log_level=settings.log_level, log_file=settings.log_file, json_format=settings.is_production
+    log_level=settings.log_level,
+    log_file=settings.log_file,
+    json_format=settings.is_production,
+    rate_limit_rules=settings.log_rate_limits,
 )
 
 logger = logging.getLogger(__name__)
 
+# Configure query instrumentation (importing the module registers the engine hooks)
+db_instrumentation.configure(
+    slow_query_ms=settings.db_slow_query_ms,
+    repeated_statement_threshold=settings.db_repeated_statement_threshold,
+    explain_slow_queries=(
+        settings.is_development
+        if settings.db_explain_slow_queries is None
+        else settings.db_explain_slow_queries
+    ),
+)
+
+metrics.gauge(
+    "log_records_suppressed",
+    "Log records dropped by the rate limit filter",
+    lambda: {(name,): count for name, count in get_suppressed_log_counts().items()},
+    ["logger"],
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -49,13 +79,24 @@ async def lifespan(app: FastAPI):
 
     try:
         # Create database tables
-        Base.metadata.create_all(bind=engine)
+        create_tables()
         logger.info("Database tables created/verified")
 
         # Connect to database
         await connect_db()
         logger.info("Database connected")
 
+        # Start send log writer
+        log_writer.batch_size = settings.log_batch_size
+        log_writer.flush_interval = settings.log_flush_interval_ms / 1000
+        log_writer.start()
+
+        # Start event loop watchdog
+        if settings.loop_watchdog_enabled:
+            loop_watchdog.interval = settings.loop_watchdog_interval_ms / 1000
+            loop_watchdog.stall_threshold = settings.loop_stall_threshold_ms / 1000
+            loop_watchdog.start()
+
         # Start scheduler
         scheduler_service.start_scheduler()
         logger.info("Scheduler started")
@@ -81,15 +122,22 @@ async def lifespan(app: FastAPI):
         scheduler_service.stop_scheduler()
         logger.info("Scheduler stopped")
 
-        # Disconnect from database
-        await disconnect_db()
-        logger.info("Database disconnected")
-
         logger.info("Application shutdown completed successfully")
 
     except Exception as e:
         logger.error(f"Application shutdown failed: {str(e)}")
 
+    finally:
+        # Write buffered send logs
+        await log_writer.stop()
+
+        # Stop event loop watchdog
+        await loop_watchdog.stop()
+
+        # Disconnect from database, otherwise open aiosqlite threads keep the process alive
+        await disconnect_db()
+        logger.info("Database disconnected")
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -97,11 +145,22 @@ app = FastAPI(
     description="Production-ready API for automating Telegram message sending using user accounts",
     version=settings.app_version,
     lifespan=lifespan,
+    default_response_class=DefaultResponse,
     docs_url="/docs" if settings.is_development else None,
     redoc_url="/redoc" if settings.is_development else None,
     openapi_url="/openapi.json" if settings.is_development else None,
 )
 
+# Add response compression (innermost, so it sees whole bodies and can skip small ones)
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+    )
+    logger.info("Response compression middleware configured")
+
 # Configure CORS
 cors_configured = configure_cors_middleware(app)
 if cors_configured:
@@ -113,6 +172,10 @@ else:
 app.middleware("http")(rate_limit_middleware)
 logger.info("Rate limiting middleware configured")
 
+# Add request context middleware (outermost, so every log line carries a request ID)
+app.middleware("http")(request_context_middleware)
+logger.info("Request context middleware configured")
+
 # Setup exception handlers
 setup_exception_handlers(app)
 logger.info("Exception handlers configured")
@@ -123,7 +186,8 @@ app.include_router(messages.router, prefix="/api/v1", tags=["Messages"])
 app.include_router(groups.router, prefix="/api/v1", tags=["Groups"])
 app.include_router(blacklist.router, prefix="/api/v1", tags=["Blacklist"])
 app.include_router(scheduler.router, prefix="/api/v1", tags=["Scheduler"])
-app.include_router(settings.router, prefix="/api/v1", tags=["Settings"])
+app.include_router(settings_api.router, prefix="/api/v1", tags=["Settings"])
+app.include_router(dashboard.router, prefix="/api/v1", tags=["Dashboard"])
 
 logger.info("API routers configured")
 
@@ -136,7 +200,7 @@ async def health_check():
     """
     try:
         # Check database connection
-        from app.database import database
+        await ping_db()
 
         # Check scheduler status
         scheduler_running = (
@@ -149,7 +213,7 @@ async def health_check():
             "version": settings.app_version,
             "database": "connected",
             "scheduler": "running" if scheduler_running else "stopped",
-            "timestamp": "2024-01-01T00:00:00Z",  # Will be replaced with actual timestamp
+            "timestamp": datetime.utcnow().isoformat() + "Z",
         }
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
@@ -162,6 +226,30 @@ async def health_check():
         )
 
 
+# Metrics endpoint
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """
+    Prometheus metrics endpoint
+    """
+    if not settings.metrics_enabled or not (settings.metrics_token or settings.is_development):
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}".encode()
+        provided = request.headers.get("Authorization", "").encode()
+        if not hmac.compare_digest(provided, expected):
+            return JSONResponse(
+                status_code=401,
+                content={"detail": "Invalid metrics token"},
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+    return PlainTextResponse(
+        metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
@@ -174,6 +262,7 @@ async def root():
         "environment": settings.environment,
         "docs": "/docs" if settings.is_development else "Documentation not available in production",
         "health": "/health",
+        "metrics": "/metrics",
         "api": {
             "base_url": "/api/v1",
             "endpoints": {
@@ -207,6 +296,7 @@ async def api_info():
                 if hasattr(scheduler_service, "running_jobs")
                 else 0
             ),
+            "latency": get_latency_summary(),
             "features": [
                 "Telegram user account authentication",
                 "Message template management",
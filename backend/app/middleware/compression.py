@@ -0,0 +1,220 @@
+"""
+Response Compression Middleware
+Compresses text and JSON responses with brotli or gzip, whichever the client
+prefers in Accept-Encoding (brotli only when the brotli package is installed).
+Complete bodies smaller than the minimum size are sent as they are. Streamed
+bodies are compressed chunk by chunk and flushed after every chunk, so
+progress output reaches the client as it is produced. Server-Sent Events,
+304 responses and already encoded bodies are passed through untouched.
+"""
+
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+# Every event must reach the client as soon as it is sent
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+compressed_responses = metrics.counter(
+    "compressed_responses", "Responses sent compressed by encoding", ["encoding"]
+)
+compression_bytes = metrics.counter(
+    "compression_bytes",
+    "Body bytes before (in) and after (out) compression",
+    ["encoding", "direction"],
+)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Get the quality value of each coding in an Accept-Encoding header"""
+    weights = {}
+    for part in header.split(","):
+        coding, *params = part.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """Pick the content coding for a request, or None to send identity"""
+    weights = parse_accept_encoding(header)
+    available = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    best, best_weight = None, 0.0
+    for coding in available:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        # Ties keep the earlier coding, so brotli wins over gzip
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class _Compressor:
+    """Incremental brotli or gzip stream"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(mode=brotli.MODE_TEXT, quality=brotli_quality)
+        else:
+            # wbits 31 writes the gzip header and trailer
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Compress data; with flush, everything so far can be decoded"""
+        if self.encoding == "br":
+            return self._brotli.process(data) + (self._brotli.flush() if flush else b"")
+        return self._zlib.compress(data) + (self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compress eligible responses; add inside the function middlewares, which
+    stream every body they pass on
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 1,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Rewrites one response's messages"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if not self._compressible(message["status"], headers):
+                self.passthrough = True
+                await self._send(message)
+                return
+
+            # The body may be compressed for other requests to this URL
+            headers.add_vary_header("Accept-Encoding")
+            if self.encoding is None:
+                self.passthrough = True
+                await self._send(message)
+                return
+
+            # Headers depend on the body, hold them until it arrives
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self._send(start)
+                await self._send(message)
+                return
+
+            self.compressor = _Compressor(
+                self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality
+            )
+            headers["Content-Encoding"] = self.encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The compressed bytes differ, so the validator can only be weak
+                headers["ETag"] = f"W/{etag}"
+
+            body = self._compress(body, more_body)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+            await self._send(start)
+            await self._send({**message, "body": body})
+            return
+
+        await self._send({**message, "body": self._compress(body, more_body)})
+
+    def _compressible(self, status: int, headers: MutableHeaders) -> bool:
+        if status < 200 or status in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        if content_type.startswith(UNCOMPRESSED_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if more_body:
+            # Flush every chunk so streamed progress is not held back
+            compressed = self.compressor.compress(body, flush=True) if body else b""
+        else:
+            compressed = self.compressor.finish(body)
+            compressed_responses.inc(self.encoding)
+
+        compression_bytes.inc(self.encoding, "in", amount=len(body))
+        compression_bytes.inc(self.encoding, "out", amount=len(compressed))
+        return compressed
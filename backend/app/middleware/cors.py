@@ -54,8 +54,10 @@ def configure_cors_middleware(app):
                 "Content-Type",
                 "Authorization",
                 "X-Requested-With",
+                # Sent by the scheduler event stream to resume after a reconnect
+                "Last-Event-ID",
             ],
-            expose_headers=["X-Total-Count"],
+            expose_headers=["X-Total-Count", "X-Request-ID", "X-DB-Query-Count", "X-DB-Time-Ms"],
             max_age=600,  # Cache preflight requests for 10 minutes
         )
 
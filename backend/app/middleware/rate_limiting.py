@@ -12,6 +12,9 @@ from typing import Deque, Dict
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 
+from app.core import metrics
+from app.core.config import get_settings
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,7 +23,8 @@ class RateLimiter:
     Token bucket rate limiter implementation
     """
 
-    def __init__(self, max_requests: int = 60, window_seconds: int = 60):
+    def __init__(self, max_requests: int = 60, window_seconds: int = 60, name: str = "default"):
+        self.name = name
         self.max_requests = max_requests
         self.window_seconds = window_seconds
         self.clients: Dict[str, Deque[float]] = defaultdict(deque)
@@ -74,12 +78,16 @@ class RateLimiter:
 
 # Global rate limiters for different endpoints
 rate_limiters = {
-    "default": RateLimiter(max_requests=60, window_seconds=60),  # 60 requests per minute
-    "auth": RateLimiter(max_requests=5, window_seconds=300),  # 5 requests per 5 minutes
-    "messages": RateLimiter(max_requests=10, window_seconds=60),  # 10 requests per minute
-    "scheduler": RateLimiter(max_requests=20, window_seconds=60),  # 20 requests per minute
+    "default": RateLimiter(60, 60, name="default"),  # 60 requests per minute
+    "auth": RateLimiter(5, 300, name="auth"),  # 5 requests per 5 minutes
+    "messages": RateLimiter(10, 60, name="messages"),  # 10 requests per minute
+    "scheduler": RateLimiter(20, 60, name="scheduler"),  # 20 requests per minute
 }
 
+rate_limit_rejections = metrics.counter(
+    "http_rate_limited", "Requests rejected by the rate limiter", ["limiter"]
+)
+
 
 def get_client_id(request: Request) -> str:
     """
@@ -117,8 +125,11 @@ async def rate_limit_middleware(request: Request, call_next):
     """
     Rate limiting middleware
     """
-    # Skip rate limiting for health checks and docs
-    if request.url.path in ["/health", "/docs", "/redoc", "/openapi.json"]:
+    # Skip rate limiting for health checks and docs, and for /metrics only when
+    # scrapes have to present a token
+    if request.url.path in ["/health", "/docs", "/redoc", "/openapi.json"] or (
+        request.url.path == "/metrics" and get_settings().metrics_token
+    ):
         return await call_next(request)
 
     client_id = get_client_id(request)
@@ -131,6 +142,7 @@ async def rate_limit_middleware(request: Request, call_next):
             remaining = await rate_limiter.get_remaining_requests(client_id)
             reset_time = await rate_limiter.get_reset_time(client_id)
 
+            rate_limit_rejections.inc(rate_limiter.name)
             logger.warning(f"Rate limit exceeded for client {client_id} on path {request.url.path}")
 
             return JSONResponse(
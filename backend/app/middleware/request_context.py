@@ -0,0 +1,54 @@
+"""
+Request Context Middleware
+Assigns a request ID to every request and exposes it to the logging layer,
+and attributes database statements to the request for /metrics and the
+N+1 detector
+"""
+
+import re
+import uuid
+
+from fastapi import Request
+
+from app.core.config import get_settings
+from app.core.db_instrumentation import track_queries
+from app.core.logging import log_context
+
+REQUEST_ID_HEADER = "X-Request-ID"
+DB_QUERY_COUNT_HEADER = "X-DB-Query-Count"
+DB_TIME_HEADER = "X-DB-Time-Ms"
+
+# Accept client supplied IDs only if they are short and log-safe
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def get_request_id(request: Request) -> str:
+    """
+    Get request ID from incoming headers or generate a new one
+    """
+    incoming = request.headers.get(REQUEST_ID_HEADER)
+    if incoming and _VALID_REQUEST_ID.match(incoming):
+        return incoming
+
+    return uuid.uuid4().hex
+
+
+async def request_context_middleware(request: Request, call_next):
+    """
+    Request context middleware
+    """
+    request_id = get_request_id(request)
+    request.state.request_id = request_id
+
+    label = f"{request.method} {request.url.path}"
+    with log_context(request_id=request_id), track_queries(label) as query_stats:
+        response = await call_next(request)
+
+    response.headers[REQUEST_ID_HEADER] = request_id
+
+    # Expose per-request database cost while developing
+    if get_settings().is_development:
+        response.headers[DB_QUERY_COUNT_HEADER] = str(query_stats.count)
+        response.headers[DB_TIME_HEADER] = f"{query_stats.total_time * 1000:.2f}"
+
+    return response
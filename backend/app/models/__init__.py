@@ -1,22 +1,32 @@
 from .database import Blacklist, Group, Log, Message, Settings, User
 from .schemas import (
     AuthResponse,
-    BlacklistCreate,
+    BatchItem,
+    BatchItemResult,
+    BatchRequest,
+    BatchResponse,
     BlacklistResponse,
+    BlacklistStats,
+    CountStats,
+    DashboardSummary,
     ErrorResponse,
     GroupBase,
     GroupCreate,
+    GroupImportRequest,
     GroupResponse,
     LoginRequest,
     LogResponse,
+    LogStats,
     MessageBase,
     MessageCreate,
     MessageResponse,
+    MessageResponseGeneric,
+    MessageUpdate,
     SchedulerStatus,
-    SettingsUpdate,
     SettingsResponse,
+    SettingsUpdate,
     UserCreate,
     UserResponse,
+    Verify2FARequest,
+    VerifyCodeRequest,
 )
-
-
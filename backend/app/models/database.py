@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -59,6 +59,10 @@ class Group(Base):
 
 class Blacklist(Base):
     __tablename__ = "blacklist"
+    __table_args__ = (
+        # One entry per user and group, add_to_blacklist upserts against it
+        Index("uq_blacklist_user_group", "user_id", "group_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -74,6 +78,10 @@ class Blacklist(Base):
 
 class Log(Base):
     __tablename__ = "logs"
+    __table_args__ = (
+        # Per-user log listings and stats filter on user and time, newest first
+        Index("ix_logs_user_created", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,8 +1,8 @@
 import re
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
 
 
 # Base schemas
@@ -83,6 +83,9 @@ class MessageResponse(MessageBase):
 
 
 # Group schemas
+GROUP_IMPORT_MAX_ITEMS = 500
+
+
 class GroupBase(BaseModel):
     group_input: str  # Can be link, ID, or username
 
@@ -97,6 +100,10 @@ class GroupCreate(GroupBase):
     pass
 
 
+class GroupImportRequest(BaseModel):
+    group_inputs: List[str] = Field(..., min_length=1, max_length=GROUP_IMPORT_MAX_ITEMS)
+
+
 class GroupResponse(BaseModel):
     id: int
     user_id: int
@@ -192,6 +199,66 @@ class SchedulerStatus(BaseModel):
     blacklisted_groups: int
 
 
+class CountStats(BaseModel):
+    total: int
+    active: int
+    inactive: int
+
+
+class BlacklistStats(BaseModel):
+    total: int
+    permanent: int
+    temporary_active: int
+    temporary_expired: int
+    active: int
+
+
+class LogStats(BaseModel):
+    total: int
+    success: int
+    failed: int
+    blacklisted: int
+    success_rate: float
+    hours: int
+
+
+class DashboardSummary(BaseModel):
+    scheduler: SchedulerStatus
+    messages: CountStats
+    groups: CountStats
+    blacklist: BlacklistStats
+    logs: LogStats
+
+
+# Batch schemas
+BATCH_MAX_ITEMS = 500
+
+BatchAction = Literal["activate", "deactivate", "toggle", "delete"]
+
+
+class BatchItem(BaseModel):
+    id: int
+    action: BatchAction
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class BatchItemResult(BaseModel):
+    id: int
+    action: BatchAction
+    success: bool
+    is_active: Optional[bool] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+
 # Generic response schemas
 class MessageResponseGeneric(BaseModel):
     message: str
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from datetime import datetime, timedelta
 from typing import Optional
@@ -5,8 +6,8 @@ from typing import Optional
 from dotenv import load_dotenv
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import LoginRequest, Settings, User, UserCreate, Verify2FARequest, VerifyCodeRequest
 from app.services.telegram_service import telegram_service
@@ -47,28 +48,35 @@ class AuthService:
         except JWTError:
             return None
 
-    def get_user_by_phone(self, db: Session, phone_number: str) -> Optional[User]:
+    async def get_user_by_phone(self, db: AsyncSession, phone_number: str) -> Optional[User]:
         """Get user by phone number"""
         # Normalize phone number
         normalized_phone = normalize_phone_number(phone_number)
 
-        # Since phone numbers are encrypted, we need to check all users
-        users = db.query(User).all()
-        for user in users:
-            try:
-                decrypted_phone = encryption_manager.decrypt(user.phone_number)
-                if normalize_phone_number(decrypted_phone) == normalized_phone:
-                    return user
-            except:
-                continue
+        # Since phone numbers are encrypted, we need to check all users. This is
+        # O(n) Fernet decryption per login; the work is moved to a thread so the
+        # loop keeps serving, but it still holds the GIL and grows with the user
+        # table.
+        result = await db.execute(select(User))
+        users = result.scalars().all()
+
+        def find_match() -> Optional[User]:
+            for user in users:
+                try:
+                    decrypted_phone = encryption_manager.decrypt(user.phone_number)
+                    if normalize_phone_number(decrypted_phone) == normalized_phone:
+                        return user
+                except:
+                    continue
+            return None
 
-        return None
+        return await asyncio.to_thread(find_match)
 
-    def get_user_by_id(self, db: Session, user_id: int) -> Optional[User]:
+    async def get_user_by_id(self, db: AsyncSession, user_id: int) -> Optional[User]:
         """Get user by ID"""
-        return db.query(User).filter(User.id == user_id).first()
+        return await db.get(User, user_id)
 
-    async def start_login(self, db: Session, login_request: LoginRequest) -> dict:
+    async def start_login(self, db: AsyncSession, login_request: LoginRequest) -> dict:
         """Start the login process by sending verification code"""
         try:
             # Validate input
@@ -92,7 +100,7 @@ class AuthService:
         except Exception as e:
             raise Exception(f"Failed to start login: {str(e)}")
 
-    async def verify_code(self, db: Session, verify_request: VerifyCodeRequest) -> dict:
+    async def verify_code(self, db: AsyncSession, verify_request: VerifyCodeRequest) -> dict:
         """Verify the authentication code"""
         try:
             normalized_phone = normalize_phone_number(verify_request.phone_number)
@@ -118,7 +126,7 @@ class AuthService:
         except Exception as e:
             raise Exception(f"Failed to verify code: {str(e)}")
 
-    async def verify_2fa(self, db: Session, verify_request: Verify2FARequest) -> dict:
+    async def verify_2fa(self, db: AsyncSession, verify_request: Verify2FARequest) -> dict:
         """Verify 2FA password"""
         try:
             normalized_phone = normalize_phone_number(verify_request.phone_number)
@@ -135,14 +143,14 @@ class AuthService:
         except Exception as e:
             raise Exception(f"Failed to verify 2FA: {str(e)}")
 
-    async def _complete_authentication(self, db: Session, phone_number: str) -> dict:
+    async def _complete_authentication(self, db: AsyncSession, phone_number: str) -> dict:
         """Complete the authentication process"""
         try:
             # Get session data from Telegram service
             session_data = await telegram_service.finalize_auth(phone_number)
 
             # Check if user exists
-            user = self.get_user_by_phone(db, phone_number)
+            user = await self.get_user_by_phone(db, phone_number)
 
             if user:
                 # Update existing user's session
@@ -152,8 +160,8 @@ class AuthService:
                 # Create new user (this shouldn't happen in normal flow, but handle it)
                 raise Exception("User not found. Please complete registration first.")
 
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            await db.refresh(user)
 
             # Create access token
             access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -176,7 +184,7 @@ class AuthService:
             raise Exception(f"Failed to complete authentication: {str(e)}")
 
     async def register_user(
-        self, db: Session, api_id: str, api_hash: str, phone_number: str
+        self, db: AsyncSession, api_id: str, api_hash: str, phone_number: str
     ) -> User:
         """Register a new user (called during first login)"""
         try:
@@ -191,40 +199,40 @@ class AuthService:
             )
 
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.flush()
 
             # Create default settings
             settings = Settings(user_id=user.id)
             db.add(settings)
-            db.commit()
+            await db.commit()
+            await db.refresh(user)
 
             return user
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to register user: {str(e)}")
 
-    async def logout(self, db: Session, user_id: int):
+    async def logout(self, db: AsyncSession, user_id: int):
         """Logout user and disconnect Telegram client"""
         try:
             # Disconnect Telegram client
             await telegram_service.disconnect_client(user_id)
 
             # Optionally clear session data from database
-            user = self.get_user_by_id(db, user_id)
+            user = await self.get_user_by_id(db, user_id)
             if user:
                 user.session_data = None
                 user.updated_at = datetime.utcnow()
-                db.commit()
+                await db.commit()
 
         except Exception as e:
             raise Exception(f"Failed to logout: {str(e)}")
 
-    async def get_auth_status(self, db: Session, user_id: int) -> dict:
+    async def get_auth_status(self, db: AsyncSession, user_id: int) -> dict:
         """Get authentication status for user"""
         try:
-            user = self.get_user_by_id(db, user_id)
+            user = await self.get_user_by_id(db, user_id)
             if not user or not user.session_data:
                 return {"authenticated": False}
 
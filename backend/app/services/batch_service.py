@@ -0,0 +1,138 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Collection, Dict, List, Sequence
+
+from sqlalchemy import delete, not_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import changes
+from app.models import BatchItem, BatchItemResult, BatchResponse
+
+logger = logging.getLogger(__name__)
+
+ALL_ACTIONS = ("activate", "deactivate", "toggle", "delete")
+
+
+class BatchService:
+    def __init__(self):
+        pass
+
+    async def apply(
+        self,
+        db: AsyncSession,
+        model: Any,
+        user_id: int,
+        items: List[BatchItem],
+        actions: Collection[str] = ALL_ACTIONS,
+        nullify_on_delete: Sequence[Any] = (),
+    ) -> BatchResponse:
+        """
+        Apply a batch of actions to a user's rows of model in one transaction
+
+        Rows are updated with one UPDATE or DELETE ... WHERE id IN (...) per
+        action. Items that cannot be applied (unknown or foreign ids, repeated
+        ids, actions the model does not support) fail on their own; the rest
+        are committed together. Foreign keys in nullify_on_delete that point
+        at deleted rows are set to NULL first, as the ORM does for a deleted
+        parent.
+        """
+        errors: Dict[int, str] = {}
+        seen = set()
+        for index, item in enumerate(items):
+            if item.action not in actions:
+                errors[index] = f"Action '{item.action}' is not supported"
+            elif item.id in seen:
+                errors[index] = "Item appears more than once in the batch"
+            else:
+                seen.add(item.id)
+
+        has_status = hasattr(model, "is_active")
+        current = {}
+        if seen:
+            # Lock the rows so the reported states are the ones written
+            columns = (model.id, model.is_active) if has_status else (model.id,)
+            result = await db.execute(
+                select(*columns)
+                .where(model.user_id == user_id, model.id.in_(seen))
+                .with_for_update()
+            )
+            current = {row.id: row for row in result}
+
+        planned: Dict[str, List[int]] = defaultdict(list)
+        for index, item in enumerate(items):
+            if index not in errors:
+                if item.id in current:
+                    planned[item.action].append(item.id)
+                else:
+                    errors[index] = "Not found"
+
+        try:
+            for action, ids in planned.items():
+                if action == "delete":
+                    for column in nullify_on_delete:
+                        await db.execute(
+                            update(column.class_)
+                            .where(column.in_(ids))
+                            .values({column.key: None})
+                            .execution_options(synchronize_session=False)
+                        )
+                await db.execute(
+                    self._statement(model, user_id, action, ids).execution_options(
+                        synchronize_session=False
+                    )
+                )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Failed to apply {model.__tablename__} batch: {str(e)}")
+            raise Exception(f"Failed to apply batch: {str(e)}")
+
+        if planned:
+            # Core statements are not seen by the session's change tracking
+            changes.mark_changed(model.__tablename__, user_id)
+
+        results = []
+        for index, item in enumerate(items):
+            if index in errors:
+                results.append(
+                    BatchItemResult(
+                        id=item.id, action=item.action, success=False, error=errors[index]
+                    )
+                )
+                continue
+
+            is_active = None
+            if item.action != "delete" and has_status:
+                is_active = {
+                    "activate": True,
+                    "deactivate": False,
+                    "toggle": not current[item.id].is_active,
+                }[item.action]
+            results.append(
+                BatchItemResult(id=item.id, action=item.action, success=True, is_active=is_active)
+            )
+
+        return BatchResponse(
+            results=results, succeeded=len(items) - len(errors), failed=len(errors)
+        )
+
+    def _statement(self, model: Any, user_id: int, action: str, ids: List[int]):
+        where = (model.user_id == user_id, model.id.in_(ids))
+        if action == "delete":
+            return delete(model).where(*where)
+
+        values = {
+            "is_active": {
+                "activate": True,
+                "deactivate": False,
+                "toggle": not_(model.is_active),
+            }[action]
+        }
+        if hasattr(model, "updated_at"):
+            values["updated_at"] = datetime.utcnow()
+        return update(model).where(*where).values(**values)
+
+
+# Global instance
+batch_service = BatchService()
@@ -1,10 +1,19 @@
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Set
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, lambda_stmt, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Blacklist, Group, User
+from app.core import changes
+from app.core.events import event_bus
+from app.core.metrics import timed
+from app.models import BatchItem, BatchResponse, Blacklist, Group, User
+from app.services.batch_service import batch_service
+from app.services.group_queue_service import group_queue_service
 
 logger = logging.getLogger(__name__)
 
@@ -13,46 +22,69 @@ class BlacklistService:
     def __init__(self):
         pass
 
-    def get_blacklist(
-        self, db: Session, user_id: int, skip: int = 0, limit: int = 100
+    async def get_blacklist(
+        self, db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100
     ) -> List[Blacklist]:
         """Get all blacklisted groups for a user"""
-        return (
-            db.query(Blacklist).filter(Blacklist.user_id == user_id).offset(skip).limit(limit).all()
+        result = await db.execute(
+            select(Blacklist).where(Blacklist.user_id == user_id).offset(skip).limit(limit)
         )
+        return result.scalars().all()
 
-    def get_active_blacklist(self, db: Session, user_id: int) -> List[Blacklist]:
+    async def get_active_blacklist(self, db: AsyncSession, user_id: int) -> List[Blacklist]:
         """Get currently active blacklisted groups (not expired)"""
         now = datetime.utcnow()
 
-        return (
-            db.query(Blacklist)
-            .filter(
+        result = await db.execute(
+            select(Blacklist).where(
                 Blacklist.user_id == user_id,
                 (Blacklist.blacklist_type == "permanent") | (Blacklist.expires_at > now),
             )
-            .all()
         )
+        return result.scalars().all()
 
-    def is_group_blacklisted(self, db: Session, user_id: int, group_id: str) -> bool:
-        """Check if a group is currently blacklisted"""
+    async def get_active_entry(
+        self, db: AsyncSession, user_id: int, group_id: str
+    ) -> Optional[Blacklist]:
+        """Get the active (not expired) blacklist entry of a group"""
         now = datetime.utcnow()
 
-        blacklist_entry = (
-            db.query(Blacklist)
-            .filter(
-                Blacklist.user_id == user_id,
-                Blacklist.group_id == group_id,
-                (Blacklist.blacklist_type == "permanent") | (Blacklist.expires_at > now),
+        # Cached statement: checked for every group before a send
+        result = await db.execute(
+            lambda_stmt(
+                lambda: select(Blacklist).where(
+                    Blacklist.user_id == user_id,
+                    Blacklist.group_id == group_id,
+                    (Blacklist.blacklist_type == "permanent") | (Blacklist.expires_at > now),
+                )
             )
-            .first()
         )
+        return result.scalars().first()
 
-        return blacklist_entry is not None
+    @timed("blacklist.is_group_blacklisted")
+    async def is_group_blacklisted(self, db: AsyncSession, user_id: int, group_id: str) -> bool:
+        """Check if a group is currently blacklisted"""
+        return await self.get_active_entry(db, user_id, group_id) is not None
 
-    def add_to_blacklist(
+    async def get_blacklisted_group_ids(self, db: AsyncSession, user_id: int) -> Set[str]:
+        """Get the IDs of all currently blacklisted groups in one query"""
+        now = datetime.utcnow()
+
+        # Cached statement: runs on every scheduler cycle
+        result = await db.execute(
+            lambda_stmt(
+                lambda: select(Blacklist.group_id).where(
+                    Blacklist.user_id == user_id,
+                    (Blacklist.blacklist_type == "permanent") | (Blacklist.expires_at > now),
+                )
+            )
+        )
+        return set(result.scalars().all())
+
+    @timed("blacklist.add_to_blacklist")
+    async def add_to_blacklist(
         self,
-        db: Session,
+        db: AsyncSession,
         user_id: int,
         group_id: str,
         blacklist_type: str,
@@ -62,157 +94,207 @@ class BlacklistService:
         """Add a group to blacklist"""
         try:
             # Check if user exists
-            user = db.query(User).filter(User.id == user_id).first()
+            user = await db.get(User, user_id)
             if not user:
                 raise Exception("User not found")
 
-            # Remove existing blacklist entry for this group
-            existing = (
-                db.query(Blacklist)
-                .filter(Blacklist.user_id == user_id, Blacklist.group_id == group_id)
-                .first()
-            )
-
-            if existing:
-                db.delete(existing)
-
             # Calculate expiration time for temporary blacklist
             expires_at = None
             if blacklist_type == "temporary" and duration_seconds:
                 expires_at = datetime.utcnow() + timedelta(seconds=duration_seconds)
 
-            # Create blacklist entry
-            blacklist_entry = Blacklist(
-                user_id=user_id,
-                group_id=group_id,
-                blacklist_type=blacklist_type,
-                reason=reason,
-                expires_at=expires_at,
+            # Create or replace the entry for this group in one statement
+            await db.execute(
+                self._upsert_statement(
+                    db.bind.dialect.name,
+                    user_id=user_id,
+                    group_id=group_id,
+                    blacklist_type=blacklist_type,
+                    reason=reason,
+                    expires_at=expires_at,
+                )
             )
+            await db.commit()
+            changes.mark_changed(Blacklist.__tablename__, user_id)
+            group_queue_service.blacklisted(user_id, group_id, blacklist_type, expires_at)
+
+            result = await db.execute(
+                select(Blacklist)
+                .where(Blacklist.user_id == user_id, Blacklist.group_id == group_id)
+                .execution_options(populate_existing=True)
+            )
+            blacklist_entry = result.scalars().one()
 
-            db.add(blacklist_entry)
-            db.commit()
-            db.refresh(blacklist_entry)
-
-            logger.info(f"Added group {group_id} to {blacklist_type} blacklist for user {user_id}")
+            logger.info(
+                "Added group %s to %s blacklist for user %s", group_id, blacklist_type, user_id
+            )
+            event_bus.publish(
+                user_id,
+                "blacklist",
+                {
+                    "action": "added",
+                    "group_id": group_id,
+                    "blacklist_type": blacklist_type,
+                    "reason": reason,
+                    "expires_at": expires_at,
+                },
+            )
 
             return blacklist_entry
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Failed to add group to blacklist: {str(e)}")
             raise Exception(f"Failed to add group to blacklist: {str(e)}")
 
-    def remove_from_blacklist(self, db: Session, blacklist_id: int, user_id: int) -> bool:
+    def _upsert_statement(self, dialect_name: str, **values):
+        """Build an insert that replaces the existing entry for the same user and group"""
+        if dialect_name == "mysql":
+            statement = mysql_insert(Blacklist).values(**values)
+            return statement.on_duplicate_key_update(
+                blacklist_type=statement.inserted.blacklist_type,
+                reason=statement.inserted.reason,
+                expires_at=statement.inserted.expires_at,
+                created_at=func.now(),
+            )
+
+        if dialect_name == "postgresql":
+            statement = postgresql_insert(Blacklist).values(**values)
+        elif dialect_name == "sqlite":
+            statement = sqlite_insert(Blacklist).values(**values)
+        else:
+            raise Exception(f"Blacklist upsert is not supported on {dialect_name}")
+
+        return statement.on_conflict_do_update(
+            index_elements=[Blacklist.user_id, Blacklist.group_id],
+            set_={
+                "blacklist_type": statement.excluded.blacklist_type,
+                "reason": statement.excluded.reason,
+                "expires_at": statement.excluded.expires_at,
+                "created_at": func.now(),
+            },
+        )
+
+    async def remove_from_blacklist(
+        self, db: AsyncSession, blacklist_id: int, user_id: int
+    ) -> bool:
         """Remove a group from blacklist"""
         try:
-            blacklist_entry = (
-                db.query(Blacklist)
-                .filter(Blacklist.id == blacklist_id, Blacklist.user_id == user_id)
-                .first()
+            result = await db.execute(
+                select(Blacklist).where(Blacklist.id == blacklist_id, Blacklist.user_id == user_id)
             )
+            blacklist_entry = result.scalars().first()
 
             if not blacklist_entry:
                 raise Exception("Blacklist entry not found")
 
             group_id = blacklist_entry.group_id
-            db.delete(blacklist_entry)
-            db.commit()
+            await db.delete(blacklist_entry)
+            await db.commit()
+            group_queue_service.unblacklisted(user_id, group_id)
 
-            logger.info(f"Removed group {group_id} from blacklist for user {user_id}")
+            logger.info("Removed group %s from blacklist for user %s", group_id, user_id)
+            event_bus.publish(user_id, "blacklist", {"action": "removed", "group_id": group_id})
 
             return True
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Failed to remove group from blacklist: {str(e)}")
             raise Exception(f"Failed to remove group from blacklist: {str(e)}")
 
-    def remove_group_from_blacklist(self, db: Session, user_id: int, group_id: str) -> bool:
+    async def apply_batch(
+        self, db: AsyncSession, user_id: int, items: List[BatchItem]
+    ) -> BatchResponse:
+        """Remove many blacklist entries in one transaction"""
+        response = await batch_service.apply(db, Blacklist, user_id, items, actions=("delete",))
+
+        if response.succeeded:
+            # Only entry IDs are known here: rebuild the send queue
+            group_queue_service.invalidate(user_id)
+            logger.info("Removed %d blacklist entries for user %s", response.succeeded, user_id)
+            event_bus.publish(
+                user_id, "blacklist", {"action": "removed", "count": response.succeeded}
+            )
+
+        return response
+
+    async def remove_group_from_blacklist(
+        self, db: AsyncSession, user_id: int, group_id: str
+    ) -> bool:
         """Remove a group from blacklist by group ID"""
         try:
-            blacklist_entry = (
-                db.query(Blacklist)
-                .filter(Blacklist.user_id == user_id, Blacklist.group_id == group_id)
-                .first()
+            result = await db.execute(
+                select(Blacklist).where(
+                    Blacklist.user_id == user_id, Blacklist.group_id == group_id
+                )
             )
+            blacklist_entry = result.scalars().first()
 
             if not blacklist_entry:
                 return False
 
-            db.delete(blacklist_entry)
-            db.commit()
+            await db.delete(blacklist_entry)
+            await db.commit()
+            group_queue_service.unblacklisted(user_id, group_id)
 
-            logger.info(f"Removed group {group_id} from blacklist for user {user_id}")
+            logger.info("Removed group %s from blacklist for user %s", group_id, user_id)
+            event_bus.publish(user_id, "blacklist", {"action": "removed", "group_id": group_id})
 
             return True
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Failed to remove group from blacklist: {str(e)}")
             return False
 
-    def cleanup_expired_blacklist(self, db: Session, user_id: int = None) -> int:
+    @timed("blacklist.cleanup_expired_blacklist")
+    async def cleanup_expired_blacklist(self, db: AsyncSession, user_id: int = None) -> int:
         """Clean up expired temporary blacklist entries"""
         try:
             now = datetime.utcnow()
 
-            query = db.query(Blacklist).filter(
+            statement = delete(Blacklist).where(
                 Blacklist.blacklist_type == "temporary", Blacklist.expires_at <= now
             )
 
             if user_id:
-                query = query.filter(Blacklist.user_id == user_id)
-
-            expired_entries = query.all()
-            count = len(expired_entries)
+                statement = statement.where(Blacklist.user_id == user_id)
 
-            for entry in expired_entries:
-                logger.info(f"Cleaning up expired blacklist entry for group {entry.group_id}")
-                db.delete(entry)
+            result = await db.execute(statement.execution_options(synchronize_session=False))
+            count = result.rowcount
 
-            db.commit()
+            await db.commit()
+            if count:
+                changes.mark_changed(Blacklist.__tablename__, user_id)
+                if user_id:
+                    event_bus.publish(user_id, "blacklist", {"action": "expired", "count": count})
 
-            logger.info(f"Cleaned up {count} expired blacklist entries")
+            if count:
+                logger.info("Cleaned up %d expired blacklist entries", count)
 
             return count
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Failed to cleanup expired blacklist: {str(e)}")
             return 0
 
-    def get_blacklist_stats(self, db: Session, user_id: int) -> dict:
+    @timed("blacklist.get_blacklist_stats")
+    async def get_blacklist_stats(self, db: AsyncSession, user_id: int) -> dict:
         """Get blacklist statistics"""
         now = datetime.utcnow()
-
-        total = db.query(Blacklist).filter(Blacklist.user_id == user_id).count()
-
-        permanent = (
-            db.query(Blacklist)
-            .filter(Blacklist.user_id == user_id, Blacklist.blacklist_type == "permanent")
-            .count()
-        )
-
-        temporary_active = (
-            db.query(Blacklist)
-            .filter(
-                Blacklist.user_id == user_id,
-                Blacklist.blacklist_type == "temporary",
-                Blacklist.expires_at > now,
-            )
-            .count()
-        )
-
-        temporary_expired = (
-            db.query(Blacklist)
-            .filter(
-                Blacklist.user_id == user_id,
-                Blacklist.blacklist_type == "temporary",
-                Blacklist.expires_at <= now,
-            )
-            .count()
+        temporary = Blacklist.blacklist_type == "temporary"
+
+        result = await db.execute(
+            select(
+                func.count(Blacklist.id),
+                func.count(Blacklist.id).filter(Blacklist.blacklist_type == "permanent"),
+                func.count(Blacklist.id).filter(temporary, Blacklist.expires_at > now),
+                func.count(Blacklist.id).filter(temporary, Blacklist.expires_at <= now),
+            ).where(Blacklist.user_id == user_id)
         )
+        total, permanent, temporary_active, temporary_expired = result.one()
 
         return {
             "total": total,
@@ -222,8 +304,9 @@ class BlacklistService:
             "active": permanent + temporary_active,
         }
 
-    def handle_telegram_error(
-        self, db: Session, user_id: int, group_id: str, error: Exception
+    @timed("blacklist.handle_telegram_error")
+    async def handle_telegram_error(
+        self, db: AsyncSession, user_id: int, group_id: str, error: Exception
     ) -> bool:
         """Handle Telegram errors and add to blacklist accordingly"""
         try:
@@ -241,7 +324,7 @@ class BlacklistService:
                 # Ensure wait_seconds does not exceed 60 minutes (3600 seconds) for slow mode
                 wait_seconds = min(wait_seconds, 3600)
 
-                self.add_to_blacklist(
+                await self.add_to_blacklist(
                     db,
                     user_id,
                     group_id,
@@ -260,7 +343,7 @@ class BlacklistService:
                 wait_seconds = int(match.group(1)) if match else 3600  # Default 1 hour
                 # For flood wait, we can keep the default 1 hour or more as it's a server-side limit
 
-                self.add_to_blacklist(
+                await self.add_to_blacklist(
                     db,
                     user_id,
                     group_id,
@@ -283,14 +366,14 @@ class BlacklistService:
                     "no permission",
                 ]
             ):
-                self.add_to_blacklist(
+                await self.add_to_blacklist(
                     db, user_id, group_id, "permanent", reason=f"Permanent error: {error_str}"
                 )
                 return True
 
             # Unknown error - temporary blacklist for safety
             else:
-                self.add_to_blacklist(
+                await self.add_to_blacklist(
                     db,
                     user_id,
                     group_id,
@@ -304,7 +387,9 @@ class BlacklistService:
             logger.error(f"Failed to handle Telegram error: {str(e)}")
             return False
 
-    def get_recently_unblacklisted(self, db: Session, user_id: int, hours: int = 24) -> List[str]:
+    async def get_recently_unblacklisted(
+        self, db: AsyncSession, user_id: int, hours: int = 24
+    ) -> List[str]:
         """Get groups that were recently removed from blacklist"""
         try:
             # This is a simplified implementation
@@ -314,18 +399,16 @@ class BlacklistService:
             # For now, we'll return groups that had temporary blacklist entries that expired recently
             # This is not perfect but gives an idea of recently available groups
 
-            expired_entries = (
-                db.query(Blacklist)
-                .filter(
+            result = await db.execute(
+                select(Blacklist.group_id).where(
                     Blacklist.user_id == user_id,
                     Blacklist.blacklist_type == "temporary",
                     Blacklist.expires_at > since,
                     Blacklist.expires_at <= datetime.utcnow(),
                 )
-                .all()
             )
 
-            return [entry.group_id for entry in expired_entries]
+            return list(result.scalars().all())
 
         except Exception as e:
             logger.error(f"Failed to get recently unblacklisted groups: {str(e)}")
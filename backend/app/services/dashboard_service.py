@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import changes
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.models import Blacklist, Group, Log, Message
+
+# Window of the send log counts in the summary
+SUMMARY_LOG_HOURS = 24
+
+# Tables whose writes change a user's summary
+_SUMMARY_TABLES = {model.__tablename__ for model in (Message, Group, Blacklist, Log)}
+
+summary_cache: TTLCache[dict] = TTLCache(
+    "dashboard_summary", ttl=get_settings().dashboard_cache_ttl_seconds
+)
+
+
+class DashboardService:
+    def __init__(self):
+        pass
+
+    async def get_summary(self, db: AsyncSession, user_id: int) -> dict:
+        """Get message, group, blacklist and send log statistics, cached per user"""
+        return await summary_cache.get_or_load(user_id, lambda: self._load_summary(db, user_id))
+
+    def mark_changed(self, user_id: int = None) -> None:
+        """Drop the cached summary of a user, or of every user"""
+        if user_id is None:
+            summary_cache.clear()
+        else:
+            summary_cache.mark_changed(user_id)
+
+    async def _load_summary(self, db: AsyncSession, user_id: int) -> dict:
+        now = datetime.utcnow()
+        since = now - timedelta(hours=SUMMARY_LOG_HOURS)
+        temporary = Blacklist.blacklist_type == "temporary"
+
+        messages = (
+            select(
+                func.count(Message.id).label("total"),
+                func.count(Message.id).filter(Message.is_active == True).label("active"),
+            )
+            .where(Message.user_id == user_id)
+            .subquery()
+        )
+        groups = (
+            select(
+                func.count(Group.id).label("total"),
+                func.count(Group.id).filter(Group.is_active == True).label("active"),
+            )
+            .where(Group.user_id == user_id)
+            .subquery()
+        )
+        blacklist = (
+            select(
+                func.count(Blacklist.id).label("total"),
+                func.count(Blacklist.id)
+                .filter(Blacklist.blacklist_type == "permanent")
+                .label("permanent"),
+                func.count(Blacklist.id)
+                .filter(temporary, Blacklist.expires_at > now)
+                .label("temporary_active"),
+                func.count(Blacklist.id)
+                .filter(temporary, Blacklist.expires_at <= now)
+                .label("temporary_expired"),
+            )
+            .where(Blacklist.user_id == user_id)
+            .subquery()
+        )
+        logs = (
+            select(
+                func.count(Log.id).label("total"),
+                func.count(Log.id).filter(Log.status == "success").label("success"),
+                func.count(Log.id).filter(Log.status == "failed").label("failed"),
+                func.count(Log.id).filter(Log.status == "blacklisted").label("blacklisted"),
+            )
+            .where(Log.user_id == user_id, Log.created_at >= since)
+            .subquery()
+        )
+
+        # Each aggregate is a single row, so joining them returns one row
+        result = await db.execute(
+            select(messages, groups, blacklist, logs)
+            .select_from(messages)
+            .join(groups, true())
+            .join(blacklist, true())
+            .join(logs, true())
+        )
+        row = iter(result.one())
+
+        def take(*names):
+            return {name: next(row) for name in names}
+
+        message_stats = take("total", "active")
+        group_stats = take("total", "active")
+        blacklist_stats = take("total", "permanent", "temporary_active", "temporary_expired")
+        log_stats = take("total", "success", "failed", "blacklisted")
+
+        for stats in (message_stats, group_stats):
+            stats["inactive"] = stats["total"] - stats["active"]
+        blacklist_stats["active"] = (
+            blacklist_stats["permanent"] + blacklist_stats["temporary_active"]
+        )
+        log_stats["success_rate"] = (
+            log_stats["success"] / log_stats["total"] * 100 if log_stats["total"] > 0 else 0
+        )
+        log_stats["hours"] = SUMMARY_LOG_HOURS
+
+        return {
+            "messages": message_stats,
+            "groups": group_stats,
+            "blacklist": blacklist_stats,
+            "logs": log_stats,
+        }
+
+
+def _invalidate_summary(table: str, user_id: int) -> None:
+    if table in _SUMMARY_TABLES:
+        dashboard_service.mark_changed(user_id)
+
+
+# Global instance
+dashboard_service = DashboardService()
+
+changes.add_listener(_invalidate_summary)
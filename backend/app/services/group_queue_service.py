@@ -0,0 +1,228 @@
+import heapq
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import changes, metrics
+from app.models import Blacklist, Group
+
+logger = logging.getLogger(__name__)
+
+group_queue_loads = metrics.counter(
+    "group_queue_loads", "Send queues built from the database after a group write"
+)
+
+
+@dataclass(frozen=True)
+class QueuedGroup:
+    """The fields of a group a send cycle needs"""
+
+    id: int
+    group_id: str
+    group_name: Optional[str]
+
+
+class GroupQueue:
+    """
+    A user's active groups ordered by the time each may next be sent to
+
+    A group's time is the later of its last send and the time it is held
+    back until (blacklist expiry, slow mode, a failed permission check);
+    groups held back for good are not queued. Changing a time pushes a new
+    heap entry and marks the old one stale, so every update is O(log n).
+    Ties are broken randomly, so groups never sent to are picked in random
+    order and after that the least recently sent group comes first.
+    """
+
+    def __init__(
+        self,
+        groups: Iterable[QueuedGroup],
+        held_until: Dict[str, float],
+        last_sent: Dict[str, float],
+    ):
+        self.groups: Dict[str, QueuedGroup] = {group.group_id: group for group in groups}
+        self._held_until = held_until
+        self._last_sent = last_sent
+        # [time, tie breaker, group_id]; group_id is None once the entry is stale
+        self._heap: List[list] = []
+        self._entries: Dict[str, list] = {}
+
+        for group_id in self.groups:
+            at = self._eligible_at(group_id)
+            if at != math.inf:
+                entry = [at, random.random(), group_id]
+                self._entries[group_id] = entry
+                self._heap.append(entry)
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def peek(self, now: float) -> Optional[QueuedGroup]:
+        """Get the group that has been eligible the longest, if any is eligible at now"""
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+        if not self._heap or self._heap[0][0] > now:
+            return None
+        return self.groups[self._heap[0][2]]
+
+    def next_eligible_at(self) -> Optional[float]:
+        """Get the earliest time any group may be sent to"""
+        self.peek(-math.inf)
+        return self._heap[0][0] if self._heap else None
+
+    def hold(self, group_id: str, until: float) -> None:
+        """Hold a group back until a time, math.inf for good"""
+        self._held_until[group_id] = until
+        self._push(group_id)
+
+    def defer(self, group_id: str, until: float) -> None:
+        """Hold a group back until a time unless it is already held longer"""
+        self.hold(group_id, max(until, self._held_until.get(group_id, 0.0)))
+
+    def release(self, group_id: str) -> None:
+        """Stop holding a group back"""
+        self._held_until.pop(group_id, None)
+        self._push(group_id)
+
+    def record_send(self, group_id: str, at: float) -> None:
+        """Move a group behind every group sent to less recently"""
+        self._last_sent[group_id] = at
+        self._push(group_id)
+
+    def _eligible_at(self, group_id: str) -> float:
+        return max(self._last_sent.get(group_id, 0.0), self._held_until.get(group_id, 0.0))
+
+    def _push(self, group_id: str) -> None:
+        if group_id not in self.groups:
+            return
+
+        old = self._entries.pop(group_id, None)
+        if old is not None:
+            old[2] = None
+        at = self._eligible_at(group_id)
+        if at != math.inf:
+            entry = [at, random.random(), group_id]
+            self._entries[group_id] = entry
+            heapq.heappush(self._heap, entry)
+
+        # Stale entries only leave the heap at the top; rebuild once they dominate
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        # Stored as naive UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class GroupQueueService:
+    def __init__(self):
+        self.queues: Dict[int, GroupQueue] = {}
+        # Survive queue rebuilds, so a group write does not reset the rotation
+        self.last_sent: Dict[int, Dict[str, float]] = {}
+        changes.add_listener(self._on_change)
+
+    def _on_change(self, table: str, user_id: Optional[int]) -> None:
+        # Group writes (added, removed, toggled, renamed) rebuild the queue on
+        # next use; blacklist writes update it in place through hold/release
+        if table != Group.__tablename__:
+            return
+        if user_id is None:
+            self.queues.clear()
+        else:
+            self.queues.pop(user_id, None)
+
+    async def get_queue(self, db: AsyncSession, user_id: int) -> GroupQueue:
+        """Get a user's send queue, building it from the database if needed"""
+        queue = self.queues.get(user_id)
+        if queue is not None:
+            return queue
+
+        versions = (
+            changes.get_version(Group.__tablename__, user_id),
+            changes.get_version(Blacklist.__tablename__, user_id),
+        )
+        groups = await db.execute(
+            select(Group.id, Group.group_id, Group.group_name).where(
+                Group.user_id == user_id, Group.is_active == True
+            )
+        )
+        now = datetime.utcnow()
+        blacklist = await db.execute(
+            select(Blacklist.group_id, Blacklist.blacklist_type, Blacklist.expires_at).where(
+                Blacklist.user_id == user_id,
+                (Blacklist.blacklist_type == "permanent") | (Blacklist.expires_at > now),
+            )
+        )
+        held_until = {
+            group_id: math.inf if blacklist_type == "permanent" else _timestamp(expires_at)
+            for group_id, blacklist_type, expires_at in blacklist
+        }
+        queue = GroupQueue(
+            (QueuedGroup(*row) for row in groups),
+            held_until,
+            self.last_sent.setdefault(user_id, {}),
+        )
+        group_queue_loads.inc()
+
+        # A write that committed while loading may be missing: use, don't keep
+        if versions == (
+            changes.get_version(Group.__tablename__, user_id),
+            changes.get_version(Blacklist.__tablename__, user_id),
+        ):
+            self.queues[user_id] = queue
+        return queue
+
+    def blacklisted(
+        self, user_id: int, group_id: str, blacklist_type: str, expires_at: Optional[datetime]
+    ) -> None:
+        """Hold a group back until its blacklist entry expires"""
+        queue = self.queues.get(user_id)
+        if queue is None:
+            return
+        if blacklist_type == "permanent":
+            queue.hold(group_id, math.inf)
+        elif expires_at is not None:
+            queue.hold(group_id, _timestamp(expires_at))
+        else:
+            # A temporary entry without expiry never counts as active
+            queue.release(group_id)
+
+    def unblacklisted(self, user_id: int, group_id: str) -> None:
+        """Make a group eligible again after its blacklist entry was removed"""
+        queue = self.queues.get(user_id)
+        if queue is not None:
+            queue.release(group_id)
+
+    def record_send(self, user_id: int, group_id: str) -> None:
+        """Record a send attempt to a group"""
+        now = time.time()
+        queue = self.queues.get(user_id)
+        if queue is not None:
+            queue.record_send(group_id, now)
+        else:
+            self.last_sent.setdefault(user_id, {})[group_id] = now
+
+    def invalidate(self, user_id: int) -> None:
+        """Rebuild a user's queue on next use"""
+        self.queues.pop(user_id, None)
+
+    def discard(self, user_id: int) -> None:
+        """Forget everything about a user's queue"""
+        self.queues.pop(user_id, None)
+        self.last_sent.pop(user_id, None)
+
+
+# Global instance
+group_queue_service = GroupQueueService()
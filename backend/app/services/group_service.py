@@ -1,44 +1,70 @@
+from collections import Counter
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, insert, lambda_stmt, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from telethon import TelegramClient
 
-from app.models import Group, GroupCreate, User
+from app.core import changes
+from app.core.search import GROUP_SEARCH, search
+from app.models import BatchItem, BatchResponse, Group, GroupCreate, GroupResponse, User
+from app.services.batch_service import batch_service
 from app.services.telegram_service import telegram_service
 from app.utils.validators import parse_group_input, sanitize_input
 
+# Final status of each input of a bulk import
+IMPORT_OUTCOMES = ("added", "reactivated", "exists", "duplicate", "failed")
+# Final status of each group of a dialog import
+DIALOG_IMPORT_OUTCOMES = ("added", "exists", "failed")
+
 
 class GroupService:
     def __init__(self):
         pass
 
-    def get_groups(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Group]:
+    async def get_groups(
+        self, db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100
+    ) -> List[Group]:
         """Get all groups for a user"""
-        return db.query(Group).filter(Group.user_id == user_id).offset(skip).limit(limit).all()
+        result = await db.execute(
+            select(Group).where(Group.user_id == user_id).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
 
-    def get_active_groups(self, db: Session, user_id: int) -> List[Group]:
+    async def get_active_groups(self, db: AsyncSession, user_id: int) -> List[Group]:
         """Get only active groups for a user"""
-        return db.query(Group).filter(Group.user_id == user_id, Group.is_active == True).all()
+        # Cached statement: runs on every scheduler cycle
+        result = await db.execute(
+            lambda_stmt(
+                lambda: select(Group).where(Group.user_id == user_id, Group.is_active == True)
+            )
+        )
+        return result.scalars().all()
 
-    def get_group_by_id(self, db: Session, group_id: int, user_id: int) -> Optional[Group]:
+    async def get_group_by_id(
+        self, db: AsyncSession, group_id: int, user_id: int
+    ) -> Optional[Group]:
         """Get a specific group by ID for a user"""
-        return db.query(Group).filter(Group.id == group_id, Group.user_id == user_id).first()
+        result = await db.execute(
+            select(Group).where(Group.id == group_id, Group.user_id == user_id)
+        )
+        return result.scalars().first()
 
-    def get_group_by_telegram_id(
-        self, db: Session, telegram_group_id: str, user_id: int
+    async def get_group_by_telegram_id(
+        self, db: AsyncSession, telegram_group_id: str, user_id: int
     ) -> Optional[Group]:
         """Get group by Telegram group ID"""
-        return (
-            db.query(Group)
-            .filter(Group.group_id == telegram_group_id, Group.user_id == user_id)
-            .first()
+        result = await db.execute(
+            select(Group).where(Group.group_id == telegram_group_id, Group.user_id == user_id)
         )
+        return result.scalars().first()
 
-    async def add_group(self, db: Session, group_data: GroupCreate, user_id: int) -> Group:
+    async def add_group(self, db: AsyncSession, group_data: GroupCreate, user_id: int) -> Group:
         """Add a new group with validation"""
         try:
             # Check if user exists
-            user = db.query(User).filter(User.id == user_id).first()
+            user = await db.get(User, user_id)
             if not user:
                 raise Exception("User not found")
 
@@ -61,7 +87,7 @@ class GroupService:
                 raise Exception(f"Failed to resolve group: {str(e)}")
 
             # Check if group already exists
-            existing_group = self.get_group_by_telegram_id(db, telegram_group_id, user_id)
+            existing_group = await self.get_group_by_telegram_id(db, telegram_group_id, user_id)
             if existing_group:
                 if existing_group.is_active:
                     raise Exception("Group already exists and is active")
@@ -71,8 +97,8 @@ class GroupService:
                     existing_group.group_name = group_name
                     existing_group.username = resolved_username
                     existing_group.updated_at = datetime.utcnow()
-                    db.commit()
-                    db.refresh(existing_group)
+                    await db.commit()
+                    await db.refresh(existing_group)
                     return existing_group
 
             # Test group access
@@ -91,72 +117,298 @@ class GroupService:
             )
 
             db.add(group)
-            db.commit()
-            db.refresh(group)
+            await db.commit()
+            await db.refresh(group)
 
             return group
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to add group: {str(e)}")
 
-    def remove_group(self, db: Session, group_id: int, user_id: int) -> bool:
+    async def import_groups(
+        self,
+        db: AsyncSession,
+        client: TelegramClient,
+        user_id: int,
+        group_inputs: List[str],
+        concurrency: int = 4,
+        max_flood_wait: int = 60,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Add many groups, yielding progress records as the import runs
+
+        Inputs are resolved concurrently and a "resolved" or "failed" record
+        is yielded as each lookup finishes. The groups are then checked
+        against existing ones in one query and written in one transaction,
+        and every resolved input gets its outcome: "added", "reactivated",
+        "exists" or "duplicate". A final "done" record has the counts.
+        """
+        inputs = [group_input.strip() for group_input in group_inputs]
+        outcomes = Counter()
+        resolved: Dict[str, int] = {}  # Telegram group ID -> first input index
+        details: Dict[int, tuple] = {}
+
+        def record(status: str, index: int, **fields) -> Dict[str, Any]:
+            if status in IMPORT_OUTCOMES:
+                outcomes[status] += 1
+            return {"status": status, "index": index, "input": inputs[index], **fields}
+
+        # Identical inputs are looked up once
+        first_of: Dict[str, int] = {}
+        for index, group_input in enumerate(inputs):
+            if not group_input:
+                yield record("failed", index, error="Group input cannot be empty")
+            elif group_input in first_of:
+                yield record("duplicate", index)
+            else:
+                first_of[group_input] = index
+        lookups = list(first_of.items())
+
+        async for position, group, error in telegram_service.resolve_groups(
+            client,
+            [group_input for group_input, _ in lookups],
+            concurrency=concurrency,
+            max_flood_wait=max_flood_wait,
+        ):
+            index = lookups[position][1]
+            if error:
+                yield record("failed", index, error=error)
+                continue
+
+            details[index] = group
+            yield record("resolved", index, group_id=group[0], group_name=group[1])
+
+        # Inputs naming the same group: the first one is imported
+        for index in sorted(details):
+            telegram_group_id = details[index][0]
+            if telegram_group_id in resolved:
+                yield record("duplicate", index, group_id=telegram_group_id)
+            else:
+                resolved[telegram_group_id] = index
+
+        if resolved:
+            try:
+                result = await db.execute(
+                    select(Group).where(Group.user_id == user_id, Group.group_id.in_(resolved))
+                )
+                existing = {group.group_id: group for group in result.scalars()}
+                now = datetime.utcnow()
+
+                statuses = {}
+                new_rows = []
+                for telegram_group_id, index in resolved.items():
+                    _, group_name, username = details[index]
+                    group_name = sanitize_input(group_name) if group_name else None
+                    group = existing.get(telegram_group_id)
+                    if group is None:
+                        _, _, invite_link = parse_group_input(inputs[index])
+                        new_rows.append(
+                            {
+                                "user_id": user_id,
+                                "group_id": telegram_group_id,
+                                "group_name": group_name,
+                                "username": username,
+                                "invite_link": invite_link,
+                                "is_active": True,
+                            }
+                        )
+                        statuses[telegram_group_id] = "added"
+                    elif group.is_active:
+                        statuses[telegram_group_id] = "exists"
+                    else:
+                        group.is_active = True
+                        group.group_name = group_name
+                        group.username = username
+                        group.updated_at = now
+                        statuses[telegram_group_id] = "reactivated"
+
+                if new_rows:
+                    await db.execute(insert(Group), new_rows)
+                    added = await db.execute(
+                        select(Group).where(
+                            Group.user_id == user_id,
+                            Group.group_id.in_([row["group_id"] for row in new_rows]),
+                        )
+                    )
+                    existing.update({group.group_id: group for group in added.scalars()})
+                await db.commit()
+
+            except Exception as e:
+                await db.rollback()
+                for index in resolved.values():
+                    yield record("failed", index, error=f"Failed to add group: {str(e)}")
+            else:
+                if new_rows:
+                    # Core inserts are not seen by the session's change tracking
+                    changes.mark_changed(Group.__tablename__, user_id)
+                for telegram_group_id, index in resolved.items():
+                    group = GroupResponse.model_validate(existing[telegram_group_id])
+                    yield record(
+                        statuses[telegram_group_id], index, group=group.model_dump(mode="json")
+                    )
+
+        yield {
+            "status": "done",
+            "total": len(inputs),
+            **{key: outcomes[key] for key in IMPORT_OUTCOMES},
+        }
+
+    async def import_dialogs(
+        self,
+        db: AsyncSession,
+        client: TelegramClient,
+        user_id: int,
+        active: bool = True,
+        chunk_size: int = 100,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Add the groups and megagroups of the account's dialog list, yielding
+        progress records as the dialogs are read
+
+        Groups are written in chunks: one query finds the chunk's groups that
+        already exist, the rest are inserted together and committed. Each
+        group gets an "added", "exists" or "failed" record; existing groups
+        are left as they are. A final "done" record has the counts.
+        """
+        outcomes = Counter()
+        chunk: List[Tuple[str, str, Optional[str]]] = []
+
+        async def flush() -> AsyncIterator[Dict[str, Any]]:
+            groups = {group[0]: group for group in chunk}
+            chunk.clear()
+            try:
+                result = await db.execute(
+                    select(Group.group_id).where(
+                        Group.user_id == user_id, Group.group_id.in_(groups)
+                    )
+                )
+                existing = set(result.scalars())
+                new_rows = [
+                    {
+                        "user_id": user_id,
+                        "group_id": telegram_group_id,
+                        "group_name": sanitize_input(group_name) if group_name else None,
+                        "username": username,
+                        "is_active": active,
+                    }
+                    for telegram_group_id, group_name, username in groups.values()
+                    if telegram_group_id not in existing
+                ]
+                if new_rows:
+                    await db.execute(insert(Group), new_rows)
+                await db.commit()
+
+            except Exception as e:
+                await db.rollback()
+                for telegram_group_id, group_name, _ in groups.values():
+                    outcomes["failed"] += 1
+                    yield {
+                        "status": "failed",
+                        "group_id": telegram_group_id,
+                        "group_name": group_name,
+                        "error": f"Failed to add group: {str(e)}",
+                    }
+                return
+
+            if new_rows:
+                # Core inserts are not seen by the session's change tracking
+                changes.mark_changed(Group.__tablename__, user_id)
+            for telegram_group_id, group_name, username in groups.values():
+                status = "exists" if telegram_group_id in existing else "added"
+                outcomes[status] += 1
+                yield {
+                    "status": status,
+                    "group_id": telegram_group_id,
+                    "group_name": group_name,
+                    "username": username,
+                }
+
+        seen = set()
+        async for group in telegram_service.iter_groups(client):
+            # A dialog can be listed in a folder as well as the main list
+            if group[0] in seen:
+                continue
+            seen.add(group[0])
+            chunk.append(group)
+            if len(chunk) >= chunk_size:
+                async for progress in flush():
+                    yield progress
+        if chunk:
+            async for progress in flush():
+                yield progress
+
+        yield {
+            "status": "done",
+            "total": len(seen),
+            **{key: outcomes[key] for key in DIALOG_IMPORT_OUTCOMES},
+        }
+
+    async def remove_group(self, db: AsyncSession, group_id: int, user_id: int) -> bool:
         """Remove a group (soft delete by setting is_active to False)"""
         try:
-            group = self.get_group_by_id(db, group_id, user_id)
+            group = await self.get_group_by_id(db, group_id, user_id)
             if not group:
                 raise Exception("Group not found")
 
             group.is_active = False
             group.updated_at = datetime.utcnow()
 
-            db.commit()
+            await db.commit()
 
             return True
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to remove group: {str(e)}")
 
-    def delete_group(self, db: Session, group_id: int, user_id: int) -> bool:
+    async def delete_group(self, db: AsyncSession, group_id: int, user_id: int) -> bool:
         """Permanently delete a group"""
         try:
-            group = self.get_group_by_id(db, group_id, user_id)
+            group = await self.get_group_by_id(db, group_id, user_id)
             if not group:
                 raise Exception("Group not found")
 
-            db.delete(group)
-            db.commit()
+            await db.delete(group)
+            await db.commit()
 
             return True
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to delete group: {str(e)}")
 
-    def toggle_group_status(self, db: Session, group_id: int, user_id: int) -> Optional[Group]:
+    async def toggle_group_status(
+        self, db: AsyncSession, group_id: int, user_id: int
+    ) -> Optional[Group]:
         """Toggle group active status"""
         try:
-            group = self.get_group_by_id(db, group_id, user_id)
+            group = await self.get_group_by_id(db, group_id, user_id)
             if not group:
                 raise Exception("Group not found")
 
             group.is_active = not group.is_active
             group.updated_at = datetime.utcnow()
 
-            db.commit()
-            db.refresh(group)
+            await db.commit()
+            await db.refresh(group)
 
             return group
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to toggle group status: {str(e)}")
 
-    async def validate_group(self, db: Session, group_id: int, user_id: int) -> dict:
+    async def apply_batch(
+        self, db: AsyncSession, user_id: int, items: List[BatchItem]
+    ) -> BatchResponse:
+        """Activate, deactivate, toggle or permanently delete many groups in one transaction"""
+        return await batch_service.apply(db, Group, user_id, items)
+
+    async def validate_group(self, db: AsyncSession, group_id: int, user_id: int) -> dict:
         """Validate group access and update information"""
         try:
-            group = self.get_group_by_id(db, group_id, user_id)
+            group = await self.get_group_by_id(db, group_id, user_id)
             if not group:
                 raise Exception("Group not found")
 
@@ -180,7 +432,7 @@ class GroupService:
                     )
                     group.username = username
                     group.updated_at = datetime.utcnow()
-                    db.commit()
+                    await db.commit()
 
                 except Exception:
                     pass  # Keep existing data if update fails
@@ -196,10 +448,10 @@ class GroupService:
         except Exception as e:
             raise Exception(f"Failed to validate group: {str(e)}")
 
-    async def validate_all_groups(self, db: Session, user_id: int) -> dict:
+    async def validate_all_groups(self, db: AsyncSession, user_id: int) -> dict:
         """Validate all active groups for a user"""
         try:
-            groups = self.get_active_groups(db, user_id)
+            groups = await self.get_active_groups(db, user_id)
             results = {"total": len(groups), "accessible": 0, "inaccessible": 0, "groups": []}
 
             for group in groups:
@@ -228,30 +480,100 @@ class GroupService:
         except Exception as e:
             raise Exception(f"Failed to validate groups: {str(e)}")
 
-    def get_group_count(self, db: Session, user_id: int) -> dict:
+    async def refresh_metadata(
+        self, db: AsyncSession, client: TelegramClient, user_id: int
+    ) -> Dict[str, int]:
+        """
+        Bring the names and usernames of a user's active groups up to date
+
+        Metadata is fetched with a few multi-peer requests and compared with
+        the stored values; the changed groups are written with one bulk
+        UPDATE. Groups Telegram no longer returns are counted as unreachable
+        and left as they are.
+        """
+        result = await db.execute(
+            select(Group.id, Group.group_id, Group.group_name, Group.username).where(
+                Group.user_id == user_id, Group.is_active == True
+            )
+        )
+        groups = result.all()
+        # End the read transaction so no connection is held while waiting on Telegram
+        await db.commit()
+        if not groups:
+            return {"checked": 0, "updated": 0, "unreachable": 0}
+
+        metadata = await telegram_service.fetch_group_metadata(
+            client, [group.group_id for group in groups]
+        )
+
+        now = datetime.utcnow()
+        changed = []
+        for group in groups:
+            if group.group_id not in metadata:
+                continue
+            group_name, username = metadata[group.group_id]
+            group_name = sanitize_input(group_name) if group_name else group.group_name
+            if (group_name, username) != (group.group_name, group.username):
+                changed.append(
+                    {"_id": group.id, "_name": group_name, "_username": username, "_now": now}
+                )
+
+        if changed:
+            try:
+                await db.execute(
+                    update(Group.__table__)
+                    .where(Group.__table__.c.id == bindparam("_id"))
+                    .values(
+                        group_name=bindparam("_name"),
+                        username=bindparam("_username"),
+                        updated_at=bindparam("_now"),
+                    ),
+                    changed,
+                )
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                raise Exception(f"Failed to refresh group metadata: {str(e)}")
+
+            # Core statements are not seen by the session's change tracking
+            changes.mark_changed(Group.__tablename__, user_id)
+
+        return {
+            "checked": len(groups),
+            "updated": len(changed),
+            "unreachable": sum(1 for group in groups if group.group_id not in metadata),
+        }
+
+    async def get_group_count(self, db: AsyncSession, user_id: int) -> dict:
         """Get group statistics"""
-        total = db.query(Group).filter(Group.user_id == user_id).count()
-        active = db.query(Group).filter(Group.user_id == user_id, Group.is_active == True).count()
+        result = await db.execute(
+            select(
+                func.count(Group.id), func.count(Group.id).filter(Group.is_active == True)
+            ).where(Group.user_id == user_id)
+        )
+        total, active = result.one()
         inactive = total - active
 
         return {"total": total, "active": active, "inactive": inactive}
 
-    def search_groups(self, db: Session, user_id: int, query: str) -> List[Group]:
-        """Search groups by name or username"""
+    async def search_groups(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        query: str,
+        skip: int = 0,
+        limit: int = 100,
+        active_only: bool = True,
+    ) -> List[Group]:
+        """Search groups by name or username, best matches first"""
         if not query or len(query.strip()) == 0:
             return []
 
-        search_term = f"%{query.strip()}%"
+        filters = [Group.user_id == user_id]
+        if active_only:
+            filters.append(Group.is_active == True)
 
-        return (
-            db.query(Group)
-            .filter(
-                Group.user_id == user_id,
-                Group.is_active == True,
-                (Group.group_name.ilike(search_term) | Group.username.ilike(search_term)),
-            )
-            .all()
-        )
+        return await search(db, Group, GROUP_SEARCH, query, *filters, skip=skip, limit=limit)
 
 
 # Global instance
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import changes, metrics
+from app.database import AsyncSessionLocal
+from app.models import Log
+
+logger = logging.getLogger(__name__)
+
+LOG_COLUMNS = ("user_id", "group_id", "message_id", "status", "error_message", "created_at")
+
+log_flush_duration = metrics.histogram(
+    "send_log_flush_duration_seconds", "Duration of batched send log writes"
+)
+log_flush_rows = metrics.histogram(
+    "send_log_flush_rows", "Rows per batched send log write", buckets=metrics.DEFAULT_COUNT_BUCKETS
+)
+log_rows_dropped = metrics.counter(
+    "send_log_rows_dropped", "Send log rows dropped because the buffer was full"
+)
+
+
+class LogService:
+    def __init__(self):
+        pass
+
+    async def bulk_insert_logs(self, db: AsyncSession, rows: Sequence[dict]) -> int:
+        """Insert send log rows, using COPY on PostgreSQL and executemany elsewhere"""
+        if not rows:
+            return 0
+
+        # Explicit columns bypass the server default, so stamp missing times here
+        now = datetime.now(timezone.utc)
+        records = [
+            tuple(row.get(column) for column in LOG_COLUMNS[:-1]) + (row.get("created_at") or now,)
+            for row in rows
+        ]
+
+        if db.bind.dialect.driver == "asyncpg":
+            # COPY runs on the session's connection, inside its transaction
+            connection = await db.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                Log.__tablename__, records=records, columns=LOG_COLUMNS
+            )
+        else:
+            await db.execute(insert(Log), [dict(zip(LOG_COLUMNS, record)) for record in records])
+
+        return len(rows)
+
+
+class LogWriter:
+    """
+    Buffers send log rows and writes them in batches, so the scheduler does not
+    pay a commit per sent message
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self._pending: List[dict] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._dropping = False
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        user_id: int,
+        group_id: str,
+        status: str,
+        message_id: Optional[int] = None,
+        error_message: Optional[str] = None,
+    ) -> None:
+        """Queue a send log row, stamped with the current time"""
+        self._pending.append(
+            {
+                "user_id": user_id,
+                "group_id": group_id,
+                "message_id": message_id,
+                "status": status,
+                "error_message": error_message,
+                "created_at": datetime.now(timezone.utc),
+            }
+        )
+
+        # Bound memory if the database stays unavailable
+        overflow = len(self._pending) - self.batch_size * 50
+        if overflow > 0:
+            del self._pending[:overflow]
+            log_rows_dropped.inc(amount=overflow)
+            # Warn once per outage; the counter tracks how many rows were lost
+            if not self._dropping:
+                self._dropping = True
+                logger.warning("Send log buffer full, dropping oldest rows")
+
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write all queued rows, returning how many were written"""
+        async with self._flush_lock:
+            rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                async with self.session_factory() as db:
+                    await log_service.bulk_insert_logs(db, rows)
+                    await db.commit()
+            except Exception as e:
+                # Keep the rows for the next attempt
+                self._pending[:0] = rows
+                logger.error(f"Failed to write {len(rows)} send log rows: {str(e)}")
+                return 0
+
+        self._dropping = False
+        for user_id in {row["user_id"] for row in rows}:
+            changes.mark_changed(Log.__tablename__, user_id)
+        log_flush_duration.observe(time.perf_counter() - started)
+        log_flush_rows.observe(len(rows))
+        return len(rows)
+
+    def start(self) -> None:
+        """Start flushing in the background on the running event loop"""
+        if self.running:
+            return
+
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        logger.info(
+            "Send log writer started (batch size %d, flush interval %.0f ms)",
+            self.batch_size,
+            self.flush_interval * 1000,
+        )
+
+    async def stop(self) -> None:
+        """Stop the background task and write the remaining rows"""
+        if self._task:
+            # Let an in-flight write finish; cancelling it mid-statement would
+            # leave the connection inside an open write transaction
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        self._wakeup = None
+
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+# Global instances
+log_service = LogService()
+log_writer = LogWriter()
@@ -1,9 +1,12 @@
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Message, MessageCreate, MessageUpdate, User
+from app.core.search import MESSAGE_SEARCH, search
+from app.models import BatchItem, BatchResponse, Log, Message, MessageCreate, MessageUpdate, User
+from app.services.batch_service import batch_service
 from app.utils.validators import sanitize_input, validate_message_content
 
 
@@ -11,23 +14,37 @@ class MessageService:
     def __init__(self):
         pass
 
-    def get_messages(
-        self, db: Session, user_id: int, skip: int = 0, limit: int = 100
+    async def get_messages(
+        self, db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100
     ) -> List[Message]:
         """Get all messages for a user"""
-        return db.query(Message).filter(Message.user_id == user_id).offset(skip).limit(limit).all()
+        result = await db.execute(
+            select(Message).where(Message.user_id == user_id).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
 
-    def get_active_messages(self, db: Session, user_id: int) -> List[Message]:
+    async def get_active_messages(self, db: AsyncSession, user_id: int) -> List[Message]:
         """Get only active messages for a user"""
-        return db.query(Message).filter(Message.user_id == user_id, Message.is_active == True).all()
+        # Cached statement: runs on every scheduler cycle
+        result = await db.execute(
+            lambda_stmt(
+                lambda: select(Message).where(Message.user_id == user_id, Message.is_active == True)
+            )
+        )
+        return result.scalars().all()
 
-    def get_message_by_id(self, db: Session, message_id: int, user_id: int) -> Optional[Message]:
+    async def get_message_by_id(
+        self, db: AsyncSession, message_id: int, user_id: int
+    ) -> Optional[Message]:
         """Get a specific message by ID for a user"""
-        return (
-            db.query(Message).filter(Message.id == message_id, Message.user_id == user_id).first()
+        result = await db.execute(
+            select(Message).where(Message.id == message_id, Message.user_id == user_id)
         )
+        return result.scalars().first()
 
-    def create_message(self, db: Session, message_data: MessageCreate, user_id: int) -> Message:
+    async def create_message(
+        self, db: AsyncSession, message_data: MessageCreate, user_id: int
+    ) -> Message:
         """Create a new message template"""
         try:
             # Validate content
@@ -42,7 +59,7 @@ class MessageService:
                 raise Exception("Message title cannot be empty")
 
             # Check if user exists
-            user = db.query(User).filter(User.id == user_id).first()
+            user = await db.get(User, user_id)
             if not user:
                 raise Exception("User not found")
 
@@ -52,22 +69,22 @@ class MessageService:
             )
 
             db.add(message)
-            db.commit()
-            db.refresh(message)
+            await db.commit()
+            await db.refresh(message)
 
             return message
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to create message: {str(e)}")
 
-    def update_message(
-        self, db: Session, message_id: int, message_data: MessageUpdate, user_id: int
+    async def update_message(
+        self, db: AsyncSession, message_id: int, message_data: MessageUpdate, user_id: int
     ) -> Optional[Message]:
         """Update an existing message"""
         try:
             # Get message
-            message = self.get_message_by_id(db, message_id, user_id)
+            message = await self.get_message_by_id(db, message_id, user_id)
             if not message:
                 raise Exception("Message not found")
 
@@ -89,66 +106,97 @@ class MessageService:
 
             message.updated_at = datetime.utcnow()
 
-            db.commit()
-            db.refresh(message)
+            await db.commit()
+            await db.refresh(message)
 
             return message
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to update message: {str(e)}")
 
-    def delete_message(self, db: Session, message_id: int, user_id: int) -> bool:
+    async def delete_message(self, db: AsyncSession, message_id: int, user_id: int) -> bool:
         """Delete a message"""
         try:
-            message = self.get_message_by_id(db, message_id, user_id)
+            message = await self.get_message_by_id(db, message_id, user_id)
             if not message:
                 raise Exception("Message not found")
 
-            db.delete(message)
-            db.commit()
+            await db.delete(message)
+            await db.commit()
 
             return True
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to delete message: {str(e)}")
 
-    def toggle_message_status(
-        self, db: Session, message_id: int, user_id: int
+    async def toggle_message_status(
+        self, db: AsyncSession, message_id: int, user_id: int
     ) -> Optional[Message]:
         """Toggle message active status"""
         try:
-            message = self.get_message_by_id(db, message_id, user_id)
+            message = await self.get_message_by_id(db, message_id, user_id)
             if not message:
                 raise Exception("Message not found")
 
             message.is_active = not message.is_active
             message.updated_at = datetime.utcnow()
 
-            db.commit()
-            db.refresh(message)
+            await db.commit()
+            await db.refresh(message)
 
             return message
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to toggle message status: {str(e)}")
 
-    def get_message_count(self, db: Session, user_id: int) -> dict:
+    async def apply_batch(
+        self, db: AsyncSession, user_id: int, items: List[BatchItem]
+    ) -> BatchResponse:
+        """Activate, deactivate, toggle or delete many messages in one transaction"""
+        return await batch_service.apply(
+            db, Message, user_id, items, nullify_on_delete=(Log.message_id,)
+        )
+
+    async def get_message_count(self, db: AsyncSession, user_id: int) -> dict:
         """Get message statistics"""
-        total = db.query(Message).filter(Message.user_id == user_id).count()
-        active = (
-            db.query(Message).filter(Message.user_id == user_id, Message.is_active == True).count()
+        result = await db.execute(
+            select(
+                func.count(Message.id), func.count(Message.id).filter(Message.is_active == True)
+            ).where(Message.user_id == user_id)
         )
+        total, active = result.one()
         inactive = total - active
 
         return {"total": total, "active": active, "inactive": inactive}
 
-    def duplicate_message(self, db: Session, message_id: int, user_id: int) -> Optional[Message]:
+    async def search_messages(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        query: str,
+        skip: int = 0,
+        limit: int = 100,
+        active_only: bool = False,
+    ) -> List[Message]:
+        """Search message templates by title or content, best matches first"""
+        if not query or len(query.strip()) == 0:
+            return []
+
+        filters = [Message.user_id == user_id]
+        if active_only:
+            filters.append(Message.is_active == True)
+
+        return await search(db, Message, MESSAGE_SEARCH, query, *filters, skip=skip, limit=limit)
+
+    async def duplicate_message(
+        self, db: AsyncSession, message_id: int, user_id: int
+    ) -> Optional[Message]:
         """Duplicate an existing message"""
         try:
-            original = self.get_message_by_id(db, message_id, user_id)
+            original = await self.get_message_by_id(db, message_id, user_id)
             if not original:
                 raise Exception("Message not found")
 
@@ -161,13 +209,13 @@ class MessageService:
             )
 
             db.add(duplicate)
-            db.commit()
-            db.refresh(duplicate)
+            await db.commit()
+            await db.refresh(duplicate)
 
             return duplicate
 
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to duplicate message: {str(e)}")
 
 
@@ -1,28 +1,59 @@
 import asyncio
 import logging
 import random
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 
+from apscheduler.events import EVENT_JOB_SUBMITTED, JobSubmissionEvent
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from telethon.errors import FloodWaitError, SlowModeWaitError
 
-from app.database import SessionLocal
-from app.models import Group, Log, Message, Settings, User
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.db_instrumentation import track_queries
+from app.core.events import event_bus
+from app.core.logging import log_context
+from app.core.metrics import timed
+from app.database import AsyncSessionLocal
+from app.models import Group, Message, User
 from app.services.blacklist_service import blacklist_service
+from app.services.group_queue_service import GroupQueue, QueuedGroup, group_queue_service
+from app.services.group_service import group_service
+from app.services.log_service import log_writer
+from app.services.message_service import message_service
+from app.services.settings_service import settings_service
 from app.services.telegram_service import telegram_service
 from app.utils.encryption import encryption_manager
 
 logger = logging.getLogger(__name__)
 
+send_duration = metrics.histogram(
+    "telegram_send_duration_seconds", "Duration of scheduled message sends", ["outcome"]
+)
+scheduler_lag = metrics.histogram(
+    "scheduler_lag_seconds", "Actual start minus planned start of scheduled send cycles"
+)
+send_cycle_latency = metrics.get_histogram("scheduler.send_messages_job")
+
+METADATA_REFRESH_JOB_ID = "group_metadata_refresh"
+
 
 class SchedulerService:
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
         self.running_jobs: Dict[int, str] = {}  # user_id -> job_id
         self.job_stats: Dict[int, dict] = {}  # user_id -> stats
+        self._planned_runs: Dict[str, datetime] = {}  # job_id -> planned run time
+        self.scheduler.add_listener(self._on_job_submitted, EVENT_JOB_SUBMITTED)
+
+    def _on_job_submitted(self, event: JobSubmissionEvent):
+        """Remember when a submitted job was planned to run"""
+        if event.scheduled_run_times:
+            self._planned_runs[event.job_id] = event.scheduled_run_times[-1]
 
     def start_scheduler(self):
         """Start the scheduler"""
@@ -30,12 +61,23 @@ class SchedulerService:
             self.scheduler.start()
             logger.info("Scheduler started")
 
+            interval = get_settings().group_metadata_refresh_interval_seconds
+            if interval > 0:
+                self.scheduler.add_job(
+                    self._refresh_metadata_job,
+                    IntervalTrigger(seconds=interval),
+                    id=METADATA_REFRESH_JOB_ID,
+                    replace_existing=True,
+                    max_instances=1,
+                )
+
     def stop_scheduler(self):
         """Stop the scheduler"""
         if self.scheduler.running:
             self.scheduler.shutdown()
             logger.info("Scheduler stopped")
 
+    @timed("scheduler.start_user_job")
     async def start_user_job(self, user_id: int) -> bool:
         """Start message sending job for a user"""
         try:
@@ -43,19 +85,12 @@ class SchedulerService:
             await self.stop_user_job(user_id)
 
             # Get user settings
-            db = SessionLocal()
-            try:
-                user = db.query(User).filter(User.id == user_id).first()
+            async with AsyncSessionLocal() as db:
+                user = await db.get(User, user_id)
                 if not user:
                     raise Exception("User not found")
 
-                settings = db.query(Settings).filter(Settings.user_id == user_id).first()
-                if not settings:
-                    # Create default settings
-                    settings = Settings(user_id=user_id)
-                    db.add(settings)
-                    db.commit()
-                    db.refresh(settings)
+                settings = await settings_service.get_or_create_user_settings(db, user_id)
 
                 # Calculate random interval
                 interval_seconds = random.randint(settings.min_interval, settings.max_interval)
@@ -83,15 +118,16 @@ class SchedulerService:
                 logger.info(
                     f"Started message sending job for user {user_id} with interval {interval_seconds}s"
                 )
+                event_bus.publish(
+                    user_id, "scheduler", {"is_running": True, "next_run": job.next_run_time}
+                )
                 return True
 
-            finally:
-                db.close()
-
         except Exception as e:
             logger.error(f"Failed to start job for user {user_id}: {str(e)}")
             return False
 
+    @timed("scheduler.stop_user_job")
     async def stop_user_job(self, user_id: int) -> bool:
         """Stop message sending job for a user"""
         try:
@@ -99,9 +135,11 @@ class SchedulerService:
             if job_id:
                 self.scheduler.remove_job(job_id)
                 del self.running_jobs[user_id]
+                group_queue_service.discard(user_id)
                 if user_id in self.job_stats:
                     del self.job_stats[user_id]
                 logger.info(f"Stopped message sending job for user {user_id}")
+                event_bus.publish(user_id, "scheduler", {"is_running": False})
                 return True
             return False
 
@@ -131,23 +169,45 @@ class SchedulerService:
 
     async def _send_messages_job(self, user_id: int):
         """Main job function to send messages"""
-        db = SessionLocal()
+        started = time.perf_counter()
+        slept = 0.0
+
+        # Tag every log line of this cycle with the job and a per-run ID
+        job_id = f"user_{user_id}/{uuid.uuid4().hex[:8]}"
+        try:
+            with log_context(user_id=user_id, job_id=job_id), track_queries(
+                f"send cycle for user {user_id}", kind="scheduler"
+            ):
+                slept = await self._run_send_cycle(user_id)
+        finally:
+            # The random pre-send delay is deliberate waiting, not cycle work
+            send_cycle_latency.observe(time.perf_counter() - started - slept)
+
+    async def _run_send_cycle(self, user_id: int) -> float:
+        """Run a single send cycle for a user, returning seconds spent in the send delay"""
+        planned = self._planned_runs.pop(f"user_{user_id}", None)
+        if planned is not None:
+            lag = (datetime.now(timezone.utc) - planned).total_seconds()
+            scheduler_lag.observe(max(lag, 0.0))
+
+        slept = 0.0
+        db = AsyncSessionLocal()
         try:
-            logger.info(f"Starting message sending cycle for user {user_id}")
+            logger.info("Starting message sending cycle for user %s", user_id)
 
             # Update job stats
             if user_id in self.job_stats:
                 self.job_stats[user_id]["last_run"] = datetime.utcnow()
 
             # Clean up expired blacklist entries
-            blacklist_service.cleanup_expired_blacklist(db, user_id)
+            await blacklist_service.cleanup_expired_blacklist(db, user_id)
 
             # Get user and check if authenticated
-            user = db.query(User).filter(User.id == user_id).first()
+            user = await db.get(User, user_id)
             if not user or not user.session_data:
                 logger.warning(f"User {user_id} not authenticated, stopping job")
                 await self.stop_user_job(user_id)
-                return
+                return 0.0
 
             # Ensure Telegram client is connected
             client = await telegram_service.get_client(user_id)
@@ -162,123 +222,129 @@ class SchedulerService:
                     client = await telegram_service.get_client(user_id)
                 except Exception as e:
                     logger.error(f"Failed to create Telegram client for user {user_id}: {str(e)}")
-                    return
+                    return 0.0
 
             if not client:
                 logger.error(f"Could not establish Telegram client for user {user_id}")
-                return
+                return 0.0
 
             # Get active messages
-            active_messages = (
-                db.query(Message)
-                .filter(Message.user_id == user_id, Message.is_active == True)
-                .all()
-            )
+            active_messages = await message_service.get_active_messages(db, user_id)
 
             if not active_messages:
-                logger.info(f"No active messages for user {user_id}")
-                return
-
-            # Get active groups (not blacklisted)
-            active_groups = (
-                db.query(Group).filter(Group.user_id == user_id, Group.is_active == True).all()
-            )
-
-            if not active_groups:
-                logger.info(f"No active groups for user {user_id}")
-                return
+                logger.info("No active messages for user %s", user_id)
+                return 0.0
 
-            # Filter out blacklisted groups
-            available_groups = []
-            for group in active_groups:
-                if not blacklist_service.is_group_blacklisted(db, user_id, group.group_id):
-                    available_groups.append(group)
+            # Active groups that are not blacklisted, by next-eligible time
+            queue = await group_queue_service.get_queue(db, user_id)
 
-            if not available_groups:
-                logger.info(f"All groups are blacklisted for user {user_id}")
-                return
-
-            # Select random message and group
-            selected_message = random.choice(active_messages)
-            selected_group = random.choice(available_groups)
+            if not len(queue):
+                logger.info("No active groups for user %s", user_id)
+                return 0.0
 
             # Get user settings for delay
-            settings = db.query(Settings).filter(Settings.user_id == user_id).first()
+            settings = await settings_service.get_user_settings(db, user_id)
             if settings:
                 delay = random.randint(settings.min_delay, settings.max_delay)
             else:
                 delay = random.randint(5, 10)
 
+            # End the read transaction so no connection is held while waiting on
+            # Telegram, including the permission checks of group selection
+            await db.commit()
+
+            # Select random message and the group that has waited longest
+            selected_message = random.choice(active_messages)
+            selected_group = await self._select_group(client, queue)
+
+            if not selected_group:
+                logger.info("No group can be sent to right now for user %s", user_id)
+                return 0.0
+
             logger.info(
-                f"Sending message '{selected_message.title}' to group '{selected_group.group_name}' for user {user_id}"
+                "Sending message '%s' to group '%s' for user %s",
+                selected_message.title,
+                selected_group.group_name,
+                user_id,
             )
 
             # Apply random delay
             await asyncio.sleep(delay)
+            slept = delay
 
-            # Send message
+            # Send message; the group goes to the back of the queue whatever the outcome
+            group_queue_service.record_send(user_id, selected_group.group_id)
+            send_started = time.perf_counter()
+            outcome, error = "success", None
             try:
                 await telegram_service.send_message(
                     client, selected_group.group_id, selected_message.content
                 )
+                send_duration.observe(time.perf_counter() - send_started, "success")
 
                 # Log success
-                log_entry = Log(
+                log_writer.add(
                     user_id=user_id,
                     group_id=selected_group.group_id,
                     message_id=selected_message.id,
                     status="success",
                 )
-                db.add(log_entry)
-                db.commit()
 
                 # Update stats
                 if user_id in self.job_stats:
                     self.job_stats[user_id]["total_messages_sent"] += 1
 
                 logger.info(
-                    f"Successfully sent message to group {selected_group.group_id} for user {user_id}"
+                    "Successfully sent message to group %s for user %s",
+                    selected_group.group_id,
+                    user_id,
                 )
 
             except (SlowModeWaitError, FloodWaitError) as e:
+                send_duration.observe(time.perf_counter() - send_started, "blacklisted")
+                outcome, error = "blacklisted", str(e)
+
                 # Handle rate limiting errors
                 logger.warning(f"Rate limiting error for group {selected_group.group_id}: {str(e)}")
 
                 # Add to blacklist
-                blacklist_service.handle_telegram_error(db, user_id, selected_group.group_id, e)
+                await blacklist_service.handle_telegram_error(
+                    db, user_id, selected_group.group_id, e
+                )
 
                 # Log error
-                log_entry = Log(
+                log_writer.add(
                     user_id=user_id,
                     group_id=selected_group.group_id,
                     message_id=selected_message.id,
                     status="blacklisted",
                     error_message=str(e),
                 )
-                db.add(log_entry)
-                db.commit()
 
                 # Update stats
                 if user_id in self.job_stats:
                     self.job_stats[user_id]["total_errors"] += 1
 
             except Exception as e:
+                send_duration.observe(time.perf_counter() - send_started, "failed")
+                outcome, error = "failed", str(e)
+
                 # Handle other errors
                 logger.error(f"Error sending message to group {selected_group.group_id}: {str(e)}")
 
                 # Add to blacklist based on error type
-                blacklist_service.handle_telegram_error(db, user_id, selected_group.group_id, e)
+                await blacklist_service.handle_telegram_error(
+                    db, user_id, selected_group.group_id, e
+                )
 
                 # Log error
-                log_entry = Log(
+                log_writer.add(
                     user_id=user_id,
                     group_id=selected_group.group_id,
                     message_id=selected_message.id,
                     status="failed",
                     error_message=str(e),
                 )
-                db.add(log_entry)
-                db.commit()
 
                 # Update stats
                 if user_id in self.job_stats:
@@ -296,6 +362,23 @@ class SchedulerService:
                     if user_id in self.job_stats:
                         self.job_stats[user_id]["interval_seconds"] = new_interval
 
+            job_status = self.get_user_job_status(user_id) or {}
+            event_bus.publish(
+                user_id,
+                "send",
+                {
+                    "status": outcome,
+                    "error": error,
+                    "group_id": selected_group.group_id,
+                    "group_name": selected_group.group_name,
+                    "message_id": selected_message.id,
+                    "message_title": selected_message.title,
+                    "total_messages_sent": job_status.get("total_messages_sent", 0),
+                    "last_run": job_status.get("last_run"),
+                    "next_run": job_status.get("next_run"),
+                },
+            )
+
         except Exception as e:
             logger.error(f"Error in message sending job for user {user_id}: {str(e)}")
 
@@ -303,35 +386,85 @@ class SchedulerService:
                 self.job_stats[user_id]["total_errors"] += 1
 
         finally:
-            db.close()
+            await db.close()
+
+        return slept
+
+    @timed("scheduler.refresh_metadata_job")
+    async def _refresh_metadata_job(self):
+        """Refresh group metadata for every user with a connected client"""
+        for client_key, client in list(telegram_service.clients.items()):
+            user_id = int(client_key)
+            try:
+                with log_context(user_id=user_id, job_id=METADATA_REFRESH_JOB_ID), track_queries(
+                    f"group metadata refresh for user {user_id}", kind="scheduler"
+                ):
+                    async with AsyncSessionLocal() as db:
+                        result = await group_service.refresh_metadata(db, client, user_id)
+                logger.info(
+                    "Refreshed group metadata for user %s: %s checked, %s updated, %s unreachable",
+                    user_id,
+                    result["checked"],
+                    result["updated"],
+                    result["unreachable"],
+                )
+            except FloodWaitError as e:
+                # Try again on the next run
+                logger.warning(f"Group metadata refresh for user {user_id} rate limited: {str(e)}")
+            except Exception as e:
+                logger.error(f"Failed to refresh group metadata for user {user_id}: {str(e)}")
+
+    async def _select_group(self, client, queue: GroupQueue) -> Optional[QueuedGroup]:
+        """
+        Pick the eligible group that has waited longest, holding back groups
+        found to be unwritable or still inside their slow mode window
+        """
+        now = time.time()
+        while (group := queue.peek(now)) is not None:
+            profile = await telegram_service.get_group_profile(client, group.group_id)
+            # Groups that could not be checked are tried; the send reports the problem
+            if profile is not None and not profile.can_send:
+                queue.defer(group.group_id, now + get_settings().group_profile_ttl_seconds)
+                continue
+
+            remaining = telegram_service.slowmode_remaining(client, group.group_id)
+            if remaining > 0:
+                queue.defer(group.group_id, now + remaining)
+                continue
+
+            return group
+        return None
 
     def get_all_job_stats(self) -> Dict[int, dict]:
         """Get stats for all running jobs"""
         return self.job_stats.copy()
 
+    @timed("scheduler.restart_all_jobs")
     async def restart_all_jobs(self):
         """Restart all running jobs (useful after server restart)"""
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             # Get all users who should have jobs running
             # This would typically be stored in a separate table or configuration
             # For now, we'll just restart jobs for users who have active messages and groups
 
-            users_with_active_data = (
-                db.query(User)
-                .join(Message)
-                .join(Group)
-                .filter(Message.is_active == True, Group.is_active == True)
+            result = await db.execute(
+                select(User.id)
+                .join(Message, Message.user_id == User.id)
+                .join(Group, Group.user_id == User.id)
+                .where(Message.is_active == True, Group.is_active == True)
                 .distinct()
-                .all()
             )
+            user_ids = result.scalars().all()
 
-            for user in users_with_active_data:
-                await self.start_user_job(user.id)
-
-        finally:
-            db.close()
+        for user_id in user_ids:
+            await self.start_user_job(user_id)
 
 
 # Global instance
 scheduler_service = SchedulerService()
+
+metrics.gauge(
+    "scheduler_running_jobs",
+    "Users with an active message sending job",
+    lambda: len(scheduler_service.running_jobs),
+)
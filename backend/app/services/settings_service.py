@@ -0,0 +1,32 @@
+from typing import Optional
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Settings
+
+
+class SettingsService:
+    def __init__(self):
+        pass
+
+    async def get_user_settings(self, db: AsyncSession, user_id: int) -> Optional[Settings]:
+        """Get the settings row of a user"""
+        # Cached statement: read on every scheduler cycle and settings request
+        return await db.scalar(
+            lambda_stmt(lambda: select(Settings).where(Settings.user_id == user_id))
+        )
+
+    async def get_or_create_user_settings(self, db: AsyncSession, user_id: int) -> Settings:
+        """Get the settings of a user, creating the defaults if missing"""
+        settings = await self.get_user_settings(db, user_id)
+        if not settings:
+            settings = Settings(user_id=user_id)
+            db.add(settings)
+            await db.commit()
+            await db.refresh(settings)
+        return settings
+
+
+# Global instance
+settings_service = SettingsService()
@@ -2,11 +2,18 @@ import asyncio
 import logging
 import os
 import tempfile
-from typing import Dict, List, Optional, Tuple
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from weakref import WeakKeyDictionary
 
-from telethon import TelegramClient, events
+from telethon import TelegramClient, events, functions, utils
 from telethon.errors import (
+    ChannelInvalidError,
+    ChannelPrivateError,
     ChatAdminRequiredError,
+    ChatForbiddenError,
+    ChatIdInvalidError,
     ChatWriteForbiddenError,
     FloodWaitError,
     PasswordHashInvalidError,
@@ -17,17 +24,67 @@ from telethon.errors import (
     SlowModeWaitError,
     UserBannedInChannelError,
 )
-from telethon.tl.types import Channel, Chat, User
+from telethon.tl.types import Channel, Chat, InputPeerChannel, InputPeerChat, User
 
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.metrics import timed
 from app.utils.encryption import encryption_manager
 
 logger = logging.getLogger(__name__)
 
+# Retries of one lookup after FloodWaits before it is given up
+FLOOD_WAIT_RETRIES = 3
+
+# Peers per GetChannelsRequest / GetChatsRequest
+METADATA_CHUNK_SIZE = 100
+
+# Errors about one group or the account's rights in it, as opposed to
+# server errors and timeouts that say nothing about the group
+PEER_ERRORS = (
+    ChannelInvalidError,
+    ChannelPrivateError,
+    ChatAdminRequiredError,
+    ChatForbiddenError,
+    ChatIdInvalidError,
+    ChatWriteForbiddenError,
+    PeerIdInvalidError,
+    UserBannedInChannelError,
+)
+
+telegram_flood_waits = metrics.counter(
+    "telegram_flood_waits", "FloodWait errors received while resolving groups"
+)
+telegram_metadata_requests = metrics.counter(
+    "telegram_metadata_requests", "Multi-peer requests made to refresh group metadata"
+)
+group_profile_checks = metrics.counter(
+    "telegram_group_profile_checks", "Group send permission and slow mode checks", ["result"]
+)
+
+
+@dataclass(frozen=True)
+class GroupProfile:
+    """Whether the account can send to a group, and its slow mode, as last checked"""
+
+    can_send: bool
+    slowmode_seconds: int
+    last_checked: float  # time.monotonic()
+
 
 class TelegramService:
     def __init__(self):
         self.clients: Dict[str, TelegramClient] = {}
         self.temp_clients: Dict[str, TelegramClient] = {}  # For authentication process
+        # Input peers (ID and access hash) of resolved groups, per client, so
+        # sends need no entity lookup
+        self.input_peers: "WeakKeyDictionary[TelegramClient, Dict[str, Any]]" = WeakKeyDictionary()
+        # Send permission and slow mode per group, and when each group was
+        # last sent to (time.monotonic()), per client
+        self.group_profiles: "WeakKeyDictionary[TelegramClient, Dict[str, GroupProfile]]" = (
+            WeakKeyDictionary()
+        )
+        self.last_sent: "WeakKeyDictionary[TelegramClient, Dict[str, float]]" = WeakKeyDictionary()
 
     async def create_temp_client(self, api_id: str, api_hash: str, phone_number: str) -> str:
         """Create a temporary client for authentication"""
@@ -48,6 +105,7 @@ class TelegramService:
             logger.error(f"Failed to create temp client: {str(e)}")
             raise Exception(f"Failed to create Telegram client: {str(e)}")
 
+    @timed("telegram.send_code_request")
     async def send_code_request(self, api_id: str, api_hash: str, phone_number: str) -> bool:
         """Send authentication code to phone number"""
         try:
@@ -64,6 +122,7 @@ class TelegramService:
             logger.error(f"Failed to send code: {str(e)}")
             raise Exception(f"Failed to send verification code: {str(e)}")
 
+    @timed("telegram.verify_code")
     async def verify_code(self, phone_number: str, code: str) -> Tuple[bool, bool]:
         """
         Verify the authentication code
@@ -87,6 +146,7 @@ class TelegramService:
             logger.error(f"Failed to verify code: {str(e)}")
             raise Exception(f"Failed to verify code: {str(e)}")
 
+    @timed("telegram.verify_2fa")
     async def verify_2fa(self, phone_number: str, password: str) -> bool:
         """Verify 2FA password"""
         try:
@@ -128,6 +188,7 @@ class TelegramService:
             logger.error(f"Failed to finalize auth: {str(e)}")
             raise Exception(f"Failed to finalize authentication: {str(e)}")
 
+    @timed("telegram.create_client")
     async def create_client(
         self, user_id: int, api_id: str, api_hash: str, session_data: str
     ) -> bool:
@@ -175,6 +236,39 @@ class TelegramService:
             await self.clients[client_key].disconnect()
             del self.clients[client_key]
 
+    def remember_peer(self, client: TelegramClient, entity: Any) -> str:
+        """Cache a group's input peer and return its group ID"""
+        if isinstance(entity, Channel):
+            group_id = f"-100{entity.id}"
+        else:
+            group_id = f"-{entity.id}"
+
+        self.input_peers.setdefault(client, {})[group_id] = utils.get_input_peer(entity)
+        return group_id
+
+    def get_peer(self, client: TelegramClient, group_id: str) -> Any:
+        """Get the cached input peer of a group, or its numeric ID"""
+        return self.input_peers.get(client, {}).get(group_id) or int(group_id)
+
+    async def iter_groups(
+        self, client: TelegramClient
+    ) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+        """
+        Iterate the groups and megagroups in the account's dialog list
+        Yields (group_id, group_name, username) and caches each input peer
+        """
+        async for dialog in client.iter_dialogs():
+            entity = dialog.entity
+            # Upgraded basic groups live on as their supergroup
+            if not dialog.is_group or getattr(entity, "migrated_to", None):
+                continue
+            if getattr(entity, "deactivated", False):
+                continue
+
+            group_id = self.remember_peer(client, entity)
+            yield group_id, entity.title, getattr(entity, "username", None)
+
+    @timed("telegram.resolve_group")
     async def resolve_group(
         self, client: TelegramClient, group_input: str
     ) -> Tuple[str, str, Optional[str]]:
@@ -186,29 +280,147 @@ class TelegramService:
             entity = await client.get_entity(group_input)
 
             if isinstance(entity, (Channel, Chat)):
-                group_id = str(entity.id)
-                if hasattr(entity, "megagroup") and entity.megagroup:
-                    group_id = f"-100{entity.id}"
-                elif isinstance(entity, Channel):
-                    group_id = f"-100{entity.id}"
-                else:
-                    group_id = f"-{entity.id}"
-
-                group_name = entity.title
-                username = getattr(entity, "username", None)
-
-                return group_id, group_name, username
+                group_id = self.remember_peer(client, entity)
+                return group_id, entity.title, getattr(entity, "username", None)
             else:
                 raise Exception("Invalid group type")
 
+        except FloodWaitError:
+            # Callers pace themselves by the wait time
+            raise
         except Exception as e:
             logger.error(f"Failed to resolve group: {str(e)}")
             raise Exception(f"Failed to resolve group: {str(e)}")
 
+    async def resolve_groups(
+        self,
+        client: TelegramClient,
+        group_inputs: List[str],
+        concurrency: int = 4,
+        max_flood_wait: int = 60,
+    ) -> AsyncIterator[Tuple[int, Optional[Tuple[str, str, Optional[str]]], Optional[str]]]:
+        """
+        Resolve many group inputs concurrently
+        Yields (index, (group_id, group_name, username), None) or
+        (index, None, error) as each lookup finishes
+
+        At most `concurrency` lookups run at once. A FloodWait pauses every
+        lookup for the time Telegram asks and the lookup is retried; a wait
+        longer than max_flood_wait fails the lookups not yet done instead.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        resume_at = 0.0
+        abort_error: Optional[str] = None
+
+        async def resolve(index: int, group_input: str):
+            nonlocal resume_at, abort_error
+            async with semaphore:
+                for _ in range(FLOOD_WAIT_RETRIES + 1):
+                    delay = resume_at - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if abort_error:
+                        return index, None, abort_error
+
+                    try:
+                        return index, await self.resolve_group(client, group_input), None
+                    except FloodWaitError as e:
+                        telegram_flood_waits.inc()
+                        if e.seconds > max_flood_wait:
+                            abort_error = (
+                                f"Telegram asked to wait {e.seconds} seconds, try again later"
+                            )
+                        else:
+                            logger.warning(f"Flood wait of {e.seconds}s while resolving groups")
+                            resume_at = max(resume_at, loop.time() + e.seconds)
+                    except Exception as e:
+                        return index, None, str(e)
+
+                return index, None, abort_error or "Telegram kept asking to wait, try again later"
+
+        tasks = [loop.create_task(resolve(index, text)) for index, text in enumerate(group_inputs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @timed("telegram.fetch_group_metadata")
+    async def fetch_group_metadata(
+        self, client: TelegramClient, group_ids: List[str], chunk_size: int = METADATA_CHUNK_SIZE
+    ) -> Dict[str, Tuple[str, Optional[str]]]:
+        """
+        Get the current title and username of many groups
+        Returns: {group_id: (group_name, username)}
+
+        Channels are fetched chunk_size at a time with GetChannelsRequest and
+        basic groups with GetChatsRequest, so the cost is a few requests
+        rather than one per group. Groups that cannot be reached (left,
+        banned, no known access hash) are missing from the result.
+        """
+        channels, chats = [], []
+        for group_id in group_ids:
+            peer = await self._get_input_peer(client, group_id)
+            if isinstance(peer, InputPeerChannel):
+                channels.append(utils.get_input_channel(peer))
+            elif isinstance(peer, InputPeerChat):
+                chats.append(peer.chat_id)
+
+        entities = []
+        for request, peers in (
+            (functions.channels.GetChannelsRequest, channels),
+            (functions.messages.GetChatsRequest, chats),
+        ):
+            for start in range(0, len(peers), chunk_size):
+                entities += await self._get_chats(
+                    client, request, peers[start : start + chunk_size]
+                )
+
+        metadata = {}
+        for entity in entities:
+            # ChannelForbidden and ChatForbidden: the account lost access
+            if isinstance(entity, (Channel, Chat)):
+                group_id = self.remember_peer(client, entity)
+                metadata[group_id] = (entity.title, getattr(entity, "username", None))
+        return metadata
+
+    async def _get_input_peer(self, client: TelegramClient, group_id: str) -> Any:
+        peer = self.input_peers.get(client, {}).get(group_id)
+        if peer is not None:
+            return peer
+        try:
+            # Served from the session's entity cache, no request is made
+            return await client.get_input_entity(int(group_id))
+        except Exception as e:
+            logger.warning(f"No input peer for group {group_id}: {str(e)}")
+            return None
+
+    async def _get_chats(self, client: TelegramClient, request: Any, peers: List[Any]) -> List[Any]:
+        if not peers:
+            return []
+        try:
+            telegram_metadata_requests.inc()
+            result = await client(request(peers))
+            return result.chats
+        except PEER_ERRORS as e:
+            # One invalid peer fails the whole request: split to isolate it.
+            # Other errors (FloodWait, server errors, timeouts) end the refresh
+            # and the next run tries again
+            if len(peers) == 1:
+                logger.warning(f"Failed to fetch group metadata: {str(e)}")
+                return []
+            middle = len(peers) // 2
+            first = await self._get_chats(client, request, peers[:middle])
+            return first + await self._get_chats(client, request, peers[middle:])
+
+    @timed("telegram.send_message")
     async def send_message(self, client: TelegramClient, group_id: str, message: str) -> bool:
         """Send message to group"""
         try:
-            await client.send_message(int(group_id), message)
+            await client.send_message(self.get_peer(client, group_id), message)
+            self.last_sent.setdefault(client, {})[group_id] = time.monotonic()
             return True
 
         except SlowModeWaitError as e:
@@ -218,6 +430,9 @@ class TelegramService:
             # Return the wait time for flood handling
             raise FloodWaitError(f"Flood wait, wait {e.seconds} seconds")
         except (ChatWriteForbiddenError, UserBannedInChannelError, ChatAdminRequiredError):
+            self.group_profiles.setdefault(client, {})[group_id] = GroupProfile(
+                can_send=False, slowmode_seconds=0, last_checked=time.monotonic()
+            )
             raise Exception("No permission to send messages to this group")
         except PeerIdInvalidError:
             raise Exception("Invalid group ID or group not accessible")
@@ -225,20 +440,106 @@ class TelegramService:
             logger.error(f"Failed to send message: {str(e)}")
             raise Exception(f"Failed to send message: {str(e)}")
 
+    @timed("telegram.test_group_access")
     async def test_group_access(self, client: TelegramClient, group_id: str) -> bool:
         """Test if we can access and send messages to a group"""
-        try:
-            # Try to get group info
-            entity = await client.get_entity(int(group_id))
+        profile = await self.get_group_profile(client, group_id, refresh=True)
+        return profile is not None and profile.can_send
 
-            # Check if we can send messages (this is a basic check)
-            # In a real scenario, you might want to check permissions more thoroughly
-            return True
+    async def get_group_profile(
+        self, client: TelegramClient, group_id: str, refresh: bool = False
+    ) -> Optional[GroupProfile]:
+        """
+        Get whether the account can send to a group and the group's slow mode
 
+        Profiles are cached per client for GROUP_PROFILE_TTL_SECONDS. Only
+        errors about the group itself (private, banned, invalid) mark it as
+        unwritable. When the group could not be checked (a FloodWait, a server
+        error or timeout, not in any entity cache) the previous profile is
+        returned, or None without one.
+        """
+        profiles = self.group_profiles.setdefault(client, {})
+        profile = profiles.get(group_id)
+        ttl = get_settings().group_profile_ttl_seconds
+        if profile is not None and not refresh and time.monotonic() - profile.last_checked < ttl:
+            return profile
+
+        try:
+            profile = await self._fetch_group_profile(client, group_id)
+        except FloodWaitError as e:
+            group_profile_checks.inc("rate_limited")
+            logger.warning(f"Group profile check for {group_id} rate limited: {str(e)}")
+            return profile
+        except PEER_ERRORS as e:
+            # Telegram refused: private, banned or otherwise not writable
+            logger.info(f"Group {group_id} is not writable: {str(e)}")
+            profile = GroupProfile(False, 0, time.monotonic())
         except Exception as e:
-            logger.error(f"Group access test failed: {str(e)}")
+            # Server errors and timeouts say nothing about the group
+            group_profile_checks.inc("failed")
+            logger.warning(f"Group profile check for {group_id} failed: {str(e)}")
+            return profile
+
+        group_profile_checks.inc("writable" if profile.can_send else "unwritable")
+        profiles[group_id] = profile
+        return profile
+
+    def slowmode_remaining(self, client: TelegramClient, group_id: str) -> float:
+        """Seconds until the group's slow mode allows the next message"""
+        profile = self.group_profiles.get(client, {}).get(group_id)
+        sent = self.last_sent.get(client, {}).get(group_id)
+        if profile is None or not profile.slowmode_seconds or sent is None:
+            return 0.0
+        return max(0.0, sent + profile.slowmode_seconds - time.monotonic())
+
+    async def _fetch_group_profile(self, client: TelegramClient, group_id: str) -> GroupProfile:
+        peer = await self._get_input_peer(client, group_id)
+        if isinstance(peer, InputPeerChannel):
+            full = await client(
+                functions.channels.GetFullChannelRequest(utils.get_input_channel(peer))
+            )
+            slowmode_seconds = full.full_chat.slowmode_seconds or 0
+        elif isinstance(peer, InputPeerChat):
+            # Basic groups have no slow mode
+            full = await client(functions.messages.GetFullChatRequest(peer.chat_id))
+            slowmode_seconds = 0
+        else:
+            raise Exception("Group not found")
+
+        # The chat carries the account's own rights in it
+        entity = next(chat for chat in full.chats if chat.id == full.full_chat.id)
+        if isinstance(entity, (Channel, Chat)):
+            self.remember_peer(client, entity)
+        can_send = self._can_send(entity)
+        if (
+            not can_send
+            or getattr(entity, "creator", False)
+            or getattr(entity, "admin_rights", None)
+        ):
+            # Slow mode does not apply to admins
+            slowmode_seconds = 0
+        return GroupProfile(can_send, slowmode_seconds, time.monotonic())
+
+    def _can_send(self, entity: Any) -> bool:
+        if not isinstance(entity, (Channel, Chat)):
+            return False  # ChannelForbidden, ChatForbidden
+        if (
+            entity.left
+            or getattr(entity, "deactivated", False)
+            or getattr(entity, "migrated_to", None)
+        ):
+            return False
+        if entity.creator or entity.admin_rights:
+            return True
+        if isinstance(entity, Channel) and entity.broadcast:
             return False
+        for rights in (getattr(entity, "banned_rights", None), entity.default_banned_rights):
+            # Text messages need both rights
+            if rights is not None and (rights.send_messages or rights.send_plain):
+                return False
+        return True
 
+    @timed("telegram.get_me")
     async def get_me(self, client: TelegramClient) -> Dict:
         """Get current user information"""
         try:
@@ -257,3 +558,9 @@ class TelegramService:
 
 # Global instance
 telegram_service = TelegramService()
+
+metrics.gauge(
+    "telegram_connected_clients",
+    "Telegram user clients currently connected",
+    lambda: sum(1 for client in list(telegram_service.clients.values()) if client.is_connected()),
+)
@@ -3,20 +3,30 @@ Pytest configuration and fixtures
 """
 
 import asyncio
+import os
+import tempfile
 from typing import AsyncGenerator, Generator
 
-import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+# Keep every database file of the test run out of the working directory
+TEST_DB_DIR = tempfile.mkdtemp(prefix="telegram-automation-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(TEST_DB_DIR, 'app.db')}")
 
-from app.core.config import get_settings
-from app.database import Base, get_db
-from app.main import app
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import NullPool, StaticPool  # noqa: E402
 
-# Test database URL
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+from app.core.config import get_settings  # noqa: E402
+from app.core.search import drop_search_indexes  # noqa: E402
+from app.database import Base, create_tables, get_async_db, get_db, get_read_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.dashboard_service import dashboard_service  # noqa: E402
+
+# Test database, shared by the sync and async test engines
+TEST_DB_PATH = os.path.join(TEST_DB_DIR, "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 
 # Create test engine
 engine = create_engine(
@@ -28,6 +38,12 @@ engine = create_engine(
 # Create test session
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine on the same database for the API dependencies
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -37,6 +53,13 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_dashboard_cache():
+    """Drop cached dashboard summaries, as every test starts from an empty database."""
+    yield
+    dashboard_service.mark_changed()
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database session for each test."""
@@ -54,6 +77,28 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="function")
+def async_db_session(event_loop) -> Generator[AsyncSession, None, None]:
+    """Create a fresh async database session for each test."""
+    create_tables(bind=engine)
+    session = TestingAsyncSessionLocal()
+
+    try:
+        yield session
+    finally:
+        # Async tests run on the session event loop, so close the session there
+        event_loop.run_until_complete(session.close())
+        Base.metadata.drop_all(bind=engine)
+        with engine.begin() as connection:
+            drop_search_indexes(connection)
+
+
+@pytest.fixture
+def async_session_factory(async_db_session):
+    """Get the factory for extra async sessions on the test database."""
+    return TestingAsyncSessionLocal
+
+
 @pytest.fixture(scope="function")
 def client(db_session) -> Generator[TestClient, None, None]:
     """Create a test client with dependency overrides."""
@@ -64,7 +109,13 @@ def client(db_session) -> Generator[TestClient, None, None]:
         finally:
             pass
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
 
     with TestClient(app) as test_client:
         yield test_client
@@ -0,0 +1,157 @@
+"""
+Integration tests for ETag and conditional GET on list endpoints
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.auth import get_current_user
+from app.database import get_async_db, get_read_db
+from app.main import app
+from app.middleware.rate_limiting import rate_limiters
+from app.models import Blacklist, Message, Settings, User
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(api_id="x", api_hash="x", phone_number="+1234567890")
+    # Registration creates the settings row along with the user
+    db_session.add_all([user, Settings(user=user)])
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def user_client(async_session_factory, user):
+    """Client authenticated as user, without the scheduler and background tasks"""
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    yield TestClient(app)
+
+    app.dependency_overrides.clear()
+    # Polling tests would otherwise use up the request budget of later tests
+    for limiter in rate_limiters.values():
+        limiter.clients.clear()
+
+
+class TestConditionalGet:
+    """Test list endpoints answer unchanged polls with 304"""
+
+    @pytest.mark.parametrize(
+        "path", ["/api/v1/messages/", "/api/v1/groups/", "/api/v1/blacklist/", "/api/v1/settings/"]
+    )
+    def test_matching_etag_returns_304(self, user_client, path):
+        """Test a repeated request with If-None-Match gets an empty 304"""
+        first = user_client.get(path)
+        etag = first.headers["ETag"]
+
+        second = user_client.get(path, headers={"If-None-Match": etag})
+
+        assert first.status_code == 200
+        assert etag.startswith('W/"')
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["ETag"] == etag
+
+    def test_write_changes_etag(self, user_client, user, db_session):
+        """Test a new template changes the ETag and the list is sent again"""
+        etag = user_client.get("/api/v1/messages/").headers["ETag"]
+
+        created = user_client.post("/api/v1/messages/", json={"title": "A", "content": "Hello"})
+        response = user_client.get("/api/v1/messages/", headers={"If-None-Match": etag})
+
+        assert created.status_code == 200
+        assert response.status_code == 200
+        assert [message["title"] for message in response.json()] == ["A"]
+        assert response.headers["ETag"] != etag
+
+    def test_update_within_same_second_changes_etag(self, user_client, db_session, user):
+        """Test the in-memory version catches updates the timestamp cannot"""
+        message = Message(user_id=user.id, title="A", content="Hello")
+        db_session.add(message)
+        db_session.commit()
+
+        etag = user_client.get("/api/v1/messages/").headers["ETag"]
+        user_client.post(f"/api/v1/messages/{message.id}/toggle")
+        user_client.post(f"/api/v1/messages/{message.id}/toggle")
+
+        response = user_client.get("/api/v1/messages/", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+
+    def test_query_string_is_part_of_etag(self, user_client):
+        """Test different pages of the same rows have different ETags"""
+        first = user_client.get("/api/v1/messages/?limit=10").headers["ETag"]
+        second = user_client.get("/api/v1/messages/?limit=20").headers["ETag"]
+
+        assert first != second
+
+    def test_expired_blacklist_entry_changes_etag(self, user_client, db_session, user):
+        """Test an entry passing its expiry time changes the ETag without a write"""
+        db_session.add(
+            Blacklist(
+                user_id=user.id,
+                group_id="-1",
+                blacklist_type="temporary",
+                expires_at=datetime.utcnow() + timedelta(seconds=1),
+            )
+        )
+        db_session.commit()
+        first = user_client.get("/api/v1/blacklist/")
+
+        # A bulk update records no write, like time passing the expiry
+        db_session.query(Blacklist).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+        db_session.commit()
+        second = user_client.get(
+            "/api/v1/blacklist/", headers={"If-None-Match": first.headers["ETag"]}
+        )
+
+        assert len(first.json()) == 1
+        assert second.status_code == 200
+        assert second.json() == []
+
+    def test_other_user_gets_different_etag(self, user_client, db_session, user):
+        """Test users with identical data never share an ETag"""
+        other = User(api_id="y", api_hash="y", phone_number="+1987654321")
+        db_session.add(other)
+        db_session.commit()
+
+        etag = user_client.get("/api/v1/messages/").headers["ETag"]
+        app.dependency_overrides[get_current_user] = lambda: other
+        response = user_client.get("/api/v1/messages/", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+
+    def test_batch_changes_etag(self, user_client, db_session, user):
+        """Test bulk updates made by a batch request change the ETag"""
+        message = Message(user_id=user.id, title="A", content="Hello")
+        db_session.add(message)
+        db_session.commit()
+
+        etag = user_client.get("/api/v1/messages/").headers["ETag"]
+        batch = user_client.post(
+            "/api/v1/messages/batch", json={"items": [{"id": message.id, "action": "toggle"}]}
+        )
+        response = user_client.get("/api/v1/messages/", headers={"If-None-Match": etag})
+
+        assert batch.json()["results"] == [
+            {
+                "id": message.id,
+                "action": "toggle",
+                "success": True,
+                "is_active": False,
+                "error": None,
+            }
+        ]
+        assert response.status_code == 200
+        assert response.json()[0]["is_active"] is False
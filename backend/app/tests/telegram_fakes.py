@@ -0,0 +1,106 @@
+"""
+Telethon entities and a fake client shared by the Telegram service tests
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from telethon.errors import ChannelInvalidError, ChannelPrivateError
+from telethon.tl.functions.channels import GetChannelsRequest, GetFullChannelRequest
+from telethon.tl.functions.messages import GetChatsRequest, GetFullChatRequest
+from telethon.tl.types import Channel, Chat, ChatBannedRights, ChatPhotoEmpty
+
+from app.services.telegram_service import telegram_service
+
+# A realistic channel ID, so "-100<id>" group IDs match Telethon's marked IDs
+BASE_ID = 1234567000
+
+
+def channel(id, title=None, username=None, megagroup=True, banned=False):
+    """A supergroup (or a broadcast channel without megagroup) the account has joined"""
+    return Channel(
+        id=id,
+        title=title or f"Group {id}",
+        photo=ChatPhotoEmpty(),
+        date=datetime(2024, 1, 1),
+        access_hash=id * 10,
+        megagroup=megagroup,
+        broadcast=not megagroup,
+        username=username,
+        default_banned_rights=ChatBannedRights(until_date=None, send_messages=banned),
+    )
+
+
+def chat(id, title=None, **kwargs):
+    """A basic group the account has joined"""
+    return Chat(
+        id=id,
+        title=title or f"Group {id}",
+        photo=ChatPhotoEmpty(),
+        participants_count=3,
+        date=datetime(2024, 1, 1),
+        version=1,
+        **kwargs,
+    )
+
+
+class FakeTelegramClient:
+    """
+    Stands in for a TelegramClient whose account has joined the given
+    entities. Answers the requests the services make; peers in invalid fail
+    a whole GetChannelsRequest, peers in private fail GetFullChannelRequest,
+    and error, when set, is raised by every request.
+    """
+
+    def __init__(self, entities=(), slowmode=None, invalid=(), private=(), error=None):
+        self.entities = {entity.id: entity for entity in entities}
+        self.slowmode = slowmode or {}
+        self.invalid = set(invalid)
+        self.private = set(private)
+        self.error = error
+        self.requests = []
+        self.sent = []
+
+    def remember_peers(self):
+        """Put every entity in the service's input peer cache, as a dialog read would"""
+        for entity in self.entities.values():
+            telegram_service.remember_peer(self, entity)
+        return self
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        if self.error is not None:
+            raise self.error
+
+        if isinstance(request, (GetChannelsRequest, GetChatsRequest)):
+            if isinstance(request, GetChannelsRequest):
+                ids = [peer.channel_id for peer in request.id]
+            else:
+                ids = list(request.id)
+            if self.invalid.intersection(ids):
+                raise ChannelInvalidError(request=request)
+            return SimpleNamespace(chats=[self.entities[id] for id in ids if id in self.entities])
+
+        if isinstance(request, GetFullChannelRequest):
+            id = request.channel.channel_id
+            if id in self.private:
+                raise ChannelPrivateError(request=request)
+        elif isinstance(request, GetFullChatRequest):
+            id = request.chat_id
+        else:
+            raise NotImplementedError(type(request).__name__)
+        return SimpleNamespace(
+            full_chat=SimpleNamespace(id=id, slowmode_seconds=self.slowmode.get(id)),
+            chats=[self.entities[id]],
+        )
+
+    async def iter_dialogs(self):
+        for entity in self.entities.values():
+            is_group = isinstance(entity, Chat) or bool(entity.megagroup)
+            yield SimpleNamespace(entity=entity, is_group=is_group)
+
+    async def send_message(self, peer, message):
+        self.sent.append((peer, message))
+
+    async def get_input_entity(self, peer):
+        raise ValueError(f"Could not find the input entity for {peer}")
@@ -0,0 +1,137 @@
+"""
+Unit tests for the async TTL cache
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """Test expiry, invalidation and single-flight loading"""
+
+    def test_value_is_cached_until_expiry(self):
+        """Test a value is loaded once and again after the TTL"""
+        clock = FakeClock()
+        cache = TTLCache("test", ttl=5, clock=clock)
+        loads = []
+
+        async def loader():
+            loads.append(clock.now)
+            return len(loads)
+
+        async def run():
+            first = await cache.get_or_load("key", loader)
+            clock.now = 4.9
+            second = await cache.get_or_load("key", loader)
+            clock.now = 5.0
+            third = await cache.get_or_load("key", loader)
+            return first, second, third
+
+        assert asyncio.run(run()) == (1, 1, 2)
+        assert loads == [0.0, 5.0]
+
+    def test_concurrent_misses_share_one_load(self):
+        """Test callers arriving during a load wait for it instead of loading again"""
+        cache = TTLCache("test", ttl=5)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        async def run():
+            return await asyncio.gather(*(cache.get_or_load("key", loader) for _ in range(10)))
+
+        assert asyncio.run(run()) == ["value"] * 10
+        assert calls == 1
+
+    def test_errors_reach_every_waiter_and_are_not_cached(self):
+        """Test a failed load raises for all waiters and the next call retries"""
+        cache = TTLCache("test", ttl=5)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            if calls == 1:
+                raise RuntimeError("database unavailable")
+            return "value"
+
+        async def run():
+            results = await asyncio.gather(
+                *(cache.get_or_load("key", loader) for _ in range(3)), return_exceptions=True
+            )
+            return results, await cache.get_or_load("key", loader)
+
+        results, retried = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert retried == "value"
+
+    def test_mark_changed_during_load_is_not_overwritten(self):
+        """Test a load overtaken by a write answers its caller but is not stored"""
+        cache = TTLCache("test", ttl=5)
+        version = 1
+
+        async def loader():
+            loaded = version
+            await asyncio.sleep(0.01)
+            return loaded
+
+        async def run():
+            nonlocal version
+            pending = asyncio.ensure_future(cache.get_or_load("key", loader))
+            await asyncio.sleep(0)
+            version = 2
+            cache.mark_changed("key")
+            stale = await pending
+            return stale, await cache.get_or_load("key", loader)
+
+        assert asyncio.run(run()) == (1, 2)
+
+    def test_cancelled_loader_lets_waiters_retry(self):
+        """Test waiters load again when the caller running the load is cancelled"""
+        cache = TTLCache("test", ttl=5)
+
+        async def slow():
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "value"
+
+        async def run():
+            leader = asyncio.ensure_future(cache.get_or_load("key", slow))
+            await asyncio.sleep(0)
+            waiter = asyncio.ensure_future(cache.get_or_load("key", fast))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await waiter
+
+        assert asyncio.run(run()) == "value"
+
+    def test_oldest_entry_is_evicted(self):
+        """Test the cache holds at most max_entries values"""
+        cache = TTLCache("test", ttl=5, max_entries=2)
+
+        async def run():
+            for key in ("a", "b", "c"):
+                await cache.get_or_load(key, lambda: asyncio.sleep(0, result=key))
+
+        asyncio.run(run())
+        assert len(cache) == 2
+        assert "a" not in cache._entries
@@ -0,0 +1,160 @@
+"""
+Unit tests for the response compression middleware
+"""
+
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"groups":[' + b",".join(b'{"id":%d,"name":"Group"}' % i for i in range(200)) + b"]}"
+
+
+def make_app(response):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/")
+    async def endpoint():
+        return response()
+
+    return app
+
+
+async def run(app, accept_encoding="gzip"):
+    """Call app and get the response start message and body messages"""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # The client stays connected
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start, *bodies = messages
+    return start, dict(start["headers"]), bodies
+
+
+class TestChooseEncoding:
+    """Test Accept-Encoding negotiation"""
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ("gzip, deflate", "gzip"),
+            ("GZIP", "gzip"),
+            ("deflate", None),
+            ("", None),
+            ("gzip;q=0", None),
+            ("*", "gzip"),
+            ("*, gzip;q=0", None),
+            ("identity;q=1, gzip;q=0.5", "gzip"),
+        ],
+    )
+    def test_choose_encoding(self, header, expected, monkeypatch):
+        """Test quality values and wildcards are honoured"""
+        monkeypatch.setattr("app.middleware.compression.brotli", None)
+        assert choose_encoding(header) == expected
+
+    def test_brotli_preferred_when_installed(self):
+        """Test brotli wins over gzip unless the client weights gzip higher"""
+        pytest.importorskip("brotli")
+        assert choose_encoding("gzip, br") == "br"
+        assert choose_encoding("gzip, br;q=0.5") == "gzip"
+
+
+class TestCompressionMiddleware:
+    """Test which responses are compressed and how"""
+
+    def test_large_response_is_compressed(self):
+        """Test a body over the minimum size is gzipped with a correct length"""
+        client = TestClient(make_app(lambda: Response(BODY, media_type="application/json")))
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(BODY)
+        assert response.content == BODY
+
+    def test_small_response_is_not_compressed(self):
+        """Test a body under the minimum size is sent as it is"""
+        client = TestClient(make_app(lambda: Response(b"{}", media_type="application/json")))
+
+        response = client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content == b"{}"
+
+    def test_client_without_gzip_gets_identity(self):
+        """Test nothing is compressed for clients that do not accept it"""
+        client = TestClient(make_app(lambda: Response(BODY, media_type="application/json")))
+
+        response = client.get("/", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert response.content == BODY
+
+    @pytest.mark.parametrize(
+        "response",
+        [
+            lambda: Response(BODY, media_type="text/event-stream"),
+            lambda: Response(BODY, media_type="image/png"),
+            lambda: Response(status_code=304, headers={"ETag": 'W/"a"'}),
+            lambda: Response(BODY, media_type="text/plain", headers={"Content-Encoding": "br"}),
+        ],
+    )
+    @pytest.mark.asyncio
+    async def test_ineligible_response_is_untouched(self, response):
+        """Test event streams, binary types, 304s and encoded bodies pass through"""
+        start, headers, bodies = await run(make_app(response))
+
+        assert headers == dict(response().raw_headers)
+        assert b"".join(body["body"] for body in bodies) == response().body
+
+    @pytest.mark.asyncio
+    async def test_stream_is_compressed_chunk_by_chunk(self):
+        """Test every streamed chunk can be decoded as soon as it arrives"""
+        chunks = [b'{"done":%d}\n' % i for i in range(3)]
+
+        async def produce():
+            for chunk in chunks:
+                yield chunk
+
+        app = make_app(lambda: StreamingResponse(produce(), media_type="application/x-ndjson"))
+        start, headers, bodies = await run(app)
+        decoder = zlib.decompressobj(31)
+
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        for chunk, body in zip(chunks, bodies):
+            assert decoder.decompress(body["body"]) == chunk
+        assert gzip.decompress(b"".join(body["body"] for body in bodies)) == b"".join(chunks)
+
+    @pytest.mark.asyncio
+    async def test_strong_etag_is_weakened(self):
+        """Test a compressed body does not keep a byte-exact validator"""
+        app = make_app(lambda: Response(BODY, media_type="text/plain", headers={"ETag": '"v1"'}))
+
+        start, headers, bodies = await run(app)
+
+        assert headers[b"etag"] == b'W/"v1"'
@@ -0,0 +1,176 @@
+"""
+Unit tests for the generic CRUD base
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import inspect
+
+from app.core.db_instrumentation import track_queries
+from app.crud.base import CRUDBase
+from app.models import Group, Log, Message, MessageUpdate, User
+
+
+@pytest.fixture
+def user(db_session) -> User:
+    user = User(api_id="x", api_hash="x", phone_number="x")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def logs(db_session, user):
+    # Three rows per timestamp so pages split ties
+    start = datetime(2024, 1, 1)
+    db_session.add_all(
+        Log(
+            user_id=user.id,
+            group_id=f"-100{index}",
+            status="success" if index % 4 else "failed",
+            created_at=start + timedelta(minutes=index // 3),
+        )
+        for index in range(25)
+    )
+    db_session.commit()
+    return db_session.query(Log).all()
+
+
+def walk(crud, db, order_by, order_desc=False, filters=None):
+    pages, cursor = [], None
+    while True:
+        items = crud.get_multi(
+            db,
+            limit=4,
+            cursor=cursor,
+            filters=filters,
+            order_by=order_by,
+            order_desc=order_desc,
+        )
+        pages.append([item.id for item in items])
+        cursor = crud.next_cursor(items, limit=4, order_by=order_by, order_desc=order_desc)
+        if cursor is None:
+            return pages
+
+
+class TestKeysetPagination:
+    """Test cursor pagination in get_multi"""
+
+    @pytest.mark.parametrize("order_desc", [False, True])
+    def test_pages_match_offset_order(self, db_session, logs, order_desc):
+        """Test walking cursors returns every row once, in offset order"""
+        crud = CRUDBase(Log)
+        expected = [
+            log.id
+            for log in crud.get_multi(
+                db_session, limit=100, order_by="created_at", order_desc=order_desc
+            )
+        ]
+
+        pages = walk(crud, db_session, order_by="created_at", order_desc=order_desc)
+
+        assert [log_id for page in pages for log_id in page] == expected
+        assert len(expected) == 25
+        assert all(len(page) == 4 for page in pages[:-1])
+
+    def test_cursor_with_filters(self, db_session, logs):
+        """Test cursors combine with filters"""
+        crud = CRUDBase(Log)
+
+        pages = walk(crud, db_session, filters={"status": "success"}, order_by="id")
+
+        ids = [log_id for page in pages for log_id in page]
+        assert ids == sorted(log.id for log in logs if log.status == "success")
+
+    def test_cursor_must_match_ordering(self, db_session, logs):
+        """Test a cursor cannot be reused with another ordering"""
+        crud = CRUDBase(Log)
+        items = crud.get_multi(db_session, limit=4, order_by="created_at")
+        cursor = crud.next_cursor(items, limit=4, order_by="created_at")
+
+        with pytest.raises(ValueError):
+            crud.get_multi(db_session, cursor=cursor, order_by="created_at", order_desc=True)
+        with pytest.raises(ValueError):
+            crud.get_multi(db_session, cursor="not-a-cursor", order_by="created_at")
+
+    def test_cursor_needs_indexed_ordering(self, db_session, logs):
+        """Test keyset pagination is refused on unindexed columns"""
+        crud = CRUDBase(Log)
+        items = crud.get_multi(db_session, limit=4, order_by="status")
+        cursor = crud.next_cursor(items, limit=4, order_by="status")
+
+        with pytest.raises(ValueError, match="index"):
+            crud.get_multi(db_session, cursor=cursor, order_by="status")
+
+
+class TestProjectionAndFilters:
+    """Test column projection and cached filter specs"""
+
+    def test_load_only_requested_columns(self, db_session, user):
+        """Test unrequested columns are not loaded"""
+        db_session.add(Group(user_id=user.id, group_id="-1", group_name="a", invite_link="x"))
+        db_session.commit()
+        db_session.expunge_all()
+        crud = CRUDBase(Group)
+
+        with track_queries() as stats:
+            (group,) = crud.get_multi(db_session, columns=["group_name"], order_by="created_at")
+
+        unloaded = inspect(group).unloaded
+        assert stats.count == 1
+        assert "invite_link" in unloaded
+        assert "group_name" not in unloaded
+        assert "created_at" not in unloaded
+
+    def test_filter_specs_are_cached_by_shape(self, db_session, logs):
+        """Test filters with the same shape reuse one compiled spec"""
+        crud = CRUDBase(Log)
+
+        failed = crud.count(db_session, filters={"status": "failed", "group_id": ["-1000"]})
+        success = crud.count(db_session, filters={"status": "success", "group_id": ["-1001"]})
+        ranged = crud.count(db_session, filters={"id": {"gte": 3, "lte": 5}, "unknown": 1})
+
+        assert (failed, success, ranged) == (1, 1, 3)
+        assert len(crud._filter_specs) == 2
+
+
+class TestWrites:
+    """Test update and bulk_create fast paths"""
+
+    def test_update_sets_columns_without_refresh(self, db_session, user):
+        """Test update only touches mapped columns and skips the refresh SELECT"""
+        message = Message(user_id=user.id, title="a", content="a")
+        db_session.add(message)
+        db_session.commit()
+        db_session.refresh(message)
+        crud = CRUDBase(Message)
+
+        with track_queries() as stats:
+            crud.update(db_session, db_obj=message, obj_in={"title": "b", "not_a_column": 1})
+
+        assert stats.count == 1
+        assert message.title == "b"
+
+        updated = crud.update(db_session, db_obj=message, obj_in=MessageUpdate(content="c"))
+        assert (updated.title, updated.content) == ("b", "c")
+
+    def test_bulk_create_fills_primary_keys(self, db_session, user):
+        """Test chunked inserts return objects with the keys of their rows"""
+        db_session.add(Group(user_id=user.id, group_id="-1"))
+        db_session.commit()
+        crud = CRUDBase(Group)
+        rows = [
+            {"user_id": user.id, "group_id": f"-100{index}", "group_name": f"g{index}"}
+            for index in range(2500)
+        ]
+
+        with track_queries() as stats:
+            groups = crud.bulk_create(db_session, objs_in=rows, chunk_size=1000)
+
+        # One executemany and one last_insert_rowid() per chunk
+        assert stats.count == 6
+        assert len({group.id for group in groups}) == 2500
+        stored = dict(db_session.query(Group.id, Group.group_id).all())
+        assert all(stored[group.id] == group.group_id for group in groups)
+        assert db_session.query(Group).count() == 2501
@@ -0,0 +1,207 @@
+"""
+Unit tests for database engine creation
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+
+from app import database
+from app.core.config import get_read_database_url, get_settings
+from app.database import create_async_db_engine, create_db_engine, sqlite_pragmas_from_settings
+
+
+def read_pragmas(connection, names):
+    return {name: connection.execute(text(f"PRAGMA {name}")).scalar() for name in names}
+
+
+@pytest.fixture
+def pragmas():
+    return sqlite_pragmas_from_settings(get_settings())
+
+
+class TestSqlitePragmas:
+    """Test pragmas applied to new SQLite connections"""
+
+    def test_file_database_gets_tuned_pragmas(self, tmp_path, pragmas):
+        """Test WAL, relaxed sync, busy timeout and in-memory temp store on a file"""
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", sqlite_pragmas=pragmas)
+        try:
+            with engine.connect() as connection:
+                values = read_pragmas(
+                    connection, ["journal_mode", "synchronous", "busy_timeout", "temp_store"]
+                )
+        finally:
+            engine.dispose()
+
+        assert values == {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "busy_timeout": pragmas["busy_timeout"],
+            "temp_store": 2,
+        }
+
+    def test_async_engine_gets_tuned_pragmas(self, tmp_path, pragmas):
+        """Test the aiosqlite engine applies the same pragmas"""
+
+        async def run():
+            engine = create_async_db_engine(
+                f"sqlite:///{tmp_path / 'app.db'}", sqlite_pragmas=pragmas
+            )
+            try:
+                async with engine.connect() as connection:
+                    return await connection.run_sync(
+                        read_pragmas, ["journal_mode", "synchronous", "busy_timeout"]
+                    )
+            finally:
+                await engine.dispose()
+
+        values = asyncio.run(run())
+
+        assert values == {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "busy_timeout": pragmas["busy_timeout"],
+        }
+
+    @pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+    def test_memory_database_skips_journal_mode_and_mmap(self, url, pragmas, monkeypatch):
+        """Test in-memory databases do not get file-only pragmas"""
+        installed = []
+        install = database._install_sqlite_pragmas
+
+        def capture(engine, applied):
+            installed.append(applied)
+            install(engine, applied)
+
+        monkeypatch.setattr(database, "_install_sqlite_pragmas", capture)
+        engine = create_db_engine(url, sqlite_pragmas=pragmas)
+        try:
+            with engine.connect() as connection:
+                values = read_pragmas(connection, ["journal_mode", "synchronous"])
+        finally:
+            engine.dispose()
+
+        assert "journal_mode" not in installed[0]
+        assert "mmap_size" not in installed[0]
+        assert installed[0]["synchronous"] == pragmas["synchronous"]
+        assert values == {"journal_mode": "memory", "synchronous": 1}
+
+
+class TestPoolSettings:
+    """Test pool settings are passed to the engine"""
+
+    def test_file_database_uses_pool_settings(self, tmp_path):
+        """Test pool size, overflow, timeout and recycle apply to SQLite files"""
+        engine = create_db_engine(
+            f"sqlite:///{tmp_path / 'app.db'}",
+            pool_size=3,
+            max_overflow=2,
+            pool_timeout=7,
+            pool_recycle=60,
+        )
+        try:
+            assert engine.pool.size() == 3
+            assert engine.pool._max_overflow == 2
+            assert engine.pool._timeout == 7
+            assert engine.pool._recycle == 60
+        finally:
+            engine.dispose()
+
+
+class TestReadOnlyEngine:
+    """Test the read-only engine used by analytics and list endpoints"""
+
+    def test_read_only_engine_rejects_writes(self, tmp_path, pragmas):
+        """Test read-only SQLite connections are query_only"""
+        url = f"sqlite:///{tmp_path / 'app.db'}"
+
+        async def run():
+            engine = create_async_db_engine(url, sqlite_pragmas=pragmas)
+            read_engine = create_async_db_engine(url, sqlite_pragmas=pragmas, read_only=True)
+            try:
+                async with engine.begin() as connection:
+                    await connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+                    await connection.execute(text("INSERT INTO items (id) VALUES (1)"))
+
+                async with read_engine.connect() as connection:
+                    count = await connection.scalar(text("SELECT count(*) FROM items"))
+                    with pytest.raises(OperationalError, match="readonly"):
+                        await connection.execute(text("INSERT INTO items (id) VALUES (2)"))
+                return count
+            finally:
+                await read_engine.dispose()
+                await engine.dispose()
+
+        assert asyncio.run(run()) == 1
+
+    def test_open_read_does_not_block_commit(self, tmp_path, pragmas):
+        """Test a writer commits while a WAL reader holds an open transaction"""
+        url = f"sqlite:///{tmp_path / 'app.db'}"
+
+        async def run():
+            engine = create_async_db_engine(url, sqlite_pragmas={**pragmas, "busy_timeout": 0})
+            read_engine = create_async_db_engine(url, sqlite_pragmas=pragmas, read_only=True)
+            try:
+                async with engine.begin() as connection:
+                    await connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+
+                async with read_engine.connect() as reader:
+                    await reader.execute(text("BEGIN"))
+                    assert await reader.scalar(text("SELECT count(*) FROM items")) == 0
+
+                    async with engine.begin() as writer:
+                        await writer.execute(text("INSERT INTO items (id) VALUES (1)"))
+
+                    # The reader keeps its snapshot until its transaction ends
+                    assert await reader.scalar(text("SELECT count(*) FROM items")) == 0
+                    await reader.execute(text("COMMIT"))
+                    return await reader.scalar(text("SELECT count(*) FROM items"))
+            finally:
+                await read_engine.dispose()
+                await engine.dispose()
+
+        assert asyncio.run(run()) == 1
+
+    def test_read_url_defaults_to_primary(self, monkeypatch):
+        """Test reads use the primary database unless a replica is configured"""
+        settings = get_settings()
+        monkeypatch.setattr(settings, "database_read_url", None)
+        assert get_read_database_url() == database.get_database_url()
+
+        monkeypatch.setattr(settings, "database_read_url", "postgres://replica/app")
+        assert get_read_database_url() == "postgresql://replica/app"
+
+
+class TestCreateTables:
+    """Test tables and indexes are brought up to date on startup"""
+
+    def test_duplicate_blacklist_entries_are_removed(self, tmp_path, pragmas):
+        """Test only the newest entry per group is kept before the unique index is created"""
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'app.db'}", sqlite_pragmas=pragmas)
+        try:
+            database.create_tables(bind=engine)
+            with engine.begin() as connection:
+                connection.execute(text("DROP INDEX uq_blacklist_user_group"))
+                connection.execute(
+                    text(
+                        "INSERT INTO blacklist (id, user_id, group_id, blacklist_type) VALUES "
+                        "(1, 1, '-1', 'temporary'), (2, 1, '-1', 'permanent'), "
+                        "(3, 1, '-2', 'permanent'), (4, 2, '-1', 'permanent')"
+                    )
+                )
+
+            database.create_tables(bind=engine)
+
+            with engine.connect() as connection:
+                rows = connection.execute(
+                    text("SELECT id, blacklist_type FROM blacklist ORDER BY id")
+                ).all()
+                indexes = {index["name"] for index in inspect(connection).get_indexes("blacklist")}
+        finally:
+            engine.dispose()
+
+        assert rows == [(2, "permanent"), (3, "permanent"), (4, "permanent")]
+        assert "uq_blacklist_user_group" in indexes
@@ -0,0 +1,99 @@
+"""
+Unit tests for database query instrumentation
+"""
+
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core import db_instrumentation
+from app.core.db_instrumentation import QueryStats, statement_shape, track_queries
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        connection.execute(text("INSERT INTO items (name) VALUES ('a'), ('b'), ('c')"))
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+class TestStatementShape:
+    """Test statement normalization"""
+
+    @pytest.mark.parametrize(
+        "statement",
+        [
+            "SELECT * FROM items WHERE id IN (?, ?)",
+            "SELECT * FROM items WHERE id IN (?, ?, ?, ?)",
+            "SELECT * FROM items WHERE id IN (%s, %s, %s)",
+            "SELECT * FROM items WHERE id IN ($1, $2, $3)",
+            "SELECT * FROM items WHERE id IN (%(id_1)s, %(id_2)s)",
+            "SELECT *\n  FROM items\n WHERE id IN ( ?,? )",
+        ],
+    )
+    def test_in_lists_collapse_to_one_shape(self, statement):
+        """Test IN lists of any length and paramstyle share a shape"""
+        assert statement_shape(statement) == "SELECT * FROM items WHERE id IN (?)"
+
+    def test_single_parameter_is_kept(self):
+        """Test a single bound parameter in parentheses is not rewritten"""
+        assert statement_shape("SELECT count(?) FROM items") == "SELECT count(?) FROM items"
+
+
+class TestRepeatedShapes:
+    """Test N+1 candidate detection"""
+
+    def test_threshold_is_inclusive(self):
+        """Test shapes at or above the threshold are reported, most frequent first"""
+        stats = QueryStats()
+        stats.shapes = {"SELECT a": 3, "SELECT b": 10, "SELECT c": 12}
+
+        assert stats.repeated_shapes(10) == [("SELECT c", 12), ("SELECT b", 10)]
+        assert stats.repeated_shapes(13) == []
+
+    def test_repeated_statements_are_counted_and_logged(self, sqlite_engine, caplog, monkeypatch):
+        """Test a per-row query loop is attributed to the scope and reported"""
+        monkeypatch.setattr(db_instrumentation, "REPEATED_STATEMENT_THRESHOLD", 3)
+
+        with caplog.at_level(logging.WARNING, logger="app.core.db_instrumentation"):
+            with track_queries("GET /items") as stats, sqlite_engine.connect() as connection:
+                for item_id in (1, 2, 3):
+                    connection.execute(
+                        text("SELECT name FROM items WHERE id = :id"), {"id": item_id}
+                    )
+
+        assert stats.count == 3
+        assert "Possible N+1 in GET /items: statement executed 3 times" in caplog.text
+
+
+class TestSlowStatements:
+    """Test slow statement capture"""
+
+    def test_slow_select_captures_query_plan(self, sqlite_engine, monkeypatch):
+        """Test slow SELECTs are kept with their EXPLAIN QUERY PLAN output"""
+        monkeypatch.setattr(db_instrumentation, "SLOW_QUERY_SECONDS", 0)
+        monkeypatch.setattr(db_instrumentation, "EXPLAIN_SLOW_QUERIES", True)
+
+        with track_queries("GET /items") as stats, sqlite_engine.connect() as connection:
+            connection.execute(text("SELECT name FROM items WHERE id = :id"), {"id": 1})
+
+        assert len(stats.slowest) == 1
+        elapsed, statement, plan = stats.slowest[0]
+        assert statement.startswith("SELECT name FROM items")
+        assert "SEARCH items USING INTEGER PRIMARY KEY" in plan
+
+    def test_query_plan_skipped_when_disabled(self, sqlite_engine, monkeypatch):
+        """Test slow statements are still recorded without EXPLAIN when disabled"""
+        monkeypatch.setattr(db_instrumentation, "SLOW_QUERY_SECONDS", 0)
+        monkeypatch.setattr(db_instrumentation, "EXPLAIN_SLOW_QUERIES", False)
+
+        with track_queries() as stats, sqlite_engine.connect() as connection:
+            connection.execute(text("SELECT name FROM items"))
+
+        assert stats.slowest[0][2] is None
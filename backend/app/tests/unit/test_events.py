@@ -0,0 +1,131 @@
+"""
+Unit tests for the live event bus and the scheduler event stream
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.api.v1.scheduler import stream_scheduler_events
+from app.core.events import RESYNC, EventBus
+from app.models import User
+
+
+def drain(subscription):
+    async def run():
+        events = []
+        while True:
+            event = await subscription.get(timeout=0)
+            if event is None:
+                return events
+            events.append(event)
+
+    return asyncio.run(run())
+
+
+class TestEventBus:
+    """Test per-user delivery, backpressure and resuming"""
+
+    def test_events_reach_only_the_users_subscribers(self):
+        """Test a user's events are not delivered to other users"""
+        bus = EventBus()
+        mine = bus.subscribe(1)
+        theirs = bus.subscribe(2)
+
+        bus.publish(1, "send", {"status": "success"})
+
+        events = drain(mine)
+        assert [(event.type, json.loads(event.data)) for event in events] == [
+            ("send", {"status": "success"})
+        ]
+        assert drain(theirs) == []
+
+    def test_full_queue_drops_oldest_and_asks_for_resync(self):
+        """Test a slow subscriber keeps the newest events and is told it missed some"""
+        bus = EventBus(queue_size=3)
+        subscription = bus.subscribe(1)
+
+        for index in range(5):
+            bus.publish(1, "send", {"index": index})
+
+        events = drain(subscription)
+        assert subscription.dropped == 2
+        assert events[0].type == RESYNC
+        assert [json.loads(event.data)["index"] for event in events[1:]] == [2, 3, 4]
+
+    def test_resume_replays_missed_events(self):
+        """Test subscribing with Last-Event-ID replays the user's later events"""
+        bus = EventBus()
+        first = bus.publish(1, "scheduler", {"is_running": True})
+        bus.publish(2, "send", {})
+        bus.publish(1, "send", {"status": "failed"})
+
+        events = drain(bus.subscribe(1, last_event_id=first.id))
+
+        assert [event.type for event in events] == ["send"]
+
+    @pytest.mark.parametrize("last_event_id", ["someoneelse-1", "garbage", "-1"])
+    def test_unknown_event_id_asks_for_resync(self, last_event_id):
+        """Test IDs from another process or run cannot be resumed"""
+        bus = EventBus()
+        bus.publish(1, "send", {})
+
+        events = drain(bus.subscribe(1, last_event_id=last_event_id))
+
+        assert [event.type for event in events] == [RESYNC]
+
+    def test_resume_past_history_asks_for_resync(self):
+        """Test a client that missed more than the replay buffer must reload"""
+        bus = EventBus(history_size=2)
+        first = bus.publish(1, "send", {})
+        for _ in range(3):
+            bus.publish(1, "send", {})
+
+        events = drain(bus.subscribe(1, last_event_id=first.id))
+
+        assert [event.type for event in events] == [RESYNC]
+
+    def test_unsubscribe_stops_delivery(self):
+        """Test a closed stream no longer receives or holds events"""
+        bus = EventBus()
+        subscription = bus.subscribe(1)
+        bus.unsubscribe(subscription)
+
+        bus.publish(1, "send", {})
+
+        assert bus.subscriber_count == 0
+        assert len(subscription) == 0
+
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return False
+
+
+class TestSchedulerEventStream:
+    """Test the Server-Sent Events endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_stream_sends_published_events(self, async_session_factory, monkeypatch):
+        """Test the stream formats events and unsubscribes when closed"""
+        bus = EventBus()
+        monkeypatch.setattr("app.api.v1.scheduler.event_bus", bus)
+        db = async_session_factory()
+
+        response = await stream_scheduler_events(
+            FakeRequest(), last_event_id=None, current_user=User(id=7), db=db
+        )
+        body = response.body_iterator
+
+        assert response.media_type == "text/event-stream"
+        assert await body.__anext__() == b"retry: 5000\n\n"
+
+        event = bus.publish(7, "scheduler", {"is_running": True})
+        chunk = await body.__anext__()
+
+        assert (
+            chunk == f'id: {event.id}\nevent: scheduler\ndata: {{"is_running": true}}\n\n'.encode()
+        )
+        await body.aclose()
+        assert bus.subscriber_count == 0
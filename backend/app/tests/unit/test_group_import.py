@@ -0,0 +1,250 @@
+"""
+Unit tests for bulk group import
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from sqlalchemy import select
+from telethon.errors import FloodWaitError
+from telethon.tl.types import InputPeerChannel, InputPeerChat
+
+from app.api.v1.groups import import_dialogs, import_groups
+from app.core.db_instrumentation import track_queries
+from app.models import Group, GroupImportRequest, User
+from app.services.group_service import group_service
+from app.services.telegram_service import telegram_service
+from app.tests.telegram_fakes import FakeTelegramClient, channel, chat
+
+
+class FakeResolver:
+    """Stands in for TelegramService.resolve_group"""
+
+    def __init__(self, groups=None, flood_waits=None):
+        self.groups = groups or {}
+        self.flood_waits = list(flood_waits or [])
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, client, group_input):
+        self.calls.append(group_input)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if self.flood_waits:
+                raise FloodWaitError(request=None, capture=self.flood_waits.pop(0))
+            if group_input not in self.groups:
+                raise Exception("Failed to resolve group: not found")
+            return self.groups[group_input]
+        finally:
+            self.running -= 1
+
+
+async def resolve_all(inputs, **kwargs):
+    return [result async for result in telegram_service.resolve_groups(None, inputs, **kwargs)]
+
+
+class TestResolveGroups:
+    """Test concurrent group lookups"""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, monkeypatch):
+        """Test no more than the given number of lookups run at once"""
+        resolver = FakeResolver({str(i): (f"-{i}", f"Group {i}", None) for i in range(10)})
+        monkeypatch.setattr(telegram_service, "resolve_group", resolver)
+
+        results = await resolve_all([str(i) for i in range(10)], concurrency=3)
+
+        assert resolver.max_running == 3
+        assert sorted(index for index, _, _ in results) == list(range(10))
+        assert all(error is None for _, _, error in results)
+
+    @pytest.mark.asyncio
+    async def test_flood_wait_pauses_and_retries(self, monkeypatch):
+        """Test a FloodWait holds every lookup back and the lookup is retried"""
+        resolver = FakeResolver({"a": ("-1", "A", None), "b": ("-2", "B", None)}, [1])
+        monkeypatch.setattr(telegram_service, "resolve_group", resolver)
+
+        started = time.monotonic()
+        results = await resolve_all(["a", "b"], concurrency=1)
+
+        assert time.monotonic() - started >= 1
+        assert sorted(resolver.calls) == ["a", "a", "b"]
+        assert all(error is None for _, _, error in results)
+
+    @pytest.mark.asyncio
+    async def test_long_flood_wait_fails_remaining_lookups(self, monkeypatch):
+        """Test a wait over the limit gives up instead of stalling the import"""
+        resolver = FakeResolver({"a": ("-1", "A", None), "b": ("-2", "B", None)}, [3600])
+        monkeypatch.setattr(telegram_service, "resolve_group", resolver)
+
+        results = await resolve_all(["a", "b"], concurrency=1, max_flood_wait=60)
+
+        assert resolver.calls == ["a"]
+        assert [error for _, _, error in results] == [
+            "Telegram asked to wait 3600 seconds, try again later"
+        ] * 2
+
+
+class TestImportGroups:
+    """Test the import service and its streaming endpoint"""
+
+    @pytest.mark.asyncio
+    async def test_import_reports_every_input(self, async_db_session, monkeypatch):
+        """Test inputs are added, reactivated, kept or rejected in one transaction"""
+        db = async_db_session
+        user = User(api_id="x", api_hash="x", phone_number="x")
+        db.add(user)
+        await db.commit()
+        db.add_all(
+            [
+                Group(user_id=user.id, group_id="-1", group_name="Old", is_active=False),
+                Group(user_id=user.id, group_id="-2", group_name="Kept"),
+            ]
+        )
+        await db.commit()
+        resolver = FakeResolver(
+            {
+                "@one": ("-1", "One", "one"),
+                "@two": ("-2", "Two", "two"),
+                "https://t.me/three": ("-3", "Three", "three"),
+                "-3": ("-3", "Three", "three"),
+            }
+        )
+        monkeypatch.setattr(telegram_service, "resolve_group", resolver)
+        inputs = ["@one", "@two", "https://t.me/three", "-3", "@one", "@missing", " "]
+
+        records = [
+            record async for record in group_service.import_groups(db, None, user.id, inputs)
+        ]
+
+        outcomes = {
+            record["index"]: record["status"]
+            for record in records
+            if record["status"] not in ("resolved", "done")
+        }
+        assert outcomes == {
+            0: "reactivated",
+            1: "exists",
+            2: "added",
+            3: "duplicate",
+            4: "duplicate",
+            5: "failed",
+            6: "failed",
+        }
+        assert records[-1] == {
+            "status": "done",
+            "total": 7,
+            "added": 1,
+            "reactivated": 1,
+            "exists": 1,
+            "duplicate": 2,
+            "failed": 2,
+        }
+        added = next(record for record in records if record["status"] == "added")
+        assert added["group"]["invite_link"] == "https://t.me/three"
+
+        rows = await db.execute(select(Group.group_id, Group.group_name, Group.is_active))
+        assert sorted(rows.all()) == [
+            ("-1", "One", True),
+            ("-2", "Kept", True),
+            ("-3", "Three", True),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_endpoint_streams_ndjson(self, async_session_factory, monkeypatch):
+        """Test progress is streamed as one JSON record per line"""
+        monkeypatch.setattr(telegram_service, "resolve_group", FakeResolver())
+        monkeypatch.setitem(telegram_service.clients, "7", object())
+        db = async_session_factory()
+
+        response = await import_groups(
+            GroupImportRequest(group_inputs=["@missing"]), current_user=User(id=7), db=db
+        )
+        lines = [chunk async for chunk in response.body_iterator]
+
+        assert response.media_type == "application/x-ndjson"
+        assert [json.loads(line)["status"] for line in lines] == ["failed", "done"]
+        assert all(line.endswith("\n") for line in lines)
+
+
+class TestImportDialogs:
+    """Test importing the groups of the account's dialog list"""
+
+    @pytest.mark.asyncio
+    async def test_iter_groups_caches_input_peers(self):
+        """Test only live groups are listed and their access hashes are kept"""
+        client = FakeTelegramClient(
+            [
+                channel(5, "Mega"),
+                channel(6, "News", megagroup=False),
+                chat(7, "Basic"),
+                chat(8, "Upgraded", migrated_to=InputPeerChannel(5, 50)),
+                chat(9, "Gone", deactivated=True),
+            ]
+        )
+
+        groups = [group async for group in telegram_service.iter_groups(client)]
+
+        assert groups == [("-1005", "Mega", None), ("-7", "Basic", None)]
+        assert telegram_service.get_peer(client, "-1005") == InputPeerChannel(5, 50)
+        assert telegram_service.get_peer(client, "-7") == InputPeerChat(7)
+        assert telegram_service.get_peer(client, "-42") == -42
+
+    @pytest.mark.asyncio
+    async def test_import_checks_existing_groups_per_chunk(self, async_db_session):
+        """Test new groups are inserted chunk by chunk and existing ones kept"""
+        db = async_db_session
+        user = User(api_id="x", api_hash="x", phone_number="x")
+        db.add(user)
+        await db.commit()
+        db.add(Group(user_id=user.id, group_id="-1002", group_name="Old", is_active=False))
+        await db.commit()
+        client = FakeTelegramClient(channel(i, f"Group {i}") for i in range(1, 6))
+
+        with track_queries() as stats:
+            records = [
+                record
+                async for record in group_service.import_dialogs(
+                    db, client, user.id, active=False, chunk_size=2
+                )
+            ]
+
+        # One existence check per chunk and one insert for each chunk with new groups
+        assert stats.count == 6
+        assert [(record["status"], record.get("group_id")) for record in records] == [
+            ("added", "-1001"),
+            ("exists", "-1002"),
+            ("added", "-1003"),
+            ("added", "-1004"),
+            ("added", "-1005"),
+            ("done", None),
+        ]
+        assert records[-1] == {"status": "done", "total": 5, "added": 4, "exists": 1, "failed": 0}
+
+        rows = await db.execute(select(Group.group_id, Group.group_name, Group.is_active))
+        assert sorted(rows.all()) == [
+            ("-1001", "Group 1", False),
+            ("-1002", "Old", False),
+            ("-1003", "Group 3", False),
+            ("-1004", "Group 4", False),
+            ("-1005", "Group 5", False),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_endpoint_streams_ndjson(self, async_session_factory, monkeypatch):
+        """Test dialog import progress is streamed as one JSON record per line"""
+        monkeypatch.setitem(telegram_service.clients, "7", FakeTelegramClient())
+        db = async_session_factory()
+
+        response = await import_dialogs(active=True, current_user=User(id=7), db=db)
+        lines = [chunk async for chunk in response.body_iterator]
+
+        assert response.media_type == "application/x-ndjson"
+        assert [json.loads(line) for line in lines] == [
+            {"status": "done", "total": 0, "added": 0, "exists": 0, "failed": 0}
+        ]
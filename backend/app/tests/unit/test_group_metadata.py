@@ -0,0 +1,117 @@
+"""
+Unit tests for the batched group metadata refresh
+"""
+
+import pytest
+from sqlalchemy import select
+from telethon.errors import ServerError
+from telethon.tl.types import ChannelForbidden
+
+from app.core.db_instrumentation import track_queries
+from app.models import Group, User
+from app.services.group_service import group_service
+from app.services.telegram_service import telegram_service
+from app.tests.telegram_fakes import BASE_ID, FakeTelegramClient, channel, chat
+
+
+class TestFetchGroupMetadata:
+    """Test metadata is fetched with multi-peer requests"""
+
+    @pytest.mark.asyncio
+    async def test_channels_are_fetched_in_chunks(self):
+        """Test one request is made per chunk of channels and per batch of chats"""
+        entities = [channel(BASE_ID + i, f"Group {i}") for i in range(5)] + [chat(7, "Basic")]
+        client = FakeTelegramClient(entities).remember_peers()
+
+        metadata = await telegram_service.fetch_group_metadata(
+            client, [f"-100{BASE_ID + i}" for i in range(5)] + ["-7"], chunk_size=2
+        )
+
+        assert len(client.requests) == 4
+        assert metadata[f"-100{BASE_ID}"] == ("Group 0", None)
+        assert metadata["-7"] == ("Basic", None)
+        assert len(metadata) == 6
+
+    @pytest.mark.asyncio
+    async def test_invalid_and_forbidden_groups_are_left_out(self):
+        """Test an invalid channel does not fail its chunk and lost groups are skipped"""
+        entities = [channel(BASE_ID + i, f"Group {i}") for i in range(4)]
+        client = FakeTelegramClient(entities, invalid={BASE_ID + 1}).remember_peers()
+        client.entities[BASE_ID + 2] = ChannelForbidden(
+            id=BASE_ID + 2, access_hash=1, title="Gone", megagroup=True
+        )
+
+        metadata = await telegram_service.fetch_group_metadata(
+            client, [f"-100{BASE_ID + i}" for i in range(4)] + ["-100999"]
+        )
+
+        assert sorted(metadata) == [f"-100{BASE_ID}", f"-100{BASE_ID + 3}"]
+        # The failed chunk is split until the invalid channel is on its own
+        assert [len(request.id) for request in client.requests] == [4, 2, 1, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_server_error_ends_the_fetch(self):
+        """Test a server error is raised at once instead of splitting the chunk"""
+        entities = [channel(BASE_ID + i, f"Group {i}") for i in range(4)]
+        client = FakeTelegramClient(
+            entities, error=ServerError(None, "RPC_CALL_FAIL", 500)
+        ).remember_peers()
+
+        with pytest.raises(ServerError):
+            await telegram_service.fetch_group_metadata(
+                client, [f"-100{BASE_ID + i}" for i in range(4)]
+            )
+
+        assert len(client.requests) == 1
+
+
+class TestRefreshMetadata:
+    """Test stored group metadata is diffed and bulk updated"""
+
+    @pytest.mark.asyncio
+    async def test_changed_groups_are_updated_in_one_statement(self, async_db_session):
+        """Test only groups whose name or username changed are written"""
+        db = async_db_session
+        user = User(api_id="x", api_hash="x", phone_number="x")
+        db.add(user)
+        await db.commit()
+        db.add_all(
+            [
+                Group(user_id=user.id, group_id=f"-100{BASE_ID}", group_name="Same"),
+                Group(user_id=user.id, group_id=f"-100{BASE_ID + 1}", group_name="Old"),
+                Group(user_id=user.id, group_id=f"-100{BASE_ID + 2}", group_name="Lost"),
+                Group(
+                    user_id=user.id,
+                    group_id=f"-100{BASE_ID + 3}",
+                    group_name="Inactive",
+                    is_active=False,
+                ),
+            ]
+        )
+        await db.commit()
+        client = FakeTelegramClient(
+            [
+                channel(BASE_ID, "Same"),
+                channel(BASE_ID + 1, "New", username="new"),
+                channel(BASE_ID + 3, "Renamed"),
+            ]
+        ).remember_peers()
+        telegram_service.remember_peer(client, channel(BASE_ID + 2, "Lost"))
+
+        with track_queries() as stats:
+            result = await group_service.refresh_metadata(db, client, user.id)
+
+        assert result == {"checked": 3, "updated": 1, "unreachable": 1}
+        assert len(client.requests) == 1
+        # The read and one executemany UPDATE
+        assert stats.count == 2
+
+        rows = await db.execute(
+            select(Group.group_id, Group.group_name, Group.username).order_by(Group.group_id)
+        )
+        assert rows.all() == [
+            (f"-100{BASE_ID}", "Same", None),
+            (f"-100{BASE_ID + 1}", "New", "new"),
+            (f"-100{BASE_ID + 2}", "Lost", None),
+            (f"-100{BASE_ID + 3}", "Inactive", None),
+        ]
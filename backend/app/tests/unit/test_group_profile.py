@@ -0,0 +1,149 @@
+"""
+Unit tests for cached group send permission and slow mode profiles
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from telethon.errors import ServerError, TimedOutError
+
+from app.models import Group, Message, User
+from app.services.group_queue_service import GroupQueue, QueuedGroup, group_queue_service
+from app.services.scheduler_service import scheduler_service
+from app.services.telegram_service import telegram_service
+from app.tests.telegram_fakes import BASE_ID, FakeTelegramClient, channel
+
+
+def make_client(count, banned=(), **kwargs):
+    entities = [channel(BASE_ID + i, banned=BASE_ID + i in banned) for i in range(count)]
+    return FakeTelegramClient(entities, **kwargs).remember_peers()
+
+
+class TestGroupProfile:
+    """Test profiles are fetched once, cached and kept current"""
+
+    @pytest.mark.asyncio
+    async def test_profile_is_cached(self):
+        """Test a second lookup within the TTL makes no request"""
+        client = make_client(1, slowmode={BASE_ID: 30})
+
+        first = await telegram_service.get_group_profile(client, f"-100{BASE_ID}")
+        second = await telegram_service.get_group_profile(client, f"-100{BASE_ID}")
+
+        assert first is second
+        assert (first.can_send, first.slowmode_seconds) == (True, 30)
+        assert len(client.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_profile_is_fetched_again(self, monkeypatch):
+        """Test profiles older than the TTL are checked again"""
+        monkeypatch.setattr(
+            "app.services.telegram_service.get_settings",
+            lambda: SimpleNamespace(group_profile_ttl_seconds=0),
+        )
+        client = make_client(1)
+
+        await telegram_service.get_group_profile(client, f"-100{BASE_ID}")
+        await telegram_service.get_group_profile(client, f"-100{BASE_ID}")
+
+        assert len(client.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_unwritable_groups(self):
+        """Test restricted and private groups are reported as unwritable"""
+        client = make_client(3, banned={BASE_ID + 1}, private={BASE_ID + 2})
+
+        profiles = [
+            await telegram_service.get_group_profile(client, f"-100{BASE_ID + i}") for i in range(3)
+        ]
+
+        assert [profile.can_send for profile in profiles] == [True, False, False]
+        assert await telegram_service.get_group_profile(client, "-100999") is None
+
+    @pytest.mark.parametrize(
+        "error", [ServerError(None, "RPC_CALL_FAIL", 500), TimedOutError(None, "Timeout", -503)]
+    )
+    @pytest.mark.asyncio
+    async def test_transient_errors_do_not_mark_groups_unwritable(self, error):
+        """Test server errors and timeouts keep the previous profile instead"""
+        client = make_client(2)
+        group_id = f"-100{BASE_ID}"
+        previous = await telegram_service.get_group_profile(client, group_id)
+        client.error = error
+
+        assert await telegram_service.get_group_profile(client, group_id, refresh=True) is previous
+        assert await telegram_service.get_group_profile(client, f"-100{BASE_ID + 1}") is None
+        assert f"-100{BASE_ID + 1}" not in telegram_service.group_profiles[client]
+
+    @pytest.mark.asyncio
+    async def test_send_starts_slowmode_window(self):
+        """Test a successful send blocks the group for its slow mode interval"""
+        client = make_client(1, slowmode={BASE_ID: 60})
+        group_id = f"-100{BASE_ID}"
+        await telegram_service.get_group_profile(client, group_id)
+
+        assert telegram_service.slowmode_remaining(client, group_id) == 0
+        await telegram_service.send_message(client, group_id, "hello")
+
+        assert 59 < telegram_service.slowmode_remaining(client, group_id) <= 60
+
+
+class TestSelectGroup:
+    """Test the scheduler only picks groups that can take a message now"""
+
+    @pytest.mark.asyncio
+    async def test_unwritable_and_slowed_groups_are_skipped(self):
+        """Test banned groups and groups inside their slow mode window are held back"""
+        client = make_client(3, slowmode={BASE_ID + 2: 60}, banned={BASE_ID + 1})
+        groups = [QueuedGroup(i, f"-100{BASE_ID + i}", None) for i in range(3)]
+        await telegram_service.send_message(client, f"-100{BASE_ID + 2}", "hello")
+
+        for _ in range(5):
+            queue = GroupQueue(groups, {}, {})
+            selected = await scheduler_service._select_group(client, queue)
+            assert selected.id == 0
+
+        queue = GroupQueue(groups[1:], {}, {})
+        assert await scheduler_service._select_group(client, queue) is None
+        # Held back until the slow mode window passes, not for the profile TTL
+        assert queue.next_eligible_at() - time.time() == pytest.approx(60, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_selection_runs_outside_the_read_transaction(
+        self, async_db_session, async_session_factory, monkeypatch
+    ):
+        """Test no database connection is held while groups are checked with Telegram"""
+        db = async_db_session
+        user = User(api_id="x", api_hash="x", phone_number="x", session_data="x")
+        db.add(user)
+        await db.commit()
+        db.add_all(
+            [
+                Message(user_id=user.id, title="Hello", content="Hello"),
+                Group(user_id=user.id, group_id=f"-100{BASE_ID}", group_name="One"),
+            ]
+        )
+        await db.commit()
+
+        sessions = []
+
+        def session_factory():
+            sessions.append(async_session_factory())
+            return sessions[-1]
+
+        in_transaction = []
+
+        async def select_group(client, queue):
+            in_transaction.append(sessions[0].in_transaction())
+            return None
+
+        monkeypatch.setattr("app.services.scheduler_service.AsyncSessionLocal", session_factory)
+        monkeypatch.setitem(telegram_service.clients, str(user.id), make_client(1))
+        monkeypatch.setattr(scheduler_service, "_select_group", select_group)
+        try:
+            await scheduler_service._run_send_cycle(user.id)
+        finally:
+            group_queue_service.discard(user.id)
+
+        assert in_transaction == [False]
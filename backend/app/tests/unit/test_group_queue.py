@@ -0,0 +1,153 @@
+"""
+Unit tests for the per-user queue of groups by next-eligible time
+"""
+
+import math
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.db_instrumentation import track_queries
+from app.models import Blacklist, Group, User
+from app.services.blacklist_service import blacklist_service
+from app.services.group_queue_service import GroupQueue, QueuedGroup, group_queue_service
+from app.services.group_service import group_service
+
+
+@pytest.fixture(autouse=True)
+def clear_queues():
+    yield
+    group_queue_service.queues.clear()
+    group_queue_service.last_sent.clear()
+
+
+def make_queue(count, held_until=None, last_sent=None):
+    groups = [QueuedGroup(i, str(i), f"Group {i}") for i in range(count)]
+    return GroupQueue(groups, held_until or {}, last_sent or {})
+
+
+class TestGroupQueue:
+    """Test groups come out by next-eligible time"""
+
+    def test_rotation_by_last_send(self):
+        """Test every group is picked once before any group is picked again"""
+        queue = make_queue(5)
+
+        picked = []
+        for now in range(1, 11):
+            group = queue.peek(now)
+            picked.append(group.group_id)
+            queue.record_send(group.group_id, now)
+
+        assert sorted(picked[:5]) == ["0", "1", "2", "3", "4"]
+        assert picked[5:] == picked[:5]
+
+    def test_held_groups_wait_until_their_time(self):
+        """Test held groups are skipped until released or their time comes"""
+        queue = make_queue(3, held_until={"0": math.inf, "1": 100.0}, last_sent={"2": 50.0})
+
+        assert queue.peek(10) is None
+        assert queue.peek(60).group_id == "2"
+        assert queue.next_eligible_at() == 50.0
+
+        queue.hold("2", math.inf)
+        assert queue.peek(60) is None
+        assert queue.peek(100).group_id == "1"
+
+        queue.hold("1", math.inf)
+        queue.release("0")
+        assert queue.peek(0).group_id == "0"
+
+    def test_defer_keeps_longer_hold(self):
+        """Test deferring never shortens a blacklist hold"""
+        queue = make_queue(1, held_until={"0": 500.0})
+
+        queue.defer("0", 100.0)
+
+        assert queue.next_eligible_at() == 500.0
+
+    def test_stale_entries_are_compacted(self):
+        """Test repeated updates do not grow the heap without bound"""
+        queue = make_queue(10)
+
+        for now in range(10000):
+            queue.record_send(str(now % 10), now)
+
+        assert len(queue._heap) <= 2 * 10 + 64
+
+
+class TestGroupQueueService:
+    """Test queues are built once and kept current by service writes"""
+
+    async def setup_groups(self, db):
+        user = User(api_id="x", api_hash="x", phone_number="x")
+        db.add(user)
+        await db.commit()
+        db.add_all(
+            [
+                Group(user_id=user.id, group_id="-1", group_name="One"),
+                Group(user_id=user.id, group_id="-2", group_name="Two"),
+                Group(user_id=user.id, group_id="-3", group_name="Three"),
+                Group(user_id=user.id, group_id="-4", group_name="Off", is_active=False),
+                Blacklist(user_id=user.id, group_id="-2", blacklist_type="permanent"),
+                Blacklist(
+                    user_id=user.id,
+                    group_id="-3",
+                    blacklist_type="temporary",
+                    expires_at=datetime.utcnow() + timedelta(hours=1),
+                ),
+            ]
+        )
+        await db.commit()
+        return user
+
+    @pytest.mark.asyncio
+    async def test_queue_is_loaded_once(self, async_db_session):
+        """Test the queue holds blacklisted groups back and is reused without queries"""
+        db = async_db_session
+        user = await self.setup_groups(db)
+
+        queue = await group_queue_service.get_queue(db, user.id)
+        with track_queries() as stats:
+            again = await group_queue_service.get_queue(db, user.id)
+
+        assert again is queue
+        assert stats.count == 0
+        assert sorted(queue.groups) == ["-1", "-2", "-3"]
+        assert queue.peek(time.time()).group_id == "-1"
+        assert queue.next_eligible_at() == 0.0
+        queue.hold("-1", math.inf)
+        assert queue.next_eligible_at() == pytest.approx(time.time() + 3600, abs=5)
+
+    @pytest.mark.asyncio
+    async def test_blacklist_writes_update_the_queue_in_place(self, async_db_session):
+        """Test adding and removing blacklist entries does not rebuild the queue"""
+        db = async_db_session
+        user = await self.setup_groups(db)
+        queue = await group_queue_service.get_queue(db, user.id)
+
+        await blacklist_service.add_to_blacklist(db, user.id, "-1", "permanent")
+        assert queue.peek(time.time()) is None
+
+        await blacklist_service.remove_group_from_blacklist(db, user.id, "-2")
+        assert queue.peek(time.time()).group_id == "-2"
+        assert await group_queue_service.get_queue(db, user.id) is queue
+
+    @pytest.mark.asyncio
+    async def test_group_writes_rebuild_the_queue(self, async_db_session):
+        """Test a group write rebuilds the queue and keeps the send rotation"""
+        db = async_db_session
+        user = await self.setup_groups(db)
+        await blacklist_service.remove_group_from_blacklist(db, user.id, "-2")
+        queue = await group_queue_service.get_queue(db, user.id)
+        group_queue_service.record_send(user.id, "-1")
+
+        off = await group_service.get_group_by_telegram_id(db, "-4", user.id)
+        await group_service.toggle_group_status(db, off.id, user.id)
+        rebuilt = await group_queue_service.get_queue(db, user.id)
+
+        assert rebuilt is not queue
+        assert sorted(rebuilt.groups) == ["-1", "-2", "-3", "-4"]
+        picked = rebuilt.peek(time.time()).group_id
+        assert picked in ("-2", "-4")
@@ -0,0 +1,146 @@
+"""
+Unit tests for logging utilities
+"""
+
+import asyncio
+import logging
+from unittest.mock import patch
+
+import pytest
+
+from app.core.logging import (
+    ContextFilter,
+    LogRateRule,
+    RateLimitFilter,
+    bind_log_context,
+    log_context,
+    parse_log_rate_rules,
+    request_id_var,
+)
+
+
+def make_record(name="test", level=logging.INFO, msg="message", **extra) -> logging.LogRecord:
+    record = logging.LogRecord(name, level, __file__, 1, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestContextFilter:
+    """Test request-scoped logging context"""
+
+    def test_defaults_when_no_context(self):
+        """Test records get placeholder values outside any context"""
+        record = make_record()
+        ContextFilter().filter(record)
+
+        assert record.request_id == "N/A"
+        assert record.user_id == "N/A"
+        assert record.job_id == "N/A"
+
+    def test_log_context_sets_and_restores(self):
+        """Test values are stamped inside the block and restored afterwards"""
+        context_filter = ContextFilter()
+
+        with log_context(request_id="abc", user_id=42):
+            record = make_record()
+            context_filter.filter(record)
+            assert record.request_id == "abc"
+            assert record.user_id == "42"
+
+        assert request_id_var.get() == "N/A"
+
+    def test_explicit_extra_wins(self):
+        """Test explicit extra fields are not overwritten"""
+        with log_context(request_id="abc"):
+            record = make_record(request_id="explicit")
+            ContextFilter().filter(record)
+
+        assert record.request_id == "explicit"
+
+    def test_unknown_key_rejected(self):
+        """Test unknown context keys raise"""
+        with pytest.raises(ValueError):
+            with log_context(session="x"):
+                pass
+
+    def test_concurrent_tasks_are_isolated(self):
+        """Test concurrent tasks do not see each other's context"""
+        context_filter = ContextFilter()
+
+        async def handle(request_id: str) -> str:
+            bind_log_context(request_id=request_id)
+            await asyncio.sleep(0)
+            record = make_record()
+            context_filter.filter(record)
+            return record.request_id
+
+        async def run():
+            return await asyncio.gather(*(handle(f"req-{i}") for i in range(10)))
+
+        results = asyncio.run(run())
+
+        assert results == [f"req-{i}" for i in range(10)]
+
+
+class TestRateLimitFilter:
+    """Test log rate limiting and deduplication"""
+
+    def test_parse_rules(self):
+        """Test rule specification parsing"""
+        rules = parse_log_rate_rules("app.a=5/60, app.b=1/10:100")
+
+        assert rules["app.a"] == LogRateRule(5, 60.0, 0)
+        assert rules["app.b"] == LogRateRule(1, 10.0, 100)
+        assert parse_log_rate_rules("") == {}
+
+        with pytest.raises(ValueError):
+            parse_log_rate_rules("app.a=five")
+
+    def test_suppresses_after_burst_and_counts(self):
+        """Test identical records beyond the burst are dropped and counted"""
+        rate_filter = RateLimitFilter({"app.hot": LogRateRule(2, 60)})
+
+        results = [rate_filter.filter(make_record("app.hot.child")) for _ in range(5)]
+
+        assert results == [True, True, False, False, False]
+        assert rate_filter.suppressed == {"app.hot.child": 3}
+
+    def test_other_loggers_and_warnings_pass(self):
+        """Test unmatched loggers and warnings are never suppressed"""
+        rate_filter = RateLimitFilter({"app.hot": LogRateRule(0, 60)})
+
+        assert rate_filter.filter(make_record("app.cold"))
+        assert rate_filter.filter(make_record("app.hot", level=logging.WARNING))
+        assert not rate_filter.filter(make_record("app.hot"))
+
+    def test_decision_is_shared_between_handlers(self):
+        """Test a record is only counted once when several handlers filter it"""
+        rate_filter = RateLimitFilter({"app.hot": LogRateRule(1, 60)})
+        first, second = make_record("app.hot"), make_record("app.hot")
+
+        assert rate_filter.filter(first) and rate_filter.filter(first)
+        assert not rate_filter.filter(second) and not rate_filter.filter(second)
+        assert rate_filter.suppressed == {"app.hot": 1}
+
+    def test_new_window_reports_suppressed(self):
+        """Test the first record of a new window mentions suppressed records"""
+        rate_filter = RateLimitFilter({"app.hot": LogRateRule(1, 60)})
+
+        with patch("app.core.logging.time.monotonic", return_value=0.0):
+            rate_filter.filter(make_record("app.hot"))
+            rate_filter.filter(make_record("app.hot"))
+            rate_filter.filter(make_record("app.hot"))
+
+        with patch("app.core.logging.time.monotonic", return_value=61.0):
+            record = make_record("app.hot")
+            assert rate_filter.filter(record)
+
+        assert "2 similar messages suppressed" in record.getMessage()
+
+    def test_sampling_keeps_every_nth(self):
+        """Test sampling lets one in every N suppressed records through"""
+        rate_filter = RateLimitFilter({"app.hot": LogRateRule(1, 60, sample_every=3)})
+
+        results = [rate_filter.filter(make_record("app.hot")) for _ in range(7)]
+
+        assert results == [True, False, False, True, False, False, True]
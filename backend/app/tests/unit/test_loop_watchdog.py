@@ -0,0 +1,49 @@
+"""
+Unit tests for the event loop stall watchdog
+"""
+
+import asyncio
+import logging
+import time
+
+from app.core.loop_watchdog import LoopWatchdog, loop_stalls
+
+
+class TestLoopWatchdog:
+    """Test event loop lag measurement and stall capture"""
+
+    def test_detects_blocking_call_and_captures_stack(self, caplog):
+        """Test a blocking call is reported with the stack that caused it"""
+        watchdog = LoopWatchdog(interval=0.02, stall_threshold=0.1)
+        stalls_before = loop_stalls.values.get((), 0)
+
+        def blocking_service_call():
+            time.sleep(0.3)
+
+        async def run():
+            watchdog.start()
+            await asyncio.sleep(0.05)
+            blocking_service_call()
+            await asyncio.sleep(0.05)
+            await watchdog.stop()
+
+        with caplog.at_level(logging.WARNING, logger="app.core.loop_watchdog"):
+            asyncio.run(run())
+
+        assert loop_stalls.values.get((), 0) == stalls_before + 1
+        messages = [record.getMessage() for record in caplog.records]
+        assert any("blocking_service_call" in message for message in messages)
+
+    def test_idle_loop_reports_no_stall(self, caplog):
+        """Test an idle loop does not trigger the watchdog"""
+        watchdog = LoopWatchdog(interval=0.01, stall_threshold=0.2)
+
+        async def run():
+            watchdog.start()
+            await asyncio.sleep(0.1)
+            await watchdog.stop()
+
+        with caplog.at_level(logging.WARNING, logger="app.core.loop_watchdog"):
+            asyncio.run(run())
+
+        assert not caplog.records
@@ -0,0 +1,183 @@
+"""
+Unit tests for in-process metrics
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.metrics import Histogram, get_histogram, timed
+from app.main import app
+from app.services.scheduler_service import scheduler_service, send_cycle_latency
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    """Keep metrics registered by a test out of the process-wide registries"""
+    monkeypatch.setattr(metrics, "_registry", dict(metrics._registry))
+    monkeypatch.setattr(metrics, "latency_histograms", dict(metrics.latency_histograms))
+
+
+class TestHistogram:
+    """Test fixed-bucket histogram"""
+
+    def test_observe_and_summary(self):
+        """Test values are counted and summarised"""
+        histogram = Histogram("test", buckets=(0.01, 0.1, 1.0))
+        for value in (0.005, 0.05, 0.05, 0.5):
+            histogram.observe(value)
+
+        assert histogram.counts == [1, 2, 1, 0]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(0.605)
+        assert histogram.summary()["max_ms"] == 500.0
+
+    def test_percentiles_interpolate_within_bucket(self):
+        """Test percentile estimates fall inside the right bucket"""
+        histogram = Histogram("test", buckets=(0.01, 0.1, 1.0))
+        for _ in range(90):
+            histogram.observe(0.005)
+        for _ in range(10):
+            histogram.observe(0.5)
+
+        assert 0 < histogram.percentile(0.5) <= 0.01
+        assert 0.1 < histogram.percentile(0.99) <= 0.5
+
+    def test_empty_histogram(self):
+        """Test an empty histogram reports zeros"""
+        assert Histogram("empty").percentile(0.99) == 0.0
+
+
+class TestTimedDecorator:
+    """Test timing decorator"""
+
+    def test_async_function_times_execution(self):
+        """Test coroutine timing covers the awaited work"""
+
+        @timed("test.async_sleep")
+        async def sleeper():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        assert asyncio.run(sleeper()) == "done"
+
+        histogram = get_histogram("test.async_sleep")
+        assert histogram.count == 1
+        assert histogram.max >= 0.02
+
+    def test_sync_function_records_errors(self):
+        """Test failures are recorded and re-raised"""
+
+        @timed("test.sync_fail")
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            fail()
+
+        histogram = get_histogram("test.sync_fail")
+        assert histogram.count == 1
+        assert histogram.errors == 1
+
+
+class TestPrometheusRendering:
+    """Test Prometheus text exposition"""
+
+    def test_counter_gauge_and_histogram_render(self):
+        """Test registered metrics appear in the text output"""
+        requests = metrics.counter("test_requests", "Test requests", ["route"])
+        requests.inc("/a")
+        requests.inc("/a")
+        metrics.gauge("test_jobs", "Test jobs", lambda: 3)
+        latency = metrics.histogram("test_latency_seconds", "Test latency", buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(5.0)
+
+        text = metrics.render_prometheus()
+
+        assert "# TYPE test_requests counter" in text
+        assert 'test_requests_total{route="/a"} 2' in text
+        assert "test_jobs 3" in text
+        assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{le="+Inf"} 2' in text
+        assert "test_latency_seconds_count 2" in text
+
+    def test_failing_gauge_does_not_break_scrape(self):
+        """Test a broken gauge callback is skipped"""
+        metrics.gauge("test_broken", "Broken", lambda: 1 / 0)
+
+        text = metrics.render_prometheus()
+
+        assert "# test_broken unavailable: ZeroDivisionError" in text
+
+
+class TestSendCycleTiming:
+    """Test the scheduler send cycle latency excludes the send delay"""
+
+    def test_send_delay_is_not_counted(self, monkeypatch):
+        """Test time spent in the random pre-send delay is subtracted"""
+
+        async def run_send_cycle(user_id):
+            await asyncio.sleep(0.2)
+            return 0.2
+
+        monkeypatch.setattr(scheduler_service, "_run_send_cycle", run_send_cycle)
+        count_before = send_cycle_latency.count
+        sum_before = send_cycle_latency.sum
+
+        asyncio.run(scheduler_service._send_messages_job(1))
+
+        assert send_cycle_latency.count == count_before + 1
+        assert send_cycle_latency.sum - sum_before < 0.1
+
+
+class TestMetricsEndpoint:
+    """Test access control on /metrics"""
+
+    @pytest.fixture
+    def client(self):
+        # No lifespan: the endpoint needs neither the database nor the scheduler
+        return TestClient(app)
+
+    @pytest.fixture
+    def metrics_settings(self, monkeypatch):
+        settings = get_settings()
+        monkeypatch.setattr(settings, "metrics_enabled", True)
+        monkeypatch.setattr(settings, "metrics_token", None)
+        monkeypatch.setattr(settings, "environment", "production")
+        return settings
+
+    def test_hidden_without_token_outside_development(self, client, metrics_settings):
+        """Test /metrics is not served in production unless a token is configured"""
+        assert client.get("/metrics").status_code == 404
+
+    def test_served_without_token_in_development(self, client, metrics_settings, monkeypatch):
+        """Test /metrics is open in development when no token is configured"""
+        monkeypatch.setattr(metrics_settings, "environment", "development")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert "function_duration_seconds" in response.text
+
+    def test_requires_bearer_token(self, client, metrics_settings, monkeypatch):
+        """Test a configured token must be presented"""
+        monkeypatch.setattr(metrics_settings, "metrics_token", "scrape-secret")
+
+        assert client.get("/metrics").status_code == 401
+        wrong = client.get("/metrics", headers={"Authorization": "Bearer nope"})
+        assert wrong.status_code == 401
+        right = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+        assert right.status_code == 200
+
+    def test_disabled(self, client, metrics_settings, monkeypatch):
+        """Test metrics_enabled=False hides the endpoint even with a token"""
+        monkeypatch.setattr(metrics_settings, "metrics_enabled", False)
+        monkeypatch.setattr(metrics_settings, "metrics_token", "scrape-secret")
+
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+
+        assert response.status_code == 404
@@ -0,0 +1,115 @@
+"""
+Unit tests for the request context middleware
+"""
+
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.core.logging import ContextFilter
+from app.middleware.request_context import (
+    DB_QUERY_COUNT_HEADER,
+    DB_TIME_HEADER,
+    REQUEST_ID_HEADER,
+    request_context_middleware,
+)
+
+route_logger = logging.getLogger("tests.request_context")
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(ContextFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def handler():
+    handler = RecordingHandler()
+    route_logger.addHandler(handler)
+    route_logger.setLevel(logging.INFO)
+    try:
+        yield handler
+    finally:
+        route_logger.removeHandler(handler)
+
+
+@pytest.fixture
+def context_client():
+    app = FastAPI()
+    app.middleware("http")(request_context_middleware)
+
+    @app.get("/ping")
+    async def ping():
+        route_logger.info("handling ping")
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+class TestRequestContextMiddleware:
+    """Test request ID propagation"""
+
+    def test_valid_request_id_is_echoed(self, context_client):
+        """Test a well-formed client request ID is returned unchanged"""
+        response = context_client.get("/ping", headers={REQUEST_ID_HEADER: "client-id.42_a"})
+
+        assert response.status_code == 200
+        assert response.headers[REQUEST_ID_HEADER] == "client-id.42_a"
+
+    @pytest.mark.parametrize("request_id", ["bad id\twith spaces", "x" * 65, "<script>"])
+    def test_invalid_request_id_is_replaced(self, context_client, request_id):
+        """Test malformed or oversized request IDs are replaced with a generated one"""
+        response = context_client.get("/ping", headers={REQUEST_ID_HEADER: request_id})
+
+        generated = response.headers[REQUEST_ID_HEADER]
+        assert generated != request_id
+        assert len(generated) == 32
+        int(generated, 16)
+
+    def test_missing_request_id_is_generated(self, context_client):
+        """Test every response carries a request ID"""
+        first = context_client.get("/ping").headers[REQUEST_ID_HEADER]
+        second = context_client.get("/ping").headers[REQUEST_ID_HEADER]
+
+        assert first != second
+
+    def test_log_records_carry_request_id(self, context_client, handler):
+        """Test records logged while handling the request are stamped with its ID"""
+        response = context_client.get("/ping", headers={REQUEST_ID_HEADER: "trace-123"})
+
+        assert response.headers[REQUEST_ID_HEADER] == "trace-123"
+        assert [record.request_id for record in handler.records] == ["trace-123"]
+
+    def test_log_records_carry_generated_request_id(self, context_client, handler):
+        """Test a generated ID is used in logs as well as in the response"""
+        response = context_client.get("/ping", headers={REQUEST_ID_HEADER: "not valid!"})
+
+        assert [record.request_id for record in handler.records] == [
+            response.headers[REQUEST_ID_HEADER]
+        ]
+
+
+class TestDatabaseCostHeaders:
+    """Test per-request database cost headers"""
+
+    @pytest.mark.parametrize(
+        "environment, exposed", [("development", True), ("staging", False), ("production", False)]
+    )
+    def test_headers_only_in_development(self, context_client, monkeypatch, environment, exposed):
+        """Test X-DB-Query-Count and X-DB-Time-Ms are only sent in development"""
+        monkeypatch.setattr(get_settings(), "environment", environment)
+
+        response = context_client.get("/ping")
+
+        assert (DB_QUERY_COUNT_HEADER in response.headers) is exposed
+        assert (DB_TIME_HEADER in response.headers) is exposed
+        if exposed:
+            assert response.headers[DB_QUERY_COUNT_HEADER] == "0"
@@ -0,0 +1,158 @@
+"""
+Unit tests for full-text search over groups and message templates
+"""
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.core.db_instrumentation import track_queries
+from app.core.search import create_search_indexes, drop_search_indexes, fts_match_query
+from app.models import Group, Message, User
+from app.services.group_service import group_service
+from app.services.message_service import message_service
+
+
+async def create_user(db) -> User:
+    user = User(api_id="x", api_hash="x", phone_number="x")
+    db.add(user)
+    await db.commit()
+    return user
+
+
+async def add_groups(db, user_id, names):
+    groups = [
+        Group(user_id=user_id, group_id=f"-100{index}", group_name=name, username=username)
+        for index, (name, username) in enumerate(names)
+    ]
+    db.add_all(groups)
+    await db.commit()
+    return groups
+
+
+class TestFtsMatchQuery:
+    """Test search terms are turned into literal FTS5 queries"""
+
+    def test_tokens_are_quoted(self):
+        """Test every token is quoted so FTS5 operators have no effect"""
+        assert fts_match_query('crypto AND "news"') == '"crypto" "AND" """news"""'
+
+    @pytest.mark.parametrize("term", ["", "   ", "ab", "crypto ab"])
+    def test_short_tokens_need_fallback(self, term):
+        """Test terms the trigram index cannot answer return None"""
+        assert fts_match_query(term) is None
+
+
+class TestGroupSearch:
+    """Test group search through the FTS index"""
+
+    @pytest.mark.asyncio
+    async def test_substring_match_is_ranked_and_scoped(self, async_db_session):
+        """Test names and usernames match anywhere, for the user's active groups only"""
+        db = async_db_session
+        user = await create_user(db)
+        other = await create_user(db)
+        await add_groups(
+            db,
+            user.id,
+            [
+                ("Daily News", "cryptonews"),
+                ("Crypto Crypto Crypto", None),
+                ("Cooking", "recipes"),
+            ],
+        )
+        await add_groups(db, other.id, [("Crypto Elsewhere", None)])
+        db.add(Group(user_id=user.id, group_id="-2", group_name="Crypto Old", is_active=False))
+        await db.commit()
+
+        with track_queries() as stats:
+            groups = await group_service.search_groups(db, user.id, "rypto")
+
+        assert stats.count == 1
+        assert [group.group_name for group in groups] == ["Crypto Crypto Crypto", "Daily News"]
+
+    @pytest.mark.asyncio
+    async def test_index_follows_updates_and_deletes(self, async_db_session):
+        """Test the triggers keep the index in sync with the groups table"""
+        db = async_db_session
+        user = await create_user(db)
+        first, second = await add_groups(db, user.id, [("Crypto", None), ("Gardening", None)])
+
+        await db.execute(update(Group).where(Group.id == first.id).values(group_name="Football"))
+        await db.execute(delete(Group).where(Group.id == second.id))
+        await db.commit()
+
+        assert await group_service.search_groups(db, user.id, "crypto") == []
+        assert await group_service.search_groups(db, user.id, "garden") == []
+        assert [g.id for g in await group_service.search_groups(db, user.id, "football")] == [
+            first.id
+        ]
+
+    @pytest.mark.asyncio
+    async def test_pagination(self, async_db_session):
+        """Test skip and limit page through ranked results"""
+        db = async_db_session
+        user = await create_user(db)
+        await add_groups(db, user.id, [(f"Trading {index}", None) for index in range(5)])
+
+        first_page = await group_service.search_groups(db, user.id, "trading", skip=0, limit=3)
+        second_page = await group_service.search_groups(db, user.id, "trading", skip=3, limit=3)
+
+        assert len(first_page) == 3
+        assert len(second_page) == 2
+        assert not {g.id for g in first_page} & {g.id for g in second_page}
+
+    @pytest.mark.asyncio
+    async def test_short_term_uses_like(self, async_db_session):
+        """Test terms shorter than a trigram still match, literally"""
+        db = async_db_session
+        user = await create_user(db)
+        await add_groups(db, user.id, [("AI Lab", None), ("Rain", "main"), ("100% Deals", None)])
+
+        names = [group.group_name for group in await group_service.search_groups(db, user.id, "ai")]
+        percent = await group_service.search_groups(db, user.id, "%")
+
+        # Names starting with the term come first
+        assert names == ["AI Lab", "Rain"]
+        assert [group.group_name for group in percent] == ["100% Deals"]
+
+    @pytest.mark.asyncio
+    async def test_existing_rows_are_indexed(self, async_db_session, async_session_factory):
+        """Test creating the FTS table indexes rows that already exist"""
+        db = async_db_session
+        user = await create_user(db)
+        await add_groups(db, user.id, [("Crypto", None)])
+
+        def recreate(connection):
+            drop_search_indexes(connection)
+            create_search_indexes(connection)
+
+        async with async_session_factory() as session:
+            connection = await session.connection()
+            await connection.run_sync(recreate)
+            await session.commit()
+
+        assert len(await group_service.search_groups(db, user.id, "crypto")) == 1
+
+
+class TestMessageSearch:
+    """Test message template search"""
+
+    @pytest.mark.asyncio
+    async def test_title_and_content_match(self, async_db_session):
+        """Test every token must match in the title or the content"""
+        db = async_db_session
+        user = await create_user(db)
+        db.add_all(
+            [
+                Message(user_id=user.id, title="Weekly promo", content="Big summer sale"),
+                Message(user_id=user.id, title="Summer", content="See you soon"),
+                Message(user_id=user.id, title="Other", content="Nothing here"),
+            ]
+        )
+        await db.commit()
+
+        summer = await message_service.search_messages(db, user.id, "summer")
+        summer_sale = await message_service.search_messages(db, user.id, "summer sale")
+
+        assert {message.title for message in summer} == {"Weekly promo", "Summer"}
+        assert [message.title for message in summer_sale] == ["Weekly promo"]
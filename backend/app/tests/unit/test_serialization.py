@@ -0,0 +1,100 @@
+"""
+Unit tests for the precompiled list serializers
+"""
+
+import json
+from datetime import datetime
+from typing import List
+
+import pytest
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import ValidationError
+
+from app.core.serialization import ListSerializer
+from app.main import app
+from app.models import Blacklist, BlacklistResponse, Group, GroupCreate, GroupResponse, User
+
+
+def make_groups(count):
+    now = datetime(2024, 1, 2, 3, 4, 5, 678901)
+    return [
+        Group(
+            id=index,
+            user_id=1,
+            group_id=str(-1000 - index),
+            group_name=f"Grüppe {index}",
+            username=None,
+            invite_link=None,
+            is_active=index % 2 == 0,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+class TestListSerializer:
+    """Test list serializers match response_model output"""
+
+    @pytest.mark.asyncio
+    async def test_output_matches_response_model(self):
+        """Test the bytes are those FastAPI sent for response_model=List[...]"""
+        rows = make_groups(3)
+        field = create_response_field(name="response", type_=List[GroupResponse])
+        content = await serialize_response(field=field, response_content=rows, is_coroutine=True)
+
+        assert ListSerializer(GroupResponse).dump(rows) == JSONResponse(content).body
+
+    def test_response_carries_etag(self):
+        """Test the response is JSON and has the validator headers"""
+        entry = Blacklist(
+            id=1,
+            user_id=1,
+            group_id="-1",
+            blacklist_type="permanent",
+            reason=None,
+            expires_at=None,
+            created_at=datetime(2024, 1, 1),
+        )
+
+        response = ListSerializer(BlacklistResponse).response([entry], etag='W/"abc"')
+
+        assert response.media_type == "application/json"
+        assert response.headers["ETag"] == 'W/"abc"'
+        assert json.loads(response.body)[0]["created_at"] == "2024-01-01T00:00:00"
+
+    def test_invalid_row_is_rejected(self):
+        """Test rows are still validated against the schema"""
+        row = make_groups(1)[0]
+        row.group_id = None
+
+        with pytest.raises(ValidationError):
+            ListSerializer(GroupResponse).dump([row])
+
+    def test_expired_row_is_loaded(self, db_session):
+        """Test columns missing from the instance are loaded through the ORM"""
+        user = User(api_id="x", api_hash="x", phone_number="+1234567890")
+        db_session.add(user)
+        db_session.flush()
+        group = Group(user_id=user.id, group_id="-1", group_name="A")
+        db_session.add(group)
+        db_session.commit()
+        db_session.expire(group)
+
+        rows = json.loads(ListSerializer(GroupResponse).dump([group]))
+
+        assert rows[0]["group_name"] == "A"
+        assert rows[0]["is_active"] is True
+
+    def test_schema_with_validators_is_rejected(self):
+        """Test schemas whose validators would be skipped cannot be used"""
+        with pytest.raises(TypeError):
+            ListSerializer(GroupCreate)
+
+    def test_default_response_class_uses_orjson(self):
+        """Test routes without their own response are encoded with orjson"""
+        routes = {route.path: route for route in app.routes}
+
+        assert routes["/api/v1/groups/stats"].response_class is ORJSONResponse
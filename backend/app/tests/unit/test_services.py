@@ -0,0 +1,499 @@
+"""
+Unit tests for services on an async (aiosqlite) session
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.db_instrumentation import track_queries
+from app.models import BatchItem, Blacklist, Group, Log, Message, Settings, User
+from app.services.auth_service import auth_service
+from app.services.blacklist_service import blacklist_service
+from app.services.dashboard_service import dashboard_service
+from app.services.group_service import group_service
+from app.services.log_service import LogWriter
+from app.services.message_service import message_service
+from app.services.settings_service import settings_service
+
+
+async def create_user(db) -> User:
+    user = User(api_id="x", api_hash="x", phone_number="x")
+    db.add(user)
+    await db.commit()
+    return user
+
+
+class TestCountQueries:
+    """Test statistics are computed with a single query"""
+
+    @pytest.mark.asyncio
+    async def test_blacklist_stats(self, async_db_session):
+        """Test blacklist stats count every entry type in one query"""
+        db = async_db_session
+        user = await create_user(db)
+        now = datetime.utcnow()
+        db.add_all(
+            [
+                Blacklist(user_id=user.id, group_id="-1", blacklist_type="permanent"),
+                Blacklist(
+                    user_id=user.id,
+                    group_id="-2",
+                    blacklist_type="temporary",
+                    expires_at=now + timedelta(hours=1),
+                ),
+                Blacklist(
+                    user_id=user.id,
+                    group_id="-3",
+                    blacklist_type="temporary",
+                    expires_at=now - timedelta(hours=1),
+                ),
+            ]
+        )
+        await db.commit()
+
+        with track_queries() as stats:
+            result = await blacklist_service.get_blacklist_stats(db, user.id)
+
+        assert stats.count == 1
+        assert result == {
+            "total": 3,
+            "permanent": 1,
+            "temporary_active": 1,
+            "temporary_expired": 1,
+            "active": 2,
+        }
+
+    @pytest.mark.asyncio
+    async def test_group_count(self, async_db_session):
+        """Test group count returns total, active and inactive in one query"""
+        db = async_db_session
+        user = await create_user(db)
+        db.add_all(
+            Group(user_id=user.id, group_id=f"-100{i}", is_active=i % 3 != 0) for i in range(6)
+        )
+        await db.commit()
+
+        with track_queries() as stats:
+            result = await group_service.get_group_count(db, user.id)
+
+        assert stats.count == 1
+        assert result == {"total": 6, "active": 4, "inactive": 2}
+
+    @pytest.mark.asyncio
+    async def test_message_count(self, async_db_session):
+        """Test message count only includes the user's messages"""
+        db = async_db_session
+        user = await create_user(db)
+        other = await create_user(db)
+        db.add_all(
+            [
+                Message(user_id=user.id, title="a", content="a", is_active=True),
+                Message(user_id=user.id, title="b", content="b", is_active=False),
+                Message(user_id=other.id, title="c", content="c", is_active=True),
+            ]
+        )
+        await db.commit()
+
+        with track_queries() as stats:
+            result = await message_service.get_message_count(db, user.id)
+
+        assert stats.count == 1
+        assert result == {"total": 2, "active": 1, "inactive": 1}
+
+
+class TestBlacklistService:
+    """Test blacklist lookups and cleanup"""
+
+    @pytest.mark.asyncio
+    async def test_get_blacklisted_group_ids(self, async_db_session):
+        """Test only permanent and unexpired temporary entries are returned"""
+        db = async_db_session
+        user = await create_user(db)
+        other = await create_user(db)
+        now = datetime.utcnow()
+        db.add_all(
+            [
+                Blacklist(user_id=user.id, group_id="-1", blacklist_type="permanent"),
+                Blacklist(
+                    user_id=user.id,
+                    group_id="-2",
+                    blacklist_type="temporary",
+                    expires_at=now + timedelta(hours=1),
+                ),
+                Blacklist(
+                    user_id=user.id,
+                    group_id="-3",
+                    blacklist_type="temporary",
+                    expires_at=now - timedelta(hours=1),
+                ),
+                Blacklist(user_id=other.id, group_id="-4", blacklist_type="permanent"),
+            ]
+        )
+        await db.commit()
+
+        assert await blacklist_service.get_blacklisted_group_ids(db, user.id) == {"-1", "-2"}
+
+    @pytest.mark.asyncio
+    async def test_cleanup_expired_blacklist_returns_rowcount(self, async_db_session):
+        """Test cleanup deletes expired temporary entries and returns how many"""
+        db = async_db_session
+        user = await create_user(db)
+        now = datetime.utcnow()
+        db.add_all(
+            [
+                Blacklist(user_id=user.id, group_id="-1", blacklist_type="permanent"),
+                Blacklist(
+                    user_id=user.id,
+                    group_id="-2",
+                    blacklist_type="temporary",
+                    expires_at=now + timedelta(hours=1),
+                ),
+            ]
+            + [
+                Blacklist(
+                    user_id=user.id,
+                    group_id=f"-10{i}",
+                    blacklist_type="temporary",
+                    expires_at=now - timedelta(minutes=i + 1),
+                )
+                for i in range(3)
+            ]
+        )
+        await db.commit()
+
+        assert await blacklist_service.cleanup_expired_blacklist(db, user.id) == 3
+        assert await blacklist_service.cleanup_expired_blacklist(db, user.id) == 0
+
+        remaining = await db.scalar(select(func.count(Blacklist.id)))
+        assert remaining == 2
+
+
+class TestAuthService:
+    """Test user registration"""
+
+    @pytest.mark.asyncio
+    async def test_register_user_creates_user_and_settings_in_one_commit(self, async_db_session):
+        """Test the user and the default settings row are committed together"""
+        db = async_db_session
+        commit = db.commit
+
+        commits = []
+
+        async def counting_commit():
+            commits.append(1)
+            await commit()
+
+        with patch.object(db, "commit", counting_commit):
+            user = await auth_service.register_user(db, "12345", "a" * 32, "+1234567890")
+
+        assert len(commits) == 1
+        assert user.id is not None
+
+        settings = (
+            await db.execute(select(Settings).where(Settings.user_id == user.id))
+        ).scalar_one()
+        assert settings.min_interval == 4200
+
+
+class TestBlacklistUpsert:
+    """Test blacklist entries are upserted per user and group"""
+
+    @pytest.mark.asyncio
+    async def test_add_twice_replaces_entry(self, async_db_session):
+        """Test re-blacklisting a group updates the existing row"""
+        db = async_db_session
+        user = await create_user(db)
+
+        first = await blacklist_service.add_to_blacklist(
+            db, user.id, "-100", "temporary", reason="slow mode", duration_seconds=60
+        )
+        second = await blacklist_service.add_to_blacklist(
+            db, user.id, "-100", "permanent", reason="banned"
+        )
+
+        assert second.id == first.id
+        assert second.blacklist_type == "permanent"
+        assert second.reason == "banned"
+        assert second.expires_at is None
+        assert await db.scalar(select(func.count(Blacklist.id))) == 1
+
+
+class TestCachedStatements:
+    """Test hot queries built with lambda_stmt bind each call's values"""
+
+    @pytest.mark.asyncio
+    async def test_active_rows_per_user(self, async_db_session):
+        """Test the cached statements return each user's own active rows"""
+        db = async_db_session
+        user = await create_user(db)
+        other = await create_user(db)
+        db.add_all(
+            [
+                Message(user_id=user.id, title="Mine", content="x"),
+                Message(user_id=user.id, title="Off", content="x", is_active=False),
+                Message(user_id=other.id, title="Theirs", content="x"),
+                Group(user_id=user.id, group_id="-1", group_name="Mine"),
+                Group(user_id=other.id, group_id="-2", group_name="Theirs"),
+                Settings(user_id=other.id, min_delay=7),
+            ]
+        )
+        await db.commit()
+
+        for owner, name in ((user, "Mine"), (other, "Theirs")):
+            messages = await message_service.get_active_messages(db, owner.id)
+            groups = await group_service.get_active_groups(db, owner.id)
+            assert [message.title for message in messages] == [name]
+            assert [group.group_name for group in groups] == [name]
+
+        assert await settings_service.get_user_settings(db, user.id) is None
+        assert (await settings_service.get_user_settings(db, other.id)).min_delay == 7
+
+    @pytest.mark.asyncio
+    async def test_blacklist_check_uses_current_time(self, async_db_session):
+        """Test the cached blacklist check compares against the time of each call"""
+        db = async_db_session
+        user = await create_user(db)
+        db.add(
+            Blacklist(
+                user_id=user.id,
+                group_id="-1",
+                blacklist_type="temporary",
+                expires_at=datetime.utcnow() + timedelta(hours=1),
+            )
+        )
+        await db.commit()
+
+        assert await blacklist_service.is_group_blacklisted(db, user.id, "-1")
+        assert not await blacklist_service.is_group_blacklisted(db, user.id, "-2")
+
+        later = datetime.utcnow() + timedelta(hours=2)
+        with patch("app.services.blacklist_service.datetime") as mock_datetime:
+            mock_datetime.utcnow.return_value = later
+            assert not await blacklist_service.is_group_blacklisted(db, user.id, "-1")
+            assert await blacklist_service.get_blacklisted_group_ids(db, user.id) == set()
+
+
+class TestDashboardSummary:
+    """Test the combined dashboard statistics"""
+
+    @pytest.mark.asyncio
+    async def test_summary_in_one_query(self, async_db_session):
+        """Test every statistic is computed by a single statement"""
+        db = async_db_session
+        user = await create_user(db)
+        other = await create_user(db)
+        now = datetime.utcnow()
+        db.add_all(
+            [
+                Message(user_id=user.id, title="A", content="x"),
+                Message(user_id=user.id, title="B", content="x", is_active=False),
+                Group(user_id=user.id, group_id="-1", group_name="One"),
+                Group(user_id=user.id, group_id="-2", group_name="Two"),
+                Group(user_id=other.id, group_id="-3", group_name="Three"),
+                Blacklist(user_id=user.id, group_id="-1", blacklist_type="permanent"),
+                Blacklist(
+                    user_id=user.id,
+                    group_id="-2",
+                    blacklist_type="temporary",
+                    expires_at=now - timedelta(minutes=1),
+                ),
+                Log(user_id=user.id, group_id="-1", status="success"),
+                Log(user_id=user.id, group_id="-1", status="failed"),
+                Log(
+                    user_id=user.id,
+                    group_id="-1",
+                    status="success",
+                    created_at=now - timedelta(days=2),
+                ),
+            ]
+        )
+        await db.commit()
+
+        with track_queries() as stats:
+            summary = await dashboard_service.get_summary(db, user.id)
+
+        assert stats.count == 1
+        assert summary["messages"] == {"total": 2, "active": 1, "inactive": 1}
+        assert summary["groups"] == {"total": 2, "active": 2, "inactive": 0}
+        assert summary["blacklist"] == {
+            "total": 2,
+            "permanent": 1,
+            "temporary_active": 0,
+            "temporary_expired": 1,
+            "active": 1,
+        }
+        assert summary["logs"] == {
+            "total": 2,
+            "success": 1,
+            "failed": 1,
+            "blacklisted": 0,
+            "success_rate": 50.0,
+            "hours": 24,
+        }
+
+    @pytest.mark.asyncio
+    async def test_cached_until_written(self, async_db_session):
+        """Test the summary is served from cache and dropped by ORM and Core writes"""
+        db = async_db_session
+        user = await create_user(db)
+
+        first = await dashboard_service.get_summary(db, user.id)
+        with track_queries() as stats:
+            assert await dashboard_service.get_summary(db, user.id) is first
+        assert stats.count == 0
+
+        db.add(Message(user_id=user.id, title="A", content="x"))
+        await db.commit()
+        assert (await dashboard_service.get_summary(db, user.id))["messages"]["total"] == 1
+
+        await blacklist_service.add_to_blacklist(db, user.id, "-1", "permanent")
+        assert (await dashboard_service.get_summary(db, user.id))["blacklist"]["active"] == 1
+
+
+class TestBatchMutations:
+    """Test batch endpoints' services apply many actions in one transaction"""
+
+    @pytest.mark.asyncio
+    async def test_message_batch_uses_one_statement_per_action(self, async_db_session):
+        """Test each action is one bulk statement and items report their own result"""
+        db = async_db_session
+        user = await create_user(db)
+        other = await create_user(db)
+        messages = [Message(user_id=user.id, title=str(i), content="x") for i in range(4)]
+        foreign = Message(user_id=other.id, title="F", content="x")
+        db.add_all([*messages, foreign])
+        await db.commit()
+        log = Log(user_id=user.id, group_id="-1", message_id=messages[3].id, status="success")
+        db.add(log)
+        await db.commit()
+        first, second, third, fourth = (message.id for message in messages)
+
+        items = [
+            BatchItem(id=first, action="deactivate"),
+            BatchItem(id=second, action="deactivate"),
+            BatchItem(id=third, action="toggle"),
+            BatchItem(id=fourth, action="delete"),
+            BatchItem(id=foreign.id, action="delete"),
+            BatchItem(id=first, action="activate"),
+        ]
+        with track_queries() as stats:
+            response = await message_service.apply_batch(db, user.id, items)
+
+        # Row lookup, deactivate, toggle, detach logs and delete
+        assert stats.count == 5
+        assert (response.succeeded, response.failed) == (4, 2)
+        assert [(result.success, result.is_active) for result in response.results] == [
+            (True, False),
+            (True, False),
+            (True, False),
+            (True, None),
+            (False, None),
+            (False, None),
+        ]
+        assert response.results[4].error == "Not found"
+        assert response.results[5].error == "Item appears more than once in the batch"
+
+        rows = await db.execute(select(Message.id, Message.is_active).order_by(Message.id))
+        assert rows.all() == [(first, False), (second, False), (third, False), (foreign.id, True)]
+        assert await db.scalar(select(Log.message_id).where(Log.id == log.id)) is None
+
+    @pytest.mark.asyncio
+    async def test_blacklist_batch_only_deletes(self, async_db_session):
+        """Test blacklist entries can be removed but not toggled"""
+        db = async_db_session
+        user = await create_user(db)
+        entries = [
+            Blacklist(user_id=user.id, group_id=str(-i), blacklist_type="permanent")
+            for i in range(1, 3)
+        ]
+        db.add_all(entries)
+        await db.commit()
+        summary = await dashboard_service.get_summary(db, user.id)
+
+        response = await blacklist_service.apply_batch(
+            db,
+            user.id,
+            [
+                BatchItem(id=entries[0].id, action="delete"),
+                BatchItem(id=entries[1].id, action="toggle"),
+            ],
+        )
+
+        assert [result.success for result in response.results] == [True, False]
+        assert response.results[1].error == "Action 'toggle' is not supported"
+        assert await db.scalar(select(func.count(Blacklist.id))) == 1
+        # Bulk statements still invalidate cached summaries
+        assert await dashboard_service.get_summary(db, user.id) is not summary
+
+
+class TestLogWriter:
+    """Test batched send log writes"""
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_buffered_rows(self, async_db_session, async_session_factory):
+        """Test queued rows are written in one batch on flush"""
+        db = async_db_session
+        user = await create_user(db)
+        writer = LogWriter(session_factory=async_session_factory)
+
+        for index in range(5):
+            writer.add(user_id=user.id, group_id=f"-100{index}", status="success")
+        writer.add(user_id=user.id, group_id="-1009", status="failed", error_message="boom")
+
+        assert await db.scalar(select(func.count(Log.id))) == 0
+        assert await writer.flush() == 6
+        assert writer.pending == 0
+
+        failed = (await db.execute(select(Log).where(Log.status == "failed"))).scalar_one()
+        assert failed.error_message == "boom"
+        assert failed.created_at is not None
+        assert await db.scalar(select(func.count(Log.id))) == 6
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_flushed_in_background(
+        self, async_db_session, async_session_factory
+    ):
+        """Test reaching the batch size wakes the background task"""
+        db = async_db_session
+        user = await create_user(db)
+        writer = LogWriter(batch_size=3, flush_interval=60, session_factory=async_session_factory)
+        writer.start()
+        try:
+            for index in range(3):
+                writer.add(user_id=user.id, group_id=f"-100{index}", status="success")
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if writer.pending == 0:
+                    break
+        finally:
+            await writer.stop()
+
+        assert await db.scalar(select(func.count(Log.id))) == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_rows(self):
+        """Test rows survive a failed write for the next attempt"""
+
+        def broken_session():
+            raise RuntimeError("database unavailable")
+
+        writer = LogWriter(session_factory=broken_session)
+        writer.add(user_id=1, group_id="-1", status="success")
+
+        assert await writer.flush() == 0
+        assert writer.pending == 1
+
+    def test_full_buffer_drops_oldest_rows(self, caplog):
+        """Test the buffer is bounded and warns once while dropping"""
+        writer = LogWriter(batch_size=1)
+
+        for index in range(60):
+            writer.add(user_id=1, group_id=str(index), status="success")
+
+        assert writer.pending == 50
+        assert writer._pending[0]["group_id"] == "10"
+        assert caplog.text.count("Send log buffer full") == 1
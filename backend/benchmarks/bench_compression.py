@@ -0,0 +1,80 @@
+"""
+Response compression benchmark
+
+Measures the bytes saved and the CPU time spent compressing typical API
+payloads (group, blacklist and log list pages of different sizes, as the list
+endpoints serialize them) with the gzip levels and brotli qualities the
+compression middleware can be configured with. Brotli is skipped when the
+brotli package is not installed.
+
+Usage: python benchmarks/bench_compression.py [--repeat 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+
+from bench_serialization import make_blacklist, make_groups, make_logs  # noqa: E402
+
+from app.core.serialization import ListSerializer  # noqa: E402
+from app.middleware.compression import _Compressor, brotli  # noqa: E402
+from app.models import BlacklistResponse, GroupResponse, LogResponse  # noqa: E402
+
+PAYLOADS = [
+    ("groups", GroupResponse, make_groups, (10, 100, 1000)),
+    ("blacklist", BlacklistResponse, make_blacklist, (10, 100)),
+    ("logs", LogResponse, make_logs, (50, 500)),
+]
+
+SETTINGS = [("gzip", 1), ("gzip", 6), ("gzip", 9)]
+if brotli is not None:
+    SETTINGS += [("br", 4), ("br", 6)]
+
+
+def compress(body, encoding, level):
+    compressor = _Compressor(encoding, gzip_level=level, brotli_quality=level)
+    return compressor.finish(body)
+
+
+def measure(body, encoding, level, repeat):
+    """Get the compressed size and the median time in microseconds"""
+    size = len(compress(body, encoding, level))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compress(body, encoding, level)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return size, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli is not installed, measuring gzip only")
+    print(
+        f"{'payload':<16} {'bytes':>8} {'coding':<7} {'out':>7} {'saved':>6} {'us':>8} {'MB/s':>7}"
+    )
+    for name, schema, make_rows, row_counts in PAYLOADS:
+        serializer = ListSerializer(schema)
+        for rows in row_counts:
+            body = serializer.dump(make_rows(rows))
+            label = f"{name} x{rows}"
+            for encoding, level in SETTINGS:
+                size, micros = measure(body, encoding, level, args.repeat)
+                print(
+                    f"{label:<16} {len(body):>8} {f'{encoding}-{level}':<7} {size:>7} "
+                    f"{1 - size / len(body):>6.1%} {micros:>8.1f} {len(body) / micros:>7.1f}"
+                )
+                label = ""
+
+
+if __name__ == "__main__":
+    main()
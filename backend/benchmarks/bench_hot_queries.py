@@ -0,0 +1,178 @@
+"""
+Hot query benchmark
+
+Compares the per-call cost of the scheduler's hot queries built as plain
+select() statements (constructed and compiled-cache-keyed on every call) with
+the lambda_stmt versions used by the services. For each query it reports the
+time to build the statement and compute its cache key, and the time of a full
+AsyncSession.execute against a small temporary SQLite database.
+
+Usage: python benchmarks/bench_hot_queries.py [--repeat 5000]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+
+from sqlalchemy import insert, lambda_stmt, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.database import (  # noqa: E402
+    create_async_db_engine,
+    create_db_engine,
+    create_tables,
+    sqlite_pragmas_from_settings,
+)
+from app.models.database import Blacklist, Group, Message, Settings, User  # noqa: E402
+
+
+def active_messages(user_id):
+    return select(Message).where(Message.user_id == user_id, Message.is_active == True)
+
+
+def active_groups(user_id):
+    return select(Group).where(Group.user_id == user_id, Group.is_active == True)
+
+
+def blacklist_check(user_id, group_id="-1005"):
+    now = datetime.utcnow()
+    return select(Blacklist).where(
+        Blacklist.user_id == user_id,
+        Blacklist.group_id == group_id,
+        (Blacklist.blacklist_type == "permanent") | (Blacklist.expires_at > now),
+    )
+
+
+def user_settings(user_id):
+    return select(Settings).where(Settings.user_id == user_id)
+
+
+def cached_active_messages(user_id):
+    return lambda_stmt(
+        lambda: select(Message).where(Message.user_id == user_id, Message.is_active == True)
+    )
+
+
+def cached_active_groups(user_id):
+    return lambda_stmt(
+        lambda: select(Group).where(Group.user_id == user_id, Group.is_active == True)
+    )
+
+
+def cached_blacklist_check(user_id, group_id="-1005"):
+    now = datetime.utcnow()
+    return lambda_stmt(
+        lambda: select(Blacklist).where(
+            Blacklist.user_id == user_id,
+            Blacklist.group_id == group_id,
+            (Blacklist.blacklist_type == "permanent") | (Blacklist.expires_at > now),
+        )
+    )
+
+
+def cached_user_settings(user_id):
+    return lambda_stmt(lambda: select(Settings).where(Settings.user_id == user_id))
+
+
+QUERIES = [
+    ("active_messages", active_messages, cached_active_messages),
+    ("active_groups", active_groups, cached_active_groups),
+    ("blacklist_check", blacklist_check, cached_blacklist_check),
+    ("user_settings", user_settings, cached_user_settings),
+]
+
+
+def fill(url: str) -> list:
+    engine = create_db_engine(url, sqlite_pragmas=sqlite_pragmas_from_settings(get_settings()))
+    create_tables(bind=engine)
+    user_ids = []
+    with engine.begin() as connection:
+        for _ in range(2):
+            user_id = connection.execute(
+                insert(User).values(api_id="x", api_hash="x", phone_number="x")
+            ).inserted_primary_key[0]
+            user_ids.append(user_id)
+            connection.execute(insert(Settings).values(user_id=user_id))
+            connection.execute(
+                insert(Message),
+                [{"user_id": user_id, "title": f"M{i}", "content": "x"} for i in range(5)],
+            )
+            connection.execute(
+                insert(Group),
+                [
+                    {"user_id": user_id, "group_id": f"-100{i}", "group_name": f"G{i}"}
+                    for i in range(20)
+                ],
+            )
+            connection.execute(
+                insert(Blacklist).values(
+                    user_id=user_id, group_id="-1005", blacklist_type="permanent"
+                )
+            )
+    engine.dispose()
+    return user_ids
+
+
+def time_build(build, user_ids, repeat: int) -> float:
+    # Statement construction plus the cache key lookup done by every execute
+    start = time.perf_counter()
+    for index in range(repeat):
+        build(user_ids[index % 2])._generate_cache_key()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+async def time_execute(db, build, user_ids, repeat: int) -> float:
+    timings = []
+    for index in range(repeat):
+        start = time.perf_counter()
+        result = await db.execute(build(user_ids[index % 2]))
+        result.scalars().all()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+async def run(url: str, user_ids: list, repeat: int) -> None:
+    engine = create_async_db_engine(
+        url, sqlite_pragmas=sqlite_pragmas_from_settings(get_settings())
+    )
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    try:
+        async with session_factory() as db:
+            for name, plain, cached in QUERIES:
+                for mode, build in (("select", plain), ("lambda_stmt", cached)):
+                    # Warm the compiled cache and the lambda analysis
+                    await time_execute(db, build, user_ids, 10)
+                    build_us = time_build(build, user_ids, repeat)
+                    execute_us = await time_execute(db, build, user_ids, repeat)
+                    print(
+                        f"query={name}, mode={mode}, build_us={build_us:.1f}, "
+                        f"execute_p50_us={execute_us:.1f}"
+                    )
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        user_ids = fill(url)
+        asyncio.run(run(url, user_ids, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
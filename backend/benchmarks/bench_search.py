@@ -0,0 +1,120 @@
+"""
+Group search benchmark
+
+Fills a temporary SQLite database with one user's groups and times
+GroupService.search_groups (FTS5, ranked) against the previous unranked
+ILIKE '%term%' scan, for a few terms of different selectivity.
+
+Usage: python benchmarks/bench_search.py [--groups 100000] [--repeat 50]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.database import (  # noqa: E402
+    create_async_db_engine,
+    create_db_engine,
+    create_tables,
+    sqlite_pragmas_from_settings,
+)
+from app.models.database import Group, User  # noqa: E402
+from app.services.group_service import group_service  # noqa: E402
+
+WORDS = [
+    "crypto", "news", "trading", "daily", "market", "signals", "community", "chat",
+    "deals", "games", "music", "travel", "coding", "python", "football", "recipes",
+]  # fmt: skip
+TERMS = ["crypto", "pyth", "football daily", "zzzz"]
+
+
+def fill(url: str, groups: int) -> int:
+    engine = create_db_engine(url, sqlite_pragmas=sqlite_pragmas_from_settings(get_settings()))
+    create_tables(bind=engine)
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        user_id = connection.execute(
+            insert(User).values(api_id="x", api_hash="x", phone_number="x")
+        ).inserted_primary_key[0]
+        connection.execute(
+            insert(Group),
+            [
+                {
+                    "user_id": user_id,
+                    "group_id": f"-100{index}",
+                    "group_name": " ".join(rng.sample(WORDS, 3)) + f" {index}",
+                    "username": f"{rng.choice(WORDS)}_{index}",
+                    "is_active": True,
+                }
+                for index in range(groups)
+            ],
+        )
+    engine.dispose()
+    return user_id
+
+
+async def run(url: str, user_id: int, repeat: int) -> None:
+    engine = create_async_db_engine(
+        url, sqlite_pragmas=sqlite_pragmas_from_settings(get_settings())
+    )
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def fts(db, term):
+        return await group_service.search_groups(db, user_id, term, limit=20)
+
+    async def like(db, term):
+        pattern = f"%{term}%"
+        result = await db.execute(
+            select(Group).where(
+                Group.user_id == user_id,
+                Group.is_active == True,
+                (Group.group_name.ilike(pattern) | Group.username.ilike(pattern)),
+            )
+        )
+        return result.scalars().all()
+
+    try:
+        async with session_factory() as db:
+            for term in TERMS:
+                for name, search in (("fts", fts), ("like", like)):
+                    timings = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        rows = await search(db, term)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    p95 = statistics.quantiles(timings, n=20)[-1]
+                    print(
+                        f"term={term!r}, mode={name}, rows={len(rows)}, "
+                        f"p50_ms={statistics.median(timings):.2f}, p95_ms={p95:.2f}"
+                    )
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--groups", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        user_id = fill(url, args.groups)
+        asyncio.run(run(url, user_id, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+List serialization benchmark
+
+Compares the per-row cost of turning ORM rows into a JSON response body for
+the groups, blacklist and logs list endpoints: FastAPI's response_model path
+(validate, convert to dicts, encode with the stdlib json module) against the
+precompiled ListSerializer the endpoints use. Rows are built in memory, so
+only serialization is measured.
+
+Usage: python benchmarks/bench_serialization.py [--rows 1000] [--repeat 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from app.core.serialization import ListSerializer  # noqa: E402
+from app.models import (  # noqa: E402
+    Blacklist,
+    BlacklistResponse,
+    Group,
+    GroupResponse,
+    Log,
+    LogResponse,
+)
+
+
+def make_groups(count):
+    now = datetime.utcnow()
+    return [
+        Group(
+            id=index,
+            user_id=1,
+            group_id=str(-1001000000000 - index),
+            group_name=f"Group {index}",
+            username=f"group_{index}",
+            invite_link=f"https://t.me/+invite{index}" if index % 3 == 0 else None,
+            is_active=index % 5 != 0,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+def make_blacklist(count):
+    now = datetime.utcnow()
+    return [
+        Blacklist(
+            id=index,
+            user_id=1,
+            group_id=str(-1001000000000 - index),
+            blacklist_type="temporary" if index % 2 else "permanent",
+            reason="SlowModeWait" if index % 2 else "ChatWriteForbidden",
+            expires_at=now + timedelta(hours=1) if index % 2 else None,
+            created_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+def make_logs(count):
+    now = datetime.utcnow()
+    return [
+        Log(
+            id=index,
+            user_id=1,
+            group_id=str(-1001000000000 - index),
+            message_id=index % 10,
+            status="failed" if index % 7 == 0 else "success",
+            error_message="FloodWait 30s" if index % 7 == 0 else None,
+            created_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+def response_model_body(schema):
+    field = create_response_field(name="response", type_=List[schema])
+
+    async def serialize(rows):
+        content = await serialize_response(field=field, response_content=rows, is_coroutine=True)
+        return JSONResponse(content).body
+
+    return serialize
+
+
+def serializer_body(schema):
+    serializer = ListSerializer(schema)
+
+    async def serialize(rows):
+        return serializer.dump(rows)
+
+    return serialize
+
+
+async def measure(serialize, rows, repeat):
+    """Get the median per-row time in microseconds"""
+    await serialize(rows)  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await serialize(rows)
+        samples.append((time.perf_counter() - start) / len(rows) * 1e6)
+    return statistics.median(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    endpoints = [
+        ("groups", GroupResponse, make_groups),
+        ("blacklist", BlacklistResponse, make_blacklist),
+        ("logs", LogResponse, make_logs),
+    ]
+
+    print(f"{args.rows} rows, median of {args.repeat} runs (us/row)")
+    print(f"{'endpoint':<10} {'response_model':>15} {'serializer':>11} {'speedup':>8}")
+    for name, schema, make_rows in endpoints:
+        rows = make_rows(args.rows)
+        assert await response_model_body(schema)(rows) == await serializer_body(schema)(rows)
+
+        legacy = await measure(response_model_body(schema), rows, args.repeat)
+        precompiled = await measure(serializer_body(schema), rows, args.repeat)
+        print(f"{name:<10} {legacy:>15.2f} {precompiled:>11.2f} {legacy / precompiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
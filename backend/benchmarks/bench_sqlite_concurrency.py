@@ -0,0 +1,108 @@
+"""
+SQLite concurrency benchmark
+
+Runs scheduler-style writers (one short transaction per log row) against
+API-style readers (log count plus the latest page) on a temporary database,
+once with SQLite defaults and once with the pragmas from app.database.
+
+Usage: python benchmarks/bench_sqlite_concurrency.py [--seconds 5] [--writers 4] [--readers 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.config import get_settings  # noqa: E402
+from app.core.metrics import Histogram  # noqa: E402
+from app.database import Base, create_db_engine, sqlite_pragmas_from_settings  # noqa: E402
+from app.models.database import Log, User  # noqa: E402
+
+
+def run_workload(pragmas, seconds: float, writers: int, readers: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_db_engine(
+            url, pool_size=writers + readers, max_overflow=0, sqlite_pragmas=pragmas
+        )
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as db:
+            db.add(User(api_id="x", api_hash="x", phone_number="x"))
+            db.commit()
+
+        write_latency = Histogram("write")
+        read_latency = Histogram("read")
+        errors = {"write": 0, "read": 0}
+        deadline = time.perf_counter() + seconds
+
+        def writer(index: int):
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    with Session() as db:
+                        db.add(Log(user_id=1, group_id=f"group_{index}", status="success"))
+                        db.commit()
+                except OperationalError:
+                    errors["write"] += 1
+                    continue
+                write_latency.observe(time.perf_counter() - start)
+
+        def reader():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    with Session() as db:
+                        db.query(func.count(Log.id)).filter(Log.user_id == 1).scalar()
+                        db.query(Log).filter(Log.user_id == 1).order_by(Log.id.desc()).limit(
+                            50
+                        ).all()
+                except OperationalError:
+                    errors["read"] += 1
+                    continue
+                read_latency.observe(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        engine.dispose()
+
+    return {
+        "writes_per_s": round(write_latency.count / seconds, 1),
+        "reads_per_s": round(read_latency.count / seconds, 1),
+        "write_p95_ms": round(write_latency.percentile(0.95) * 1000, 2),
+        "read_p95_ms": round(read_latency.percentile(0.95) * 1000, 2),
+        "write_errors": errors["write"],
+        "read_errors": errors["read"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    tuned = sqlite_pragmas_from_settings(get_settings())
+    for label, pragmas in (("defaults", None), ("tuned", tuned)):
+        result = run_workload(pragmas, args.seconds, args.writers, args.readers)
+        print(f"{label:>8}: " + ", ".join(f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+API load test
+
+Starts the app with uvicorn on a temporary database, seeds one user with
+messages, groups and logs, then drives read endpoints at increasing
+concurrency from a separate process and reports throughput and latency per
+level. Compare runs before and after a change to see how the server responds
+to concurrent load.
+
+Usage: python benchmarks/load_test_api.py [--requests 2000] [--concurrency 1,4,16,64]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+from app.core.metrics import Histogram  # noqa: E402
+
+ENDPOINTS = (
+    "/api/v1/messages/",
+    "/api/v1/groups/",
+    "/api/v1/blacklist/stats",
+    "/api/v1/scheduler/logs",
+    "/api/v1/scheduler/logs/stats",
+)
+
+
+def seed() -> int:
+    from app.database import Base, SessionLocal, engine
+    from app.models import Group, Log, Message, User
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(api_id="x", api_hash="x", phone_number="x")
+        db.add(user)
+        db.commit()
+
+        db.add_all(Message(user_id=user.id, title=f"m{i}", content="hello") for i in range(50))
+        db.add_all(
+            Group(user_id=user.id, group_id=f"-100{i}", group_name=f"g{i}") for i in range(200)
+        )
+        db.add_all(
+            Log(user_id=user.id, group_id=f"-100{i % 200}", status="success") for i in range(5000)
+        )
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+async def run_level(base_url: str, headers: dict, total: int, concurrency: int) -> dict:
+    latency = Histogram("request")
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=30) as client:
+
+        async def worker():
+            nonlocal errors
+            for index in counter:
+                start = time.perf_counter()
+                response = await client.get(ENDPOINTS[index % len(ENDPOINTS)])
+                latency.observe(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "req_per_s": round(total / elapsed, 1),
+        "p50_ms": round(latency.percentile(0.50) * 1000, 2),
+        "p95_ms": round(latency.percentile(0.95) * 1000, 2),
+        "errors": errors,
+    }
+
+
+def load_level(base_url: str, headers: dict, total: int, concurrency: int) -> dict:
+    return asyncio.run(run_level(base_url, headers, total, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    import uvicorn
+
+    from app.main import app
+    from app.middleware.rate_limiting import rate_limiters
+    from app.services.auth_service import auth_service
+
+    # The load comes from one client, which the rate limiter would reject
+    for limiter in rate_limiters.values():
+        limiter.max_requests = sys.maxsize
+
+    user_id = seed()
+    token = auth_service.create_access_token({"sub": str(user_id)})
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    # Generate load from another process so the client does not share the server's GIL
+    pool = multiprocessing.get_context("spawn").Pool(1)
+    try:
+        for level in (int(value) for value in args.concurrency.split(",")):
+            result = pool.apply(
+                load_level,
+                (
+                    f"http://127.0.0.1:{args.port}",
+                    {"Authorization": f"Bearer {token}"},
+                    args.requests,
+                    level,
+                ),
+            )
+            print(", ".join(f"{key}={value}" for key, value in result.items()))
+    finally:
+        pool.close()
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
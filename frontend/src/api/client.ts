@@ -169,6 +169,7 @@ export const api = {
     create: (data) => apiClient.post('/messages', data),
     update: (id, data) => apiClient.put(`/messages/${id}`, data),
     delete: (id) => apiClient.delete(`/messages/${id}`),
+    batch: (items) => apiClient.post('/messages/batch', { items }),
     send: (id, data) => apiClient.post(`/messages/${id}/send`, data),
     preview: (data) => apiClient.post('/messages/preview', data),
   },
@@ -180,6 +181,7 @@ export const api = {
     create: (data) => apiClient.post('/groups', data),
     update: (id, data) => apiClient.put(`/groups/${id}`, data),
     delete: (id) => apiClient.delete(`/groups/${id}`),
+    batch: (items) => apiClient.post('/groups/batch', { items }),
     sync: () => apiClient.post('/groups/sync'),
     validate: (groupId) => apiClient.post(`/groups/${groupId}/validate`),
   },
@@ -202,6 +204,7 @@ export const api = {
     getAll: (params) => apiClient.get('/blacklist', { params }),
     add: (data) => apiClient.post('/blacklist', data),
     remove: (id) => apiClient.delete(`/blacklist/${id}`),
+    batch: (items) => apiClient.post('/blacklist/batch', { items }),
     check: (identifier) => apiClient.post('/blacklist/check', { identifier }),
     import: (data) => apiClient.post('/blacklist/import', data),
     export: () => apiClient.get('/blacklist/export'),
@@ -218,6 +221,7 @@ export const api = {
 
   // Dashboard/Stats
   dashboard: {
+    getSummary: () => apiClient.get('/dashboard/summary'),
     getStats: () => apiClient.get('/dashboard/stats'),
     getActivity: (params) => apiClient.get('/dashboard/activity', { params }),
     getCharts: (params) => apiClient.get('/dashboard/charts', { params }),
@@ -262,6 +266,110 @@ export const downloadFile = async (url, filename) => {
   }
 };
 
+// Live scheduler events (Server-Sent Events). EventSource cannot send the
+// Authorization header, so the stream is read with fetch; after a drop it
+// reconnects with Last-Event-ID to resume where it left off.
+// Returns a function that closes the stream.
+export const subscribeSchedulerEvents = (onEvent) => {
+  const controller = new AbortController();
+  let lastEventId = null;
+  let retryMs = 5000;
+
+  const dispatch = (block) => {
+    let type = 'message';
+    const data = [];
+    for (const line of block.split('\n')) {
+      if (line.startsWith(':')) continue;
+      const index = line.indexOf(':');
+      const field = index === -1 ? line : line.slice(0, index);
+      const value = index === -1 ? '' : line.slice(index + 1).replace(/^ /, '');
+      if (field === 'id') lastEventId = value;
+      else if (field === 'event') type = value;
+      else if (field === 'data') data.push(value);
+      else if (field === 'retry' && /^\d+$/.test(value)) retryMs = Number(value);
+    }
+    if (data.length) onEvent(type, JSON.parse(data.join('\n')));
+  };
+
+  const connect = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const headers = { Authorization: `Bearer ${getAuthToken()}` };
+        if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+
+        const response = await fetch(`${API_BASE_URL}/api/v1/scheduler/events`, {
+          headers,
+          signal: controller.signal,
+        });
+        if (response.status === 401) return;
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          let end;
+          while ((end = buffer.indexOf('\n\n')) !== -1) {
+            dispatch(buffer.slice(0, end));
+            buffer = buffer.slice(end + 2);
+          }
+        }
+      } catch (error) {
+        if (controller.signal.aborted) return;
+        console.warn('Scheduler event stream interrupted:', error.message);
+      }
+      await new Promise((resolve) => setTimeout(resolve, retryMs));
+    }
+  };
+
+  connect();
+  return () => controller.abort();
+};
+
+// POST to an endpoint that streams NDJSON progress: calls onProgress with
+// each record and resolves with the final "done" record
+const postNdjson = async (path, body, onProgress) => {
+  const response = await fetch(`${API_BASE_URL}/api/v1${path}`, {
+    method: 'POST',
+    headers: {
+      Authorization: `Bearer ${getAuthToken()}`,
+      'Content-Type': 'application/json',
+    },
+    body: body === undefined ? undefined : JSON.stringify(body),
+  });
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}));
+    throw new Error(error.detail || `HTTP ${response.status}`);
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  let summary = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let end;
+    while ((end = buffer.indexOf('\n')) !== -1) {
+      const record = JSON.parse(buffer.slice(0, end));
+      buffer = buffer.slice(end + 1);
+      if (record.status === 'done') summary = record;
+      else onProgress?.(record);
+    }
+  }
+  return summary;
+};
+
+// Bulk group import from links, usernames and IDs
+export const importGroups = (groupInputs, onProgress) =>
+  postNdjson('/groups/import', { group_inputs: groupInputs }, onProgress);
+
+// Import every group the account has joined
+export const importDialogs = (onProgress, active = true) =>
+  postNdjson(`/groups/import-dialogs?active=${active}`, undefined, onProgress);
+
 // Export token management functions
 export { getAuthToken, setAuthToken, clearAuthToken };
 
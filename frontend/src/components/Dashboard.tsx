@@ -16,7 +16,7 @@ import {
   XCircle,
   Loader2
 } from 'lucide-react';
-import { api } from "../api/client";
+import { api, subscribeSchedulerEvents } from "../api/client";
 
 export const Dashboard = () => {
   const [stats, setStats] = useState({
@@ -32,29 +32,45 @@ export const Dashboard = () => {
 
   useEffect(() => {
     loadDashboardData();
-    
-    // Refresh data every 30 seconds
-    const interval = setInterval(loadDashboardData, 30000);
-    return () => clearInterval(interval);
+
+    // Changes arrive over the event stream; the slow poll only catches up on
+    // anything missed while the stream was down
+    const interval = setInterval(loadDashboardData, 300000);
+
+    // Send logs are written in batches, so reload the summary shortly after
+    // a burst of events rather than once per event
+    let reloadTimer;
+    const scheduleReload = () => {
+      clearTimeout(reloadTimer);
+      reloadTimer = setTimeout(loadDashboardData, 2000);
+    };
+
+    const unsubscribe = subscribeSchedulerEvents((type, data) => {
+      if (type === 'scheduler' || type === 'send') {
+        const { is_running, next_run, last_run, total_messages_sent } = data;
+        const changed = Object.fromEntries(
+          Object.entries({ is_running, next_run, last_run, total_messages_sent })
+            .filter(([, value]) => value !== undefined)
+        );
+        setStats(prev => ({
+          ...prev,
+          scheduler: prev.scheduler && { ...prev.scheduler, ...changed }
+        }));
+      }
+      scheduleReload();
+    });
+
+    return () => {
+      clearInterval(interval);
+      clearTimeout(reloadTimer);
+      unsubscribe();
+    };
   }, []);
 
   const loadDashboardData = async () => {
     try {
-      const [schedulerRes, messagesRes, groupsRes, blacklistRes, logsRes] = await Promise.all([
-        api.scheduler.getStatus(),
-        api.messages.getStats(),
-        api.groups.getStats(),
-        api.blacklist.getStats(),
-        api.scheduler.getLogStats(24)
-      ]);
-
-      setStats({
-        scheduler: schedulerRes.data,
-        messages: messagesRes.data,
-        groups: groupsRes.data,
-        blacklist: blacklistRes.data,
-        logs: logsRes.data
-      });
+      const response = await api.dashboard.getSummary();
+      setStats(response.data);
       setError('');
     } catch (err) {
       setError('Failed to load dashboard data');
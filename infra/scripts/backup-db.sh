@@ -1,14 +1,18 @@
 #!/bin/bash
 
 # Database backup script for Telegram Automation
+#
+# Backs up the database named by DATABASE_URL (environment or backend/.env).
+# PostgreSQL is dumped with pg_dump; SQLite is copied with the online backup
+# API, which is safe while the app is writing in WAL mode (a plain cp of the
+# database file would miss pages still in the -wal file).
 
 set -e
 
 # Configuration
 BACKUP_DIR="backups"
-DB_FILE="backend/telegram_automation.db"
 TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
-BACKUP_FILE="${BACKUP_DIR}/telegram_automation_backup_${TIMESTAMP}.db"
+KEEP_BACKUPS=10
 
 echo "Starting database backup..."
 
@@ -18,46 +22,94 @@ if [ ! -f "backend/app/main.py" ]; then
     exit 1
 fi
 
+# Resolve the database URL
+if [ -z "$DATABASE_URL" ] && [ -f "backend/.env" ]; then
+    DATABASE_URL=$(grep -E '^DATABASE_URL=' backend/.env | tail -n 1 | cut -d '=' -f 2-)
+fi
+DATABASE_URL=${DATABASE_URL:-sqlite:///./telegram_automation.db}
+
 # Create backup directory if it doesn't exist
 mkdir -p "$BACKUP_DIR"
 
-# Check if database file exists
-if [ ! -f "$DB_FILE" ]; then
-    echo "Warning: Database file not found at $DB_FILE"
-    echo "This might be normal if the database hasn't been created yet."
-    exit 0
-fi
+case "$DATABASE_URL" in
+    postgres://*|postgresql://*|postgresql+*://*)
+        if ! command -v pg_dump &> /dev/null; then
+            echo "Error: pg_dump is not installed"
+            exit 1
+        fi
+
+        # pg_dump does not understand SQLAlchemy driver suffixes
+        PG_URL=$(echo "$DATABASE_URL" | sed -E 's|^postgresql\+[a-z0-9]+://|postgresql://|')
+        BACKUP_FILE="${BACKUP_DIR}/telegram_automation_backup_${TIMESTAMP}.dump"
+
+        echo "Creating backup: $BACKUP_FILE"
+        pg_dump --format=custom --no-owner --file="$BACKUP_FILE" "$PG_URL"
+
+        # Verify backup
+        if ! pg_restore --list "$BACKUP_FILE" > /dev/null; then
+            echo "Error: Backup verification failed"
+            rm -f "$BACKUP_FILE"
+            exit 1
+        fi
+        ;;
+
+    sqlite:///*)
+        # Relative paths are relative to the backend directory
+        DB_FILE="${DATABASE_URL#sqlite:///}"
+        DB_FILE="${DB_FILE%%\?*}"
+        case "$DB_FILE" in
+            /*) ;;
+            *) DB_FILE="backend/${DB_FILE#./}" ;;
+        esac
+        BACKUP_FILE="${BACKUP_DIR}/telegram_automation_backup_${TIMESTAMP}.db"
+
+        # Check if database file exists
+        if [ ! -f "$DB_FILE" ]; then
+            echo "Warning: Database file not found at $DB_FILE"
+            echo "This might be normal if the database hasn't been created yet."
+            exit 0
+        fi
 
-# Create backup
-echo "Creating backup: $BACKUP_FILE"
-cp "$DB_FILE" "$BACKUP_FILE"
-
-# Verify backup
-if [ -f "$BACKUP_FILE" ]; then
-    ORIGINAL_SIZE=$(stat -f%z "$DB_FILE" 2>/dev/null || stat -c%s "$DB_FILE" 2>/dev/null)
-    BACKUP_SIZE=$(stat -f%z "$BACKUP_FILE" 2>/dev/null || stat -c%s "$BACKUP_FILE" 2>/dev/null)
-    
-    if [ "$ORIGINAL_SIZE" -eq "$BACKUP_SIZE" ]; then
-        echo "Backup created successfully: $BACKUP_FILE"
-        echo "Backup size: $BACKUP_SIZE bytes"
-    else
-        echo "Error: Backup verification failed. Size mismatch."
-        rm -f "$BACKUP_FILE"
+        echo "Creating backup: $BACKUP_FILE"
+        if ! python3 - "$DB_FILE" "$BACKUP_FILE" <<'EOF'
+import sqlite3
+import sys
+
+source = sqlite3.connect(sys.argv[1])
+target = sqlite3.connect(sys.argv[2])
+with target:
+    source.backup(target)
+source.close()
+
+result = target.execute("PRAGMA integrity_check").fetchone()[0]
+target.close()
+if result != "ok":
+    sys.exit(f"integrity check failed: {result}")
+EOF
+        then
+            echo "Error: Backup verification failed"
+            rm -f "$BACKUP_FILE"
+            exit 1
+        fi
+        ;;
+
+    *)
+        echo "Error: Unsupported DATABASE_URL for backups: ${DATABASE_URL%%:*}"
         exit 1
-    fi
-else
-    echo "Error: Failed to create backup file"
-    exit 1
-fi
+        ;;
+esac
+
+BACKUP_SIZE=$(stat -f%z "$BACKUP_FILE" 2>/dev/null || stat -c%s "$BACKUP_FILE" 2>/dev/null)
+echo "Backup created successfully: $BACKUP_FILE"
+echo "Backup size: $BACKUP_SIZE bytes"
 
-# Clean up old backups (keep last 10)
+# Clean up old backups (keep last $KEEP_BACKUPS)
 echo "Cleaning up old backups..."
 cd "$BACKUP_DIR"
-ls -t telegram_automation_backup_*.db | tail -n +11 | xargs -r rm -f
-REMAINING_BACKUPS=$(ls -1 telegram_automation_backup_*.db 2>/dev/null | wc -l)
+ls -t telegram_automation_backup_* | tail -n +$((KEEP_BACKUPS + 1)) | xargs -r rm -f
+REMAINING_BACKUPS=$(ls -1 telegram_automation_backup_* 2>/dev/null | wc -l)
 echo "Remaining backups: $REMAINING_BACKUPS"
 
 cd ..
 
 echo "Database backup completed successfully!"
-